@@ -0,0 +1,53 @@
+"""
+Database Bootstrap
+
+Brings the schema up to date: creates the tables of every model that do not
+exist yet and applies pending migrations (see app/utils/migrations.py). Run
+it once per deployment, and after pulling model changes, before starting the
+API:
+
+    python -m app.bootstrap            # upgrade
+    python -m app.bootstrap --status   # show the schema version and pending migrations
+
+Importing app.main never touches the database, so workers start while the
+database is still coming up and tests can import the app without one.
+"""
+import argparse
+import logging
+from app.db import engine
+from app.utils.migrations import current_version, head_version, pending_migrations, upgrade
+
+logger = logging.getLogger("app.bootstrap")
+
+
+def migrate_schema() -> dict:
+    """Create missing tables and apply pending migrations; see upgrade()"""
+    return upgrade(engine)
+
+
+def schema_status() -> dict:
+    with engine.connect() as conn:
+        return {
+            "version": current_version(conn),
+            "head": head_version(),
+            "pending": pending_migrations(conn),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create missing tables and apply pending migrations")
+    parser.add_argument("--status", action="store_true", help="Only show the schema version and pending migrations")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    if args.status:
+        status = schema_status()
+        print(f"Schema version {status['version']} (latest {status['head']})")
+        for version, description in status["pending"]:
+            print(f"  pending {version}: {description}")
+    else:
+        result = migrate_schema()
+        print(
+            f"Schema at version {result['version']} ({len(result['created'])} tables created, "
+            f"{len(result['applied'])} migrations applied)"
+        )
@@ -11,6 +11,34 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Leaderboard scoring weights
+    LEADERBOARD_RESOURCE_POINTS: int = 10
+    LEADERBOARD_POST_POINTS: int = 5
+    LEADERBOARD_PACKAGE_POINTS: int = 2
+    
+    # Content screening
+    SCREENING_RELOAD_SECONDS: int = 30  # how often workers check the rule list for changes
+    SCREENING_DUPLICATE_WINDOW_HOURS: int = 24
+    SCREENING_SPAM_THRESHOLD: int = 3  # copies by one user within the window that count as spam
+    SCREENING_MIN_HASH_LENGTH: int = 20  # shorter normalized texts are not fingerprinted
+    
+    # Uploads
+    UPLOAD_BATCH_MAX_FILES: int = 20  # files per batch presign request
+    UPLOAD_BATCH_MAX_BYTES: int = 1024 ** 3  # total declared size per batch presign request
+    UPLOAD_QUOTA_PERIOD_SECONDS: int = 3600
+    UPLOAD_QUOTA_MAX_FILES: int = 200  # files per user per period, over all upload endpoints
+    UPLOAD_QUOTA_MAX_BYTES: int = 10 * 1024 ** 3  # declared bytes per user per period
+    ORPHAN_GRACE_HOURS: int = 24  # unreferenced uploads younger than this are kept
+    
+    # Media processing
+    MEDIA_WORKERS: int = 2  # processes resizing images / reading documents
+    MEDIA_BATCH_SIZE: int = 20  # files claimed per run of the process_media job
+    
+    # Response compression
+    COMPRESSION_MIN_SIZE: int = 1024  # smaller bodies are sent uncompressed
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # 0-11; higher levels cost too much CPU per request
+    
     # App
     APP_NAME: str = "College Mentorship Platform"
     DEBUG: bool = True
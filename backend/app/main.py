@@ -3,19 +3,24 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import auth, users, mentors, mentees, posts, resources, chats, leaderboard, admin, upload
 from app.routers import websocket_chat
-from app.db import engine, Base
 from app.config import settings
-from app.utils.scheduler import start_scheduler, stop_scheduler
+from app.utils.compression import CompressionMiddleware
+from app.utils.responses import FastJSONResponse
+from app.utils.scheduler import start_scheduler, stop_scheduler, load_ranked_leaderboard
 import atexit
+import logging
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Application loggers (e.g. app.scheduler) emit structured JSON messages
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+
+# Tables are created by `python -m app.bootstrap`, not on import (see app/bootstrap.py)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifecycle manager for startup and shutdown events"""
     # Startup
+    load_ranked_leaderboard()
     start_scheduler()
     yield
     # Shutdown
@@ -27,7 +32,8 @@ app = FastAPI(
     title=settings.APP_NAME,
     description="College Mentorship Platform API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse  # orjson; same JSON as the default response
 )
 
 # CORS middleware - Allow all localhost variants
@@ -49,6 +55,9 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Brotli/gzip for JSON and text responses above COMPRESSION_MIN_SIZE (see app/utils/compression.py)
+app.add_middleware(CompressionMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(users.router)
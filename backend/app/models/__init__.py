@@ -6,6 +6,16 @@ from app.models.resource import Resource
 from app.models.chat import Chat
 from app.models.leaderboard import Leaderboard
 from app.models.admin import Admin
+from app.models.contribution import DailyContribution
+from app.models.outbox import OutboxEvent
+from app.models.stat_counter import StatCounter
+from app.models.moderation_lease import ModerationLease
+from app.models.background_job import BackgroundJob
+from app.models.screening import ScreeningRule, ContentFingerprint, ContentFlag
+from app.models.upload import MultipartUpload, ContentObject, UploadQuota
+from app.models.media import MediaAsset
+from app.models.schema_migration import SchemaMigration
+from app.models.job_run import JobRun
 
 __all__ = [
     "User",
@@ -16,5 +26,19 @@ __all__ = [
     "Chat",
     "Leaderboard",
     "Admin",
+    "DailyContribution",
+    "OutboxEvent",
+    "StatCounter",
+    "ModerationLease",
+    "BackgroundJob",
+    "ScreeningRule",
+    "ContentFingerprint",
+    "ContentFlag",
+    "MultipartUpload",
+    "ContentObject",
+    "UploadQuota",
+    "MediaAsset",
+    "SchemaMigration",
+    "JobRun",
 ]
 
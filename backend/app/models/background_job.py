@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Index
+from sqlalchemy.sql import func
+from app.db import Base
+
+
+class BackgroundJob(Base):
+    """Progress and outcome of a long-running task started from the API (imports, purges, ...)"""
+    __tablename__ = "background_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending, running, done, failed
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    total = Column(Integer)
+    processed = Column(Integer, nullable=False, default=0)
+    result = Column(JSON)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True))
+    
+    __table_args__ = (
+        Index("idx_background_job_kind_status", "kind", "status"),
+    )
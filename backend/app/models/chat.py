@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db import Base
@@ -17,4 +17,10 @@ class Chat(Base):
     # Relationships
     sender = relationship("User", foreign_keys=[sender_id], backref="sent_messages")
     receiver = relationship("User", foreign_keys=[receiver_id], backref="received_messages")
+    
+    # Conversation polling and unread counts per sender
+    __table_args__ = (
+        Index("idx_chat_conversation", "sender_id", "receiver_id", "created_at"),
+        Index("idx_chat_unread", "receiver_id", "is_read", "sender_id"),
+    )
 
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from app.db import Base
+
+
+class DailyContribution(Base):
+    """Per-user, per-day post/resource counts used for windowed leaderboards"""
+    __tablename__ = "daily_contributions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)
+    total_resources = Column(Integer, default=0, nullable=False)
+    total_posts = Column(Integer, default=0, nullable=False)
+    
+    # Relationships
+    user = relationship("User", backref="daily_contributions")
+    
+    __table_args__ = (
+        UniqueConstraint("user_id", "day", name="uq_daily_contribution_user_day"),
+        Index("idx_daily_contribution_day", "day"),
+    )
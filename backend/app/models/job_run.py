@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, Text, Index
+from app.db import Base
+
+
+class JobRun(Base):
+    """One scheduled slot of a cluster-wide job, claimed by the first worker to reach it"""
+    __tablename__ = "job_runs"
+    
+    job_id = Column(String(100), primary_key=True)
+    scheduled_at = Column(DateTime, primary_key=True)  # UTC fire time of the slot (start time for manual runs)
+    trigger = Column(String(20), nullable=False, default="schedule")  # schedule or manual
+    worker = Column(String(255), nullable=False)
+    status = Column(String(20), nullable=False, default="running")  # running, ok, failed
+    started_at = Column(DateTime, nullable=False)
+    duration_ms = Column(Float)
+    rows = Column(Integer)
+    error = Column(Text)
+    
+    __table_args__ = (
+        Index("idx_job_run_started", "started_at"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db import Base
@@ -17,4 +17,9 @@ class Leaderboard(Base):
     
     # Relationships
     user = relationship("User", backref="leaderboard_entry")
+    
+    # Ranking order: points descending, ties by user id
+    __table_args__ = (
+        Index("idx_leaderboard_points", points.desc(), user_id),
+    )
 
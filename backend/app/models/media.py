@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, JSON, Index
+from sqlalchemy.sql import func
+from app.db import Base
+
+
+class MediaAsset(Base):
+    """Processing state and derived data of one uploaded file, shared by every post/resource using it"""
+    __tablename__ = "media_assets"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    file_key = Column(String(500), unique=True, nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending, processing, done, failed
+    mime_type = Column(String(255))
+    size = Column(BigInteger)  # bytes
+    width = Column(Integer)  # images only
+    height = Column(Integer)
+    page_count = Column(Integer)  # PDFs only
+    variants = Column(JSON)  # {name: {"key", "width", "height"}} of resized images
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    processed_at = Column(DateTime(timezone=True))
+    
+    __table_args__ = (
+        Index("idx_media_asset_status", "status", "id"),
+    )
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from app.db import Base
+
+
+class ModerationLease(Base):
+    """Post/resource temporarily assigned to one admin in the moderation queue"""
+    __tablename__ = "moderation_leases"
+    
+    item_type = Column(String(20), primary_key=True)  # "post" or "resource"
+    item_id = Column(Integer, primary_key=True)
+    admin_user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    
+    __table_args__ = (
+        Index("idx_moderation_lease_admin", "admin_user_id"),
+    )
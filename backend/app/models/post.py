@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db import Base
@@ -12,6 +12,8 @@ class Post(Base):
     title = Column(String(255), nullable=False)
     content = Column(Text, nullable=False)
     media_url = Column(String(500))  # For image/video uploads
+    media_key = Column(String(500), index=True)  # storage key of media_url, if it is an upload
+    media_info = Column(JSON)  # derived by the media pipeline: MIME type, size, variant URLs
     likes = Column(Integer, default=0, nullable=False)
     is_approved = Column(Boolean, default=True, nullable=False)  # For content moderation
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -19,4 +21,10 @@ class Post(Base):
     
     # Relationships
     user = relationship("User", backref="posts")
+    
+    # Keyset pagination for the moderation queue (and the feed); a user's posts
+    __table_args__ = (
+        Index("idx_post_moderation", "is_approved", "created_at", "id"),
+        Index("idx_post_user", "user_id", "created_at"),
+    )
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db import Base
@@ -21,6 +21,8 @@ class Resource(Base):
     title = Column(String(255), nullable=False)
     description = Column(Text)
     file_url = Column(String(500), nullable=False)  # Store URL string only
+    file_key = Column(String(500), index=True)  # storage key of file_url, if it is an upload
+    file_info = Column(JSON)  # derived by the media pipeline: MIME type, size, page count, preview URLs
     resource_type = Column(CaseInsensitiveEnum(ResourceType, length=50), nullable=False, default=ResourceType.OTHER)
     category = Column(String(100))
     is_approved = Column(Boolean, default=True, nullable=False)  # For content moderation
@@ -29,4 +31,11 @@ class Resource(Base):
     
     # Relationships
     user = relationship("User", backref="resources")
+    
+    # Keyset pagination for the moderation queue (and the list); lists by author or category
+    __table_args__ = (
+        Index("idx_resource_moderation", "is_approved", "created_at", "id"),
+        Index("idx_resource_user", "user_id", "is_approved", "created_at"),
+        Index("idx_resource_category", "category", "is_approved", "created_at"),
+    )
 
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.db import Base
+
+
+class SchemaMigration(Base):
+    """Applied schema migration; the highest version is the schema version"""
+    __tablename__ = "schema_migrations"
+    
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    description = Column(String(255), nullable=False)
+    duration_ms = Column(Integer)  # None when stamped on a database created at this version
+    applied_at = Column(DateTime(timezone=True), server_default=func.now())
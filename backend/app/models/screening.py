@@ -0,0 +1,48 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db import Base
+
+
+class ScreeningRule(Base):
+    """Banned term or link matched against new posts and resources"""
+    __tablename__ = "screening_rules"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    pattern = Column(String(255), unique=True, nullable=False)  # stored lowercase
+    kind = Column(String(20), nullable=False, default="term")  # "term" (whole words) or "link" (substring)
+    action = Column(String(20), nullable=False, default="flag")  # "flag" or "unapprove"
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ContentFingerprint(Base):
+    """Hash of a post's/resource's normalized text, for duplicate and spam detection"""
+    __tablename__ = "content_fingerprints"
+    
+    item_type = Column(String(20), primary_key=True)  # "post" or "resource"
+    item_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    content_hash = Column(String(64), nullable=False)  # SHA-256 hex
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("idx_content_fingerprint_hash", "content_hash", "created_at"),
+    )
+
+
+class ContentFlag(Base):
+    """Automated screening result for a post or resource"""
+    __tablename__ = "content_flags"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    item_type = Column(String(20), nullable=False)
+    item_id = Column(Integer, nullable=False)
+    reason = Column(String(20), nullable=False)  # "term", "link", "duplicate" or "spam"
+    action = Column(String(20), nullable=False)  # "flag" or "unapprove"
+    details = Column(JSON)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("item_type", "item_id", "reason", name="uq_content_flag_item_reason"),
+        Index("idx_content_flag_created", "created_at"),
+    )
@@ -0,0 +1,53 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.db import Base
+
+
+class MultipartUpload(Base):
+    """Large file upload in progress, sent as separately uploaded parts"""
+    __tablename__ = "multipart_uploads"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    upload_id = Column(String(255), unique=True, nullable=False)  # storage backend's upload id
+    file_key = Column(String(500), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    content_type = Column(String(255))
+    size = Column(BigInteger, nullable=False)  # declared total size in bytes
+    part_size = Column(Integer, nullable=False)
+    status = Column(String(20), nullable=False, default="in_progress")  # in_progress, completed, aborted
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    __table_args__ = (
+        Index("idx_multipart_upload_status_created", "status", "created_at"),
+    )
+
+
+class ContentObject(Base):
+    """Uploaded file stored once per user and content hash, shared by their posts/resources with the same bytes"""
+    __tablename__ = "content_objects"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), nullable=False)  # hex
+    file_key = Column(String(500), unique=True, nullable=False)
+    size = Column(BigInteger)
+    status = Column(String(20), nullable=False, default="pending")  # pending (not uploaded yet), stored
+    ref_count = Column(Integer, nullable=False, default=0)  # posts/resources using the file
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    claimed_at = Column(DateTime(timezone=True))  # last time an upload request resolved to this object
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    __table_args__ = (
+        Index("uq_content_object_owner_sha256", "created_by", "sha256", unique=True),
+    )
+
+
+class UploadQuota(Base):
+    """Files and declared bytes a user was handed upload URLs for in one quota period"""
+    __tablename__ = "upload_quotas"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    period = Column(BigInteger, primary_key=True, autoincrement=False)  # Unix time // UPLOAD_QUOTA_PERIOD_SECONDS
+    files = Column(Integer, nullable=False, default=0)
+    bytes = Column(BigInteger, nullable=False, default=0)
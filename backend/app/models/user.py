@@ -13,7 +13,9 @@ class UserRole(str, enum.Enum):
 class CaseInsensitiveEnum(TypeDecorator):
     """
     Custom TypeDecorator to handle case-insensitive enum conversion
-    This allows the database to store lowercase values while Python uses uppercase
+    Values are stored as the upper-case enum names (migration 5 converted the
+    lowercase values written by the old SQL setup script); reading stays
+    case-insensitive
     """
     impl = String
     cache_ok = True
@@ -61,6 +63,8 @@ class User(Base):
     full_name = Column(String(255), nullable=False)
     # Use custom TypeDecorator to handle case-insensitive enum conversion
     role = Column(CaseInsensitiveEnum(UserRole, length=50), nullable=False, default=UserRole.MENTEE)
+    # Set when the account is scheduled for deletion; the user can no longer sign in
+    disabled_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -1,5 +1,10 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, status, Query, Path, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from app.db import get_db
@@ -10,17 +15,49 @@ from app.models.admin import Admin
 from app.models.post import Post
 from app.models.resource import Resource
 from app.models.leaderboard import Leaderboard
+from app.models.background_job import BackgroundJob
+from app.models.screening import ContentFlag, ScreeningRule
 # Import schemas package to trigger model rebuilds
 import app.schemas  # This triggers model rebuilds in __init__.py
 
 from app.schemas.mentor import MentorResponse
-from app.schemas.admin import AdminResponse, AdminUpdate, AdminCreate
+from app.schemas.admin import (
+    AdminResponse,
+    AdminUpdate,
+    AdminCreate,
+    BulkModerationRequest,
+    BulkModerationResponse,
+    LeaseReleaseRequest,
+    PostLeaseResponse,
+    ResourceLeaseResponse,
+)
+from app.schemas.background_job import BackgroundJobResponse
 from app.schemas.post import PostResponse
+from app.schemas.screening import ContentFlagResponse, ScreeningRuleCreate, ScreeningRuleResponse
 from app.schemas.resource import ResourceResponse
 from app.utils.auth import get_current_active_user
+from app.utils.ranking import ranked_leaderboard
+from app.utils.scheduler import list_jobs, trigger_job
+from app.utils import export, stats
+from app.utils.background import create_job
+from app.utils.dedup import release_item_files
+from app.utils.bulk_import import BATCH_SIZE as IMPORT_BATCH_SIZE, JOB_KIND as IMPORT_JOB_KIND, run_import_job
+from app.utils.moderation import ACTIONS, bulk_moderate, lease_items, release_leases, select_ids
+from app.utils.scoring import apply_delta, sync_rank, weights
+from app.utils.screening import rule_set
+from app.utils.storage import storage_metrics
+from app.utils.storage_gc import JOB_KIND as GC_JOB_KIND, run_gc_job
+from app.utils.leaderboard import (
+    DEFAULT_CHUNK_SIZE,
+    rebuild_contribution_rollups,
+    recalculate_leaderboard as recalculate_leaderboard_entries,
+    windowed_cache,
+)
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+BULK_ACTION_PATTERN = "^(" + "|".join(ACTIONS) + ")$"
+
 
 def check_admin(current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
     """Check if current user is an admin"""
@@ -92,6 +129,8 @@ def verify_mentor(
             detail="Mentor not found"
         )
     
+    if not mentor.verified:
+        stats.increment(db, pending_mentors=-1)
     mentor.verified = True
     db.commit()
     db.refresh(mentor)
@@ -150,6 +189,7 @@ def approve_post(
         )
     
     post.is_approved = True
+    release_leases(db, Post, [post.id])
     db.commit()
     db.refresh(post)
     return post
@@ -170,6 +210,7 @@ def reject_post(
         )
     
     post.is_approved = False
+    release_leases(db, Post, [post.id])
     db.commit()
     db.refresh(post)
     return post
@@ -182,18 +223,60 @@ def delete_post(
     db: Session = Depends(get_db)
 ):
     """Delete a post (admin only)"""
-    post = db.query(Post).filter(Post.id == post_id).first()
+    # Locked: a concurrent delete of the same post waits, then finds it gone
+    post = db.query(Post).filter(Post.id == post_id).with_for_update().first()
     if not post:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post not found"
         )
     
-    db.delete(post)
+    release_item_files(db, Post, [post.id])
+    if db.query(Post).filter(Post.id == post.id).delete(synchronize_session=False) != 1:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Post not found"
+        )
+    release_leases(db, Post, [post.id])
+    apply_delta(db, post.user_id, posts=-1, day=post.created_at.date() if post.created_at else None)
+    stats.increment(db, posts=-1)
+    user_id = post.user_id  # the row is gone, so not reloadable after commit
     db.commit()
+    sync_rank(db, user_id)
     return None
 
 
+def _bulk_moderate(db: Session, model, action: str, request: BulkModerationRequest) -> BulkModerationResponse:
+    if request.ids is None and request.filter is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide either ids or filter"
+        )
+    ids = request.ids
+    if ids is None:
+        ids = select_ids(db, model, **request.filter.model_dump())
+    outcomes = bulk_moderate(db, model, action, ids)
+    not_found = sum(1 for outcome in outcomes.values() if outcome == "not_found")
+    return BulkModerationResponse(
+        action=action,
+        processed=len(outcomes) - not_found,
+        not_found=not_found,
+        outcomes=outcomes
+    )
+
+
+@router.post("/posts/bulk/{action}", response_model=BulkModerationResponse)
+def bulk_moderate_posts(
+    request: BulkModerationRequest,
+    action: str = Path(..., pattern=BULK_ACTION_PATTERN),
+    admin: Admin = Depends(check_admin),
+    db: Session = Depends(get_db)
+):
+    """Approve, reject or delete many posts by ID list or filter"""
+    return _bulk_moderate(db, Post, action, request)
+
+
 @router.put("/resources/{resource_id}/approve", response_model=ResourceResponse)
 def approve_resource(
     resource_id: int,
@@ -209,6 +292,7 @@ def approve_resource(
         )
     
     resource.is_approved = True
+    release_leases(db, Resource, [resource.id])
     db.commit()
     db.refresh(resource)
     return resource
@@ -229,6 +313,7 @@ def reject_resource(
         )
     
     resource.is_approved = False
+    release_leases(db, Resource, [resource.id])
     db.commit()
     db.refresh(resource)
     return resource
@@ -241,48 +326,387 @@ def delete_resource(
     db: Session = Depends(get_db)
 ):
     """Delete a resource (admin only)"""
-    resource = db.query(Resource).filter(Resource.id == resource_id).first()
+    # Locked: a concurrent delete of the same resource waits, then finds it gone
+    resource = db.query(Resource).filter(Resource.id == resource_id).with_for_update().first()
     if not resource:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Resource not found"
         )
     
-    db.delete(resource)
+    release_item_files(db, Resource, [resource.id])
+    if db.query(Resource).filter(Resource.id == resource.id).delete(synchronize_session=False) != 1:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Resource not found"
+        )
+    release_leases(db, Resource, [resource.id])
+    apply_delta(db, resource.user_id, resources=-1, day=resource.created_at.date() if resource.created_at else None)
+    stats.increment(db, resources=-1)
+    user_id = resource.user_id  # the row is gone, so not reloadable after commit
     db.commit()
+    sync_rank(db, user_id)
     return None
 
 
-@router.post("/leaderboard/recalculate", response_model=dict)
-def recalculate_leaderboard(
+@router.post("/resources/bulk/{action}", response_model=BulkModerationResponse)
+def bulk_moderate_resources(
+    request: BulkModerationRequest,
+    action: str = Path(..., pattern=BULK_ACTION_PATTERN),
     admin: Admin = Depends(check_admin),
     db: Session = Depends(get_db)
 ):
-    """Manually recalculate leaderboard points for all users"""
-    from app.models.mentor import Mentor
-    
-    # Get all users with leaderboard entries
-    leaderboards = db.query(Leaderboard).all()
-    updated_count = 0
-    
-    for lb in leaderboards:
-        # Get package from mentor profile if exists
-        mentor = db.query(Mentor).filter(Mentor.user_id == lb.user_id).first()
-        package = mentor.package if mentor else 0
-        
-        # Recalculate points
-        lb.package = package
-        lb.points = (lb.total_resources * 10) + (lb.total_posts * 5) + (package * 2)
-        updated_count += 1
-    
+    """Approve, reject or delete many resources by ID list or filter"""
+    return _bulk_moderate(db, Resource, action, request)
+
+
+@router.post("/moderation/posts/lease", response_model=PostLeaseResponse)
+def lease_posts_for_moderation(
+    admin: Admin = Depends(check_admin),
+    db: Session = Depends(get_db),
+    limit: int = Query(20, ge=1, le=100),
+    lease_seconds: int = Query(300, ge=30, le=3600),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    approved: Optional[bool] = Query(None, description="Filter by approval status")
+):
+    """Lease the next posts in the moderation queue to the current admin"""
+    items, next_cursor, expires_at = lease_items(
+        db, Post, admin.user_id, limit=limit, lease_seconds=lease_seconds, cursor=cursor, approved=approved
+    )
+    response = PostLeaseResponse(
+        items=[PostResponse.model_validate(item) for item in items],
+        next_cursor=next_cursor,
+        lease_expires_at=expires_at
+    )
+    db.commit()
+    return response
+
+
+@router.post("/moderation/resources/lease", response_model=ResourceLeaseResponse)
+def lease_resources_for_moderation(
+    admin: Admin = Depends(check_admin),
+    db: Session = Depends(get_db),
+    limit: int = Query(20, ge=1, le=100),
+    lease_seconds: int = Query(300, ge=30, le=3600),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    approved: Optional[bool] = Query(None, description="Filter by approval status")
+):
+    """Lease the next resources in the moderation queue to the current admin"""
+    items, next_cursor, expires_at = lease_items(
+        db, Resource, admin.user_id, limit=limit, lease_seconds=lease_seconds, cursor=cursor, approved=approved
+    )
+    response = ResourceLeaseResponse(
+        items=[ResourceResponse.model_validate(item) for item in items],
+        next_cursor=next_cursor,
+        lease_expires_at=expires_at
+    )
+    db.commit()
+    return response
+
+
+@router.post("/moderation/{item_type}/release", response_model=dict)
+def release_moderation_leases(
+    release: LeaseReleaseRequest,
+    item_type: str = Path(..., pattern="^(posts|resources)$"),
+    admin: Admin = Depends(check_admin),
+    db: Session = Depends(get_db)
+):
+    """Return leased items to the queue without moderating them"""
+    model = Post if item_type == "posts" else Resource
+    released = release_leases(db, model, release.ids, admin_user_id=admin.user_id)
     db.commit()
+    return {"released": released}
+
+
+@router.get("/background-jobs", response_model=list[BackgroundJobResponse])
+def list_background_jobs(
+    kind: Optional[str] = Query(None, description="e.g. user_import, account_deletion"),
+    job_status: Optional[str] = Query(None, alias="status", pattern="^(pending|running|done|failed)$"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    admin: Admin = Depends(check_admin),
+    db: Session = Depends(get_db)
+):
+    """List tracked background tasks (imports, account deletions), newest first"""
+    query = db.query(BackgroundJob)
+    if kind:
+        query = query.filter(BackgroundJob.kind == kind)
+    if job_status:
+        query = query.filter(BackgroundJob.status == job_status)
+    return query.order_by(BackgroundJob.id.desc()).offset(skip).limit(limit).all()
+
+
+@router.get("/background-jobs/{job_id}", response_model=BackgroundJobResponse)
+def get_background_job(
+    job_id: int,
+    admin: Admin = Depends(check_admin),
+    db: Session = Depends(get_db)
+):
+    """Get the status and progress of a tracked background task"""
+    job = db.query(BackgroundJob).filter(BackgroundJob.id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Background job not found"
+        )
+    return job
+
+
+@router.get("/screening/rules", response_model=list[ScreeningRuleResponse])
+def list_screening_rules(
+    admin: Admin = Depends(check_admin),
+    db: Session = Depends(get_db)
+):
+    """List banned terms and links used by automated content screening"""
+    return db.query(ScreeningRule).order_by(ScreeningRule.id).all()
+
+
+@router.post("/screening/rules", response_model=ScreeningRuleResponse, status_code=status.HTTP_201_CREATED)
+def create_screening_rule(
+    rule_data: ScreeningRuleCreate,
+    admin: Admin = Depends(check_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Add a banned term (matched as a whole word) or link (matched anywhere).
+    `unapprove` hides matching content until an admin approves it; `flag` only records a flag.
+    """
+    pattern = rule_data.pattern.strip().lower()
+    if db.query(ScreeningRule).filter(ScreeningRule.pattern == pattern).first():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Rule already exists"
+        )
+    rule = ScreeningRule(pattern=pattern, kind=rule_data.kind, action=rule_data.action, created_by=admin.user_id)
+    db.add(rule)
+    db.commit()
+    db.refresh(rule)
+    rule_set.invalidate()
+    return rule
+
+
+@router.delete("/screening/rules/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_screening_rule(
+    rule_id: int,
+    admin: Admin = Depends(check_admin),
+    db: Session = Depends(get_db)
+):
+    """Remove a screening rule"""
+    rule = db.query(ScreeningRule).filter(ScreeningRule.id == rule_id).first()
+    if not rule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Rule not found"
+        )
+    db.delete(rule)
+    db.commit()
+    rule_set.invalidate()
+    return None
+
+
+@router.get("/screening/flags", response_model=list[ContentFlagResponse])
+def list_content_flags(
+    item_type: Optional[str] = Query(None, pattern="^(post|resource)$"),
+    reason: Optional[str] = Query(None, pattern="^(term|link|duplicate|spam)$"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    admin: Admin = Depends(check_admin),
+    db: Session = Depends(get_db)
+):
+    """List automated screening flags, newest first"""
+    query = db.query(ContentFlag)
+    if item_type:
+        query = query.filter(ContentFlag.item_type == item_type)
+    if reason:
+        query = query.filter(ContentFlag.reason == reason)
+    return query.order_by(ContentFlag.id.desc()).offset(skip).limit(limit).all()
+
+
+@router.post("/leaderboard/recalculate", response_model=dict)
+def recalculate_leaderboard(
+    admin: Admin = Depends(check_admin),
+    db: Session = Depends(get_db),
+    dry_run: bool = Query(False, description="Report differences without writing"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=10000)
+):
+    """Recount resources/posts and recalculate leaderboard points for all users"""
+    result = recalculate_leaderboard_entries(db, chunk_size=chunk_size, dry_run=dry_run)
+    if not dry_run:
+        ranked_leaderboard.load(db)
     
     return {
-        "message": "Leaderboard recalculated successfully",
-        "updated_entries": updated_count
+        "message": "Leaderboard dry run completed" if dry_run else "Leaderboard recalculated successfully",
+        "updated_entries": 0 if dry_run else result["changed_entries"],
+        **result
     }
 
 
+@router.post("/leaderboard/rollups/rebuild", response_model=dict)
+def rebuild_leaderboard_rollups(
+    admin: Admin = Depends(check_admin),
+    db: Session = Depends(get_db)
+):
+    """Rebuild daily contribution rollups (used by windowed leaderboards) from posts and resources"""
+    rows = rebuild_contribution_rollups(db)
+    windowed_cache.clear()
+    return {"message": "Contribution rollups rebuilt", "rollup_rows": rows}
+
+
+@router.get("/leaderboard/consistency", response_model=dict)
+def check_leaderboard_consistency(
+    admin: Admin = Depends(check_admin),
+    db: Session = Depends(get_db),
+    repair: bool = Query(False, description="Rebuild the in-memory index if it has drifted")
+):
+    """Compare the in-memory ranked leaderboard with the database"""
+    report = ranked_leaderboard.check_consistency(db)
+    if repair and not report["in_sync"]:
+        ranked_leaderboard.load(db)
+        report["repaired"] = True
+    return report
+
+
+@router.get("/jobs", response_model=list[dict])
+def list_background_jobs(
+    admin: Admin = Depends(check_admin)
+):
+    """List scheduled background jobs with their run history (cluster-wide jobs: across all workers)"""
+    return list_jobs()
+
+
+@router.post("/jobs/{job_id}/run", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
+def run_background_job(
+    job_id: str,
+    admin: Admin = Depends(check_admin)
+):
+    """Trigger a background job to run now (still subject to the cluster-wide lock)"""
+    if not trigger_job(job_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return {"message": "Job triggered", "job_id": job_id}
+
+
+@router.get("/storage/metrics", response_model=dict)
+def get_storage_metrics(
+    admin: Admin = Depends(check_admin)
+):
+    """S3 signing latency and presigned download URL cache hit rate for this worker"""
+    return storage_metrics()
+
+
+@router.post("/storage/gc", response_model=BackgroundJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def collect_orphaned_files(
+    background_tasks: BackgroundTasks,
+    dry_run: bool = Query(True, description="Only report what would be deleted"),
+    grace_hours: Optional[int] = Query(None, ge=1, description="Minimum age of deleted files (default: ORPHAN_GRACE_HOURS)"),
+    admin: Admin = Depends(check_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Find uploaded files no post or resource references and, unless dry_run,
+    delete them. Runs in the background; poll GET /admin/storage/gc/{job_id}
+    for the report (counts, bytes and a sample of orphaned keys).
+    """
+    job = create_job(db, GC_JOB_KIND, created_by=admin.user_id)
+    background_tasks.add_task(run_gc_job, job.id, dry_run, grace_hours)
+    return job
+
+
+@router.get("/storage/gc/{job_id}", response_model=BackgroundJobResponse)
+def get_orphan_collection(
+    job_id: int,
+    admin: Admin = Depends(check_admin),
+    db: Session = Depends(get_db)
+):
+    """Get the status and report of an orphaned file collection"""
+    job = db.query(BackgroundJob).filter(
+        BackgroundJob.id == job_id,
+        BackgroundJob.kind == GC_JOB_KIND
+    ).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Collection job not found"
+        )
+    return job
+
+
+@router.get("/export/{dataset}")
+def export_dataset(
+    dataset: str = Path(..., pattern="^(users|posts|resources|chats)$"),
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = Query(False, description="Compress the stream with gzip"),
+    created_after: Optional[datetime] = Query(None),
+    created_before: Optional[datetime] = Query(None),
+    approved: Optional[bool] = Query(None, description="Posts/resources only: filter by approval status"),
+    admin: Admin = Depends(check_admin)
+):
+    """Stream a full dataset as CSV or NDJSON (constant memory, server-side cursor)"""
+    stmt = export.build_query(
+        dataset,
+        created_after=created_after,
+        created_before=created_before,
+        approved=approved
+    )
+    chunks = export.encode(format, export.column_names(dataset), export.stream_rows(stmt))
+    filename = f"{dataset}-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{format}"
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    if gzip:
+        chunks = export.gzip_chunks(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.post("/import/users", response_model=BackgroundJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def import_users(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(..., description="CSV with email, full_name, password, role and profile columns"),
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=100, le=5000),
+    admin: Admin = Depends(check_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk-import mentors and mentees from a CSV file
+
+    The upload is spooled to disk and imported in the background; poll
+    GET /admin/import/{job_id} for progress. Existing emails are skipped, so
+    the same file can be re-submitted after a failure.
+    """
+    fd, path = tempfile.mkstemp(prefix="user-import-", suffix=".csv")
+    with os.fdopen(fd, "wb") as out:
+        shutil.copyfileobj(file.file, out, 1024 * 1024)
+    job = create_job(db, IMPORT_JOB_KIND, created_by=admin.user_id)
+    background_tasks.add_task(run_import_job, job.id, path, batch_size)
+    return job
+
+
+@router.get("/import/{job_id}", response_model=BackgroundJobResponse)
+def get_import_status(
+    job_id: int,
+    admin: Admin = Depends(check_admin),
+    db: Session = Depends(get_db)
+):
+    """Get the status, progress and result summary of a user import"""
+    job = db.query(BackgroundJob).filter(
+        BackgroundJob.id == job_id,
+        BackgroundJob.kind == IMPORT_JOB_KIND
+    ).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Import job not found"
+        )
+    return job
+
+
 @router.post("/db/install", response_model=dict)
 def install_admin_triggers_and_procedures(
     admin: Admin = Depends(check_admin),
@@ -301,105 +725,29 @@ def install_admin_triggers_and_procedures(
       END IF;
     END;
     """)
-    statements.append("""
-    DROP TRIGGER IF EXISTS trg_resources_ai;
-    """)
-    statements.append("""
-    CREATE TRIGGER trg_resources_ai AFTER INSERT ON resources
-    FOR EACH ROW
-    BEGIN
-      INSERT INTO leaderboard (user_id, total_resources, total_posts, package, points)
-      VALUES (
-        NEW.user_id, 1, 0,
-        COALESCE((SELECT package FROM mentors WHERE user_id = NEW.user_id), 0),
-        10
-      )
-      ON DUPLICATE KEY UPDATE
-        total_resources = total_resources + 1,
-        points = (total_resources*10 + total_posts*5 + package*2);
-    END;
-    """)
-    statements.append("""
-    DROP TRIGGER IF EXISTS trg_resources_ad;
-    """)
-    statements.append("""
-    CREATE TRIGGER trg_resources_ad AFTER DELETE ON resources
-    FOR EACH ROW
-    BEGIN
-      UPDATE leaderboard
-        SET total_resources = GREATEST(total_resources - 1, 0),
-            points = (total_resources*10 + total_posts*5 + package*2)
-      WHERE user_id = OLD.user_id;
-    END;
-    """)
-    statements.append("""
-    DROP TRIGGER IF EXISTS trg_posts_ai;
-    """)
-    statements.append("""
-    CREATE TRIGGER trg_posts_ai AFTER INSERT ON posts
-    FOR EACH ROW
-    BEGIN
-      INSERT INTO leaderboard (user_id, total_posts, total_resources, package, points)
-      VALUES (
-        NEW.user_id, 1, 0,
-        COALESCE((SELECT package FROM mentors WHERE user_id = NEW.user_id), 0),
-        5
-      )
-      ON DUPLICATE KEY UPDATE
-        total_posts = total_posts + 1,
-        points = (total_resources*10 + total_posts*5 + package*2);
-    END;
-    """)
-    statements.append("""
-    DROP TRIGGER IF EXISTS trg_posts_ad;
-    """)
-    statements.append("""
-    CREATE TRIGGER trg_posts_ad AFTER DELETE ON posts
-    FOR EACH ROW
-    BEGIN
-      UPDATE leaderboard
-        SET total_posts = GREATEST(total_posts - 1, 0),
-            points = (total_resources*10 + total_posts*5 + package*2)
-      WHERE user_id = OLD.user_id;
-    END;
-    """)
-    statements.append("""
-    DROP TRIGGER IF EXISTS trg_mentors_au;
-    """)
-    statements.append("""
-    CREATE TRIGGER trg_mentors_au AFTER UPDATE ON mentors
-    FOR EACH ROW
-    BEGIN
-      IF NEW.package <> OLD.package THEN
-        UPDATE leaderboard
-          SET package = NEW.package,
-              points = (total_resources*10 + total_posts*5 + NEW.package*2)
-        WHERE user_id = NEW.user_id;
-      END IF;
-    END;
-    """)
+    # Leaderboard counters are maintained by app.utils.scoring in the same
+    # transaction as the content write. Migration 7 drops the old triggers on
+    # deploy; dropped here too so they are never reinstalled by this endpoint.
+    for trigger in ("trg_resources_ai", "trg_resources_ad", "trg_posts_ai", "trg_posts_ad", "trg_mentors_au"):
+        statements.append(f"DROP TRIGGER IF EXISTS {trigger};")
     statements.append("""
     DROP PROCEDURE IF EXISTS sp_recalc_leaderboard;
     """)
-    statements.append("""
+    w = weights()
+    statements.append(f"""
     CREATE PROCEDURE sp_recalc_leaderboard()
     BEGIN
-      DECLARE done INT DEFAULT 0;
-      DECLARE v_user_id INT;
-      DECLARE cur CURSOR FOR SELECT user_id FROM leaderboard;
-      DECLARE CONTINUE HANDLER FOR NOT FOUND SET done = 1;
-      OPEN cur;
-      read_loop: LOOP
-        FETCH cur INTO v_user_id;
-        IF done = 1 THEN LEAVE read_loop; END IF;
-        UPDATE leaderboard lb
-        SET lb.total_resources = (SELECT COUNT(*) FROM resources r WHERE r.user_id = v_user_id),
-            lb.total_posts = (SELECT COUNT(*) FROM posts p WHERE p.user_id = v_user_id),
-            lb.package = COALESCE((SELECT m.package FROM mentors m WHERE m.user_id = v_user_id), 0),
-            lb.points = (lb.total_resources*10 + lb.total_posts*5 + lb.package*2)
-        WHERE lb.user_id = v_user_id;
-      END LOOP;
-      CLOSE cur;
+      UPDATE leaderboard lb
+      LEFT JOIN (SELECT user_id, COUNT(*) AS cnt FROM resources GROUP BY user_id) r
+        ON r.user_id = lb.user_id
+      LEFT JOIN (SELECT user_id, COUNT(*) AS cnt FROM posts GROUP BY user_id) p
+        ON p.user_id = lb.user_id
+      LEFT JOIN mentors m ON m.user_id = lb.user_id
+      SET lb.total_resources = COALESCE(r.cnt, 0),
+          lb.total_posts = COALESCE(p.cnt, 0),
+          lb.package = COALESCE(m.package, 0),
+          lb.points = COALESCE(r.cnt, 0)*{w["w_resource"]} + COALESCE(p.cnt, 0)*{w["w_post"]}
+                    + COALESCE(m.package, 0)*{w["w_package"]};
     END;
     """)
 
@@ -416,16 +764,4 @@ def get_admin_stats(
     db: Session = Depends(get_db)
 ):
     """Get counts for mentors, mentees, posts, resources and pending mentors"""
-    mentors_count = db.query(Mentor).count()
-    mentees_count = db.query(Mentee).count()
-    pending_mentors = db.query(Mentor).filter(Mentor.verified == False).count()
-    resources_count = db.query(Resource).count()
-    posts_count = db.query(Post).count()
-    return {
-        "mentors": mentors_count,
-        "mentees": mentees_count,
-        "pending_mentors": pending_mentors,
-        "resources": resources_count,
-        "posts": posts_count,
-    }
-
+    return stats.get_stats(db)
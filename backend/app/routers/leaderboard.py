@@ -1,27 +1,133 @@
-from fastapi import APIRouter, Depends, Query
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import bindparam
 from sqlalchemy.orm import Session
 from app.db import get_db
-from app.schemas.leaderboard import LeaderboardResponse
+from app.models.user import User
+from app.models.leaderboard import Leaderboard
+from app.models.mentor import Branch
+from app.schemas.leaderboard import LeaderboardResponse, LeaderboardRankResponse, MyRankResponse
+from app.schemas.user import UserResponse
+from app.utils.leaderboard import windowed_leaderboard, windowed_cache
+from app.utils.auth import get_current_active_user
+from app.utils.projection import Projection
+from app.utils.ranking import ranked_leaderboard, RANKING_METHODS, COMPETITION
 
 router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
 
+RANKING_PATTERN = "^(" + "|".join(RANKING_METHODS) + ")$"
+
+entry_projection = Projection(LeaderboardResponse, Leaderboard)
+
+def _load_entries(db: Session, ranked: list) -> list:
+    """Fetch leaderboard entries (dicts) for (user_id, points, rank) tuples, preserving order"""
+    user_ids = [user_id for user_id, _, _ in ranked]
+    if not user_ids:
+        return []
+    stmt = entry_projection.statement("user_ids", lambda base: (
+        base.where(Leaderboard.user_id.in_(bindparam("user_ids", expanding=True)))
+    ))
+    by_user = {row["user_id"]: row for row in entry_projection.records(db, stmt, user_ids=user_ids)}
+    return [(by_user[user_id], rank) for user_id, _, rank in ranked if user_id in by_user]
+
+
+def _windowed_entries(db: Session, window: Optional[str], branch: Optional[Branch], skip: int, limit: int) -> list:
+    """Windowed/per-branch leaderboard page, served from cache when fresh"""
+    key = (window, branch.value if branch else None, skip, limit)
+    cached = windowed_cache.get(key)
+    if cached is not None:
+        return cached
+    rows = windowed_leaderboard(db, window=window, branch=key[1], skip=skip, limit=limit)
+    users = {}
+    if rows:
+        users = {
+            user.id: UserResponse.model_validate(user).model_dump()
+            for user in db.query(User).filter(User.id.in_([row["user_id"] for row in rows])).all()
+        }
+    entries = [{**row, "user": users[row["user_id"]]} for row in rows if row["user_id"] in users]
+    windowed_cache.set(key, entries)
+    return entries
+
 
 @router.get("", response_model=list[LeaderboardResponse])
 def get_leaderboard(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    window: Optional[str] = Query(None, pattern="^(week|month)$", description="Only count this week's/month's contributions"),
+    branch: Optional[Branch] = Query(None, description="Only include mentors from this branch"),
     db: Session = Depends(get_db)
 ):
     """
-    Get leaderboard sorted by points (descending).
+    Get leaderboard sorted by points (descending), ties broken by user id.
     Points formula: total_resources*10 + total_posts*5 + package*2
+
+    With `window`, totals and points cover only the current week/month and
+    exclude package. With `branch`, only mentors of that branch are listed.
     """
-    from app.models.leaderboard import Leaderboard
-    
-    # Get all leaderboard entries sorted by points
-    entries = db.query(Leaderboard).order_by(
-        Leaderboard.points.desc()
-    ).offset(skip).limit(limit).all()
-    
-    return entries
+    if window or branch:
+        return _windowed_entries(db, window, branch, skip, limit)
+
+    if not ranked_leaderboard.loaded:
+        # Index not built yet (e.g. DB was down at startup) - fall back to SQL
+        stmt = entry_projection.statement("page", lambda base: (
+            base.order_by(Leaderboard.points.desc(), Leaderboard.user_id.asc())
+            .offset(bindparam("skip"))
+            .limit(bindparam("limit"))
+        ))
+        return entry_projection.records(db, stmt, skip=skip, limit=limit)
+
+    return [entry for entry, _ in _load_entries(db, ranked_leaderboard.page(skip, limit))]
+
 
+@router.get("/ranked", response_model=list[LeaderboardRankResponse])
+def get_ranked_leaderboard(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    ranking: str = Query(COMPETITION, pattern=RANKING_PATTERN, description="competition or dense"),
+    db: Session = Depends(get_db)
+):
+    """Get a page of the leaderboard with each entry's rank"""
+    return [
+        {**entry, "rank": rank}
+        for entry, rank in _load_entries(db, ranked_leaderboard.page(skip, limit, ranking))
+    ]
+
+
+@router.get("/me", response_model=MyRankResponse)
+def get_my_rank(
+    ranking: str = Query(COMPETITION, pattern=RANKING_PATTERN, description="competition or dense"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get the current user's rank"""
+    rank = ranked_leaderboard.rank(current_user.id, ranking)
+    if rank is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No leaderboard entry for current user"
+        )
+    return MyRankResponse(
+        user_id=current_user.id,
+        points=ranked_leaderboard.points_of(current_user.id),
+        rank=rank,
+        total_entries=len(ranked_leaderboard)
+    )
+
+
+@router.get("/around-me", response_model=list[LeaderboardRankResponse])
+def get_users_around_me(
+    radius: int = Query(5, ge=1, le=50),
+    ranking: str = Query(COMPETITION, pattern=RANKING_PATTERN, description="competition or dense"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get the users ranked immediately above and below the current user"""
+    ranked = ranked_leaderboard.around(current_user.id, radius, ranking)
+    if not ranked:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No leaderboard entry for current user"
+        )
+    return [
+        {**entry, "rank": rank}
+        for entry, rank in _load_entries(db, ranked)
+    ]
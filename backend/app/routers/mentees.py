@@ -5,6 +5,7 @@ from app.models.user import User, UserRole
 from app.models.mentee import Mentee
 from app.schemas.mentee import MenteeCreate, MenteeResponse, MenteeUpdate
 from app.utils.auth import get_current_active_user
+from app.utils import stats
 
 router = APIRouter(prefix="/mentees", tags=["mentees"])
 
@@ -33,6 +34,7 @@ def create_mentee(
         **mentee_data.model_dump()
     )
     db.add(new_mentee)
+    stats.increment(db, mentees=1)
     db.commit()
     db.refresh(new_mentee)
     
@@ -1,17 +1,30 @@
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import bindparam
 from app.db import get_db
 from app.models.user import User, UserRole
 from app.models.mentor import Mentor, Branch
 from app.schemas.mentor import MentorCreate, MentorResponse, MentorListResponse, MentorUpdate
 from app.utils.auth import get_current_active_user
+from app.utils import stats
+from app.utils.outbox import enqueue
+from app.utils.projection import Projection
+from app.utils.scoring import set_package, sync_rank
 from app.models.resource import Resource
 from app.schemas.resource import ResourceListResponse
 
 router = APIRouter(prefix="/mentors", tags=["mentors"])
 
+list_projection = Projection(MentorListResponse, Mentor)
+
+
+def _filtered_list(base, filters: tuple):
+    """List statement applying the named filters, all values bound as parameters"""
+    for name in filters:
+        base = base.where(getattr(Mentor, name) == bindparam(name))
+    return base.offset(bindparam("skip")).limit(bindparam("limit"))
+
 
 @router.get("", response_model=list[MentorListResponse])
 def list_mentors(
@@ -23,23 +36,19 @@ def list_mentors(
     db: Session = Depends(get_db)
 ):
     """List mentors with optional filters and pagination"""
-    query = db.query(Mentor).join(User)
-    
     # Apply filters
-    filters = []
+    params = {"skip": skip, "limit": limit}
     if branch:
-        filters.append(Mentor.branch == branch)
+        params["branch"] = branch
     if graduation_year:
-        filters.append(Mentor.graduation_year == graduation_year)
+        params["graduation_year"] = graduation_year
     if verified is not None:
-        filters.append(Mentor.verified == verified)
-    
-    if filters:
-        query = query.filter(and_(*filters))
+        params["verified"] = verified
     
-    # Pagination
-    mentors = query.offset(skip).limit(limit).all()
-    return mentors
+    # One cached statement per combination of filters
+    filters = tuple(name for name in ("branch", "graduation_year", "verified") if name in params)
+    stmt = list_projection.statement(filters, lambda base: _filtered_list(base, filters))
+    return list_projection.records(db, stmt, **params)
 
 
 @router.post("", response_model=MentorResponse, status_code=status.HTTP_201_CREATED)
@@ -66,21 +75,14 @@ def create_mentor(
         **mentor_data.model_dump()
     )
     db.add(new_mentor)
+    db.flush()
+    set_package(db, current_user.id, new_mentor.package)
+    stats.increment(db, mentors=1, pending_mentors=0 if new_mentor.verified else 1)
+    # Admins are notified for verification by the outbox dispatcher
+    enqueue(db, "mentor.created", {"user_id": current_user.id, "full_name": current_user.full_name})
     db.commit()
     db.refresh(new_mentor)
-    
-    # Notify admins for verification via chat message
-    from app.models.admin import Admin
-    from app.models.chat import Chat
-    admins = db.query(Admin).all()
-    for admin in admins:
-        db.add(Chat(
-            sender_id=current_user.id,
-            receiver_id=admin.user_id,
-            message=f"New mentor {current_user.full_name} requires verification"
-        ))
-    if admins:
-        db.commit()
+    sync_rank(db, current_user.id)
     
     return new_mentor
 
@@ -164,8 +166,12 @@ def update_mentor_profile(
     update_data = mentor_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(mentor, field, value)
+    if "package" in update_data:
+        set_package(db, current_user.id, mentor.package)
     
     db.commit()
     db.refresh(mentor)
+    if "package" in update_data:
+        sync_rank(db, current_user.id)
     return mentor
 
@@ -1,14 +1,22 @@
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import bindparam
 from sqlalchemy.orm import Session
 from app.db import get_db
 from app.models.user import User
 from app.models.post import Post
 from app.schemas.post import PostCreate, PostResponse, PostListResponse
+from app.utils import stats
+from app.utils.dedup import owned_file_key, retain_file
+from app.utils.outbox import enqueue
+from app.utils.projection import Projection
+from app.utils.scoring import apply_delta, sync_rank
 from app.utils.auth import get_current_active_user
 
 router = APIRouter(prefix="/posts", tags=["posts"])
 
+feed_projection = Projection(PostListResponse, Post)
+
 
 @router.get("", response_model=list[PostListResponse])
 def list_posts(
@@ -17,8 +25,13 @@ def list_posts(
     db: Session = Depends(get_db)
 ):
     """List posts with pagination. Only shows approved content."""
-    posts = db.query(Post).filter(Post.is_approved == True).order_by(Post.created_at.desc()).offset(skip).limit(limit).all()
-    return posts
+    stmt = feed_projection.statement("feed", lambda base: (
+        base.where(Post.is_approved == True)
+        .order_by(Post.created_at.desc())
+        .offset(bindparam("skip"))
+        .limit(bindparam("limit"))
+    ))
+    return feed_projection.records(db, stmt, skip=skip, limit=limit)
 
 
 @router.post("", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
@@ -28,42 +41,32 @@ def create_post(
     db: Session = Depends(get_db)
 ):
     """Create a new post"""
+    try:
+        file_key = owned_file_key(db, current_user.id, post_data.media_url, "post")
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     new_post = Post(
         user_id=current_user.id,
+        media_key=file_key,
         **post_data.model_dump()
     )
     db.add(new_post)
-    db.commit()
-    db.refresh(new_post)
+    db.flush()
     
-    # Update leaderboard (increment total_posts)
-    from app.models.leaderboard import Leaderboard
-    leaderboard = db.query(Leaderboard).filter(Leaderboard.user_id == current_user.id).first()
-    if leaderboard:
-        leaderboard.total_posts += 1
-        # Recalculate points: total_resources*10 + total_posts*5 + package*2
-        leaderboard.points = (
-            leaderboard.total_resources * 10 +
-            leaderboard.total_posts * 5 +
-            leaderboard.package * 2
-        )
-    else:
-        # Get package from mentor profile if exists
-        package = 0
-        from app.models.mentor import Mentor
-        mentor = db.query(Mentor).filter(Mentor.user_id == current_user.id).first()
-        if mentor:
-            package = mentor.package
-        
-        leaderboard = Leaderboard(
-            user_id=current_user.id,
-            total_posts=1,
-            total_resources=0,
-            package=package,
-            points=5  # 1 post * 5
-        )
-        db.add(leaderboard)
+    # Update leaderboard in the same transaction (increment total_posts)
+    apply_delta(db, current_user.id, posts=1)
+    stats.increment(db, posts=1)
+    # Screened after commit by the outbox dispatcher
+    enqueue(db, "content.created", {"item_type": "post", "item_id": new_post.id})
+    if new_post.media_key:
+        retain_file(db, new_post.media_key)
+        enqueue(db, "media.uploaded", {"file_key": new_post.media_key})
     db.commit()
+    db.refresh(new_post)
+    sync_rank(db, current_user.id)
     
     return new_post
 
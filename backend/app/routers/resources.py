@@ -1,16 +1,38 @@
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session, selectinload
-from sqlalchemy import func, or_, text
+from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, func, or_
 from app.schemas.resource import ResourceMentorSummary
 from app.db import get_db
 from app.models.user import User, UserRole
 from app.models.resource import Resource
 from app.schemas.resource import ResourceCreate, ResourceResponse, ResourceListResponse
+from app.utils import stats
+from app.utils.dedup import owned_file_key, release_item_files, retain_file
+from app.utils.outbox import enqueue
+from app.utils.projection import Projection
+from app.utils.scoring import apply_delta, sync_rank
 from app.utils.auth import get_current_active_user, get_current_user_optional
 
 router = APIRouter(prefix="/resources", tags=["resources"])
 
+list_projection = Projection(ResourceListResponse, Resource)
+
+
+def _filtered_list(base, filters: tuple):
+    """List statement applying the named filters, all values bound as parameters"""
+    if "viewer_id" in filters:
+        stmt = base.where(or_(Resource.is_approved == True, Resource.user_id == bindparam("viewer_id")))
+    else:
+        stmt = base.where(Resource.is_approved == True)
+    if "category" in filters:
+        stmt = stmt.where(Resource.category == bindparam("category"))
+    if "resource_type" in filters:
+        stmt = stmt.where(Resource.resource_type == bindparam("resource_type"))
+    if "user_id" in filters:
+        stmt = stmt.where(Resource.user_id == bindparam("user_id"))
+    return stmt.order_by(Resource.created_at.desc()).offset(bindparam("skip")).limit(bindparam("limit"))
+
 
 @router.get("", response_model=list[ResourceListResponse])
 def list_resources(
@@ -25,31 +47,13 @@ def list_resources(
     """List resources with optional filters and pagination. Only shows approved content."""
     from app.models.resource import ResourceType
     
-    try:
-        db.execute(text("""
-            UPDATE resources SET resource_type='OTHER' WHERE resource_type IN ('Other','other');
-        """))
-        db.execute(text("""
-            UPDATE resources SET resource_type='STUDY_MATERIAL' WHERE resource_type IN ('Study Material','study material');
-        """))
-        db.execute(text("""
-            UPDATE resources SET resource_type='PREPARATION_GUIDE' WHERE resource_type IN ('Preparation Guide','preparation guide');
-        """))
-        db.execute(text("""
-            UPDATE resources SET resource_type='EXPERIENCE' WHERE resource_type IN ('Experience','experience');
-        """))
-        db.commit()
-    except Exception:
-        db.rollback()
-
-    query = db.query(Resource).options(selectinload(Resource.user))
+    # Approved resources, plus the caller's own pending ones
+    params = {"skip": skip, "limit": limit}
     if current_user_opt:
-        query = query.filter(or_(Resource.is_approved == True, Resource.user_id == current_user_opt.id))
-    else:
-        query = query.filter(Resource.is_approved == True)
+        params["viewer_id"] = current_user_opt.id
     
     if category:
-        query = query.filter(Resource.category == category)
+        params["category"] = category
     
     if resource_type:
         # Accept both enum values and token names
@@ -67,13 +71,15 @@ def list_resources(
             except ValueError:
                 resource_type_enum = None
         if resource_type_enum:
-            query = query.filter(Resource.resource_type == resource_type_enum)
+            params["resource_type"] = resource_type_enum
     
     if user_id:
-        query = query.filter(Resource.user_id == user_id)
+        params["user_id"] = user_id
     
-    resources = query.order_by(Resource.created_at.desc()).offset(skip).limit(limit).all()
-    return resources
+    # One cached statement per combination of filters
+    filters = tuple(name for name in ("viewer_id", "category", "resource_type", "user_id") if name in params)
+    stmt = list_projection.statement(filters, lambda base: _filtered_list(base, filters))
+    return list_projection.records(db, stmt, **params)
 
 
 @router.get("/mentors", response_model=list[ResourceMentorSummary])
@@ -129,48 +135,38 @@ def create_resource(
     category = (resource_data.category or None)
     if category:
         category = category.strip()[:100] or None
+    try:
+        file_key = owned_file_key(db, current_user.id, file_url, "resource")
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
     new_resource = Resource(
         user_id=current_user.id,
         title=title,
         description=description,
         file_url=file_url,
+        file_key=file_key,
         resource_type=rt_enum,
         category=category,
         is_approved=True,
     )
     db.add(new_resource)
-    db.commit()
-    db.refresh(new_resource)
+    db.flush()
     
-    # Update leaderboard (increment total_resources)
-    from app.models.leaderboard import Leaderboard
-    leaderboard = db.query(Leaderboard).filter(Leaderboard.user_id == current_user.id).first()
-    if leaderboard:
-        leaderboard.total_resources += 1
-        # Recalculate points: total_resources*10 + total_posts*5 + package*2
-        leaderboard.points = (
-            leaderboard.total_resources * 10 +
-            leaderboard.total_posts * 5 +
-            leaderboard.package * 2
-        )
-    else:
-        # Get package from mentor profile if exists
-        package = 0
-        from app.models.mentor import Mentor
-        mentor = db.query(Mentor).filter(Mentor.user_id == current_user.id).first()
-        if mentor:
-            package = mentor.package
-        
-        leaderboard = Leaderboard(
-            user_id=current_user.id,
-            total_resources=1,
-            total_posts=0,
-            package=package,
-            points=10  # 1 resource * 10
-        )
-        db.add(leaderboard)
+    # Update leaderboard in the same transaction (increment total_resources)
+    apply_delta(db, current_user.id, resources=1)
+    stats.increment(db, resources=1)
+    # Screened after commit by the outbox dispatcher
+    enqueue(db, "content.created", {"item_type": "resource", "item_id": new_resource.id})
+    if new_resource.file_key:
+        retain_file(db, new_resource.file_key)
+        enqueue(db, "media.uploaded", {"file_key": new_resource.file_key})
     db.commit()
+    db.refresh(new_resource)
+    sync_rank(db, current_user.id)
     
     return new_resource
 
@@ -182,7 +178,8 @@ def delete_resource(
     db: Session = Depends(get_db)
 ):
     """Delete a resource (only by owner)"""
-    resource = db.query(Resource).filter(Resource.id == resource_id).first()
+    # Locked: a concurrent delete of the same resource waits, then finds it gone
+    resource = db.query(Resource).filter(Resource.id == resource_id).with_for_update().first()
     if not resource:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -195,21 +192,21 @@ def delete_resource(
             detail="Not authorized to delete this resource"
         )
     
-    # Update leaderboard (decrement total_resources)
-    from app.models.leaderboard import Leaderboard
-    leaderboard = db.query(Leaderboard).filter(Leaderboard.user_id == current_user.id).first()
-    if leaderboard:
-        leaderboard.total_resources = max(0, leaderboard.total_resources - 1)
-        # Recalculate points
-        leaderboard.points = (
-            leaderboard.total_resources * 10 +
-            leaderboard.total_posts * 5 +
-            leaderboard.package * 2
+    release_item_files(db, Resource, [resource.id])
+    if db.query(Resource).filter(Resource.id == resource.id).delete(synchronize_session=False) != 1:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Resource not found"
         )
-        db.commit()
-    
-    db.delete(resource)
+    # Update leaderboard in the same transaction (decrement total_resources)
+    apply_delta(
+        db, current_user.id, resources=-1,
+        day=resource.created_at.date() if resource.created_at else None
+    )
+    stats.increment(db, resources=-1)
     db.commit()
+    sync_rank(db, current_user.id)
     
     return None
 
@@ -1,93 +1,598 @@
 """
-File Upload Router - Presigned URL generation for S3
+File Upload Router - Presigned URL generation for S3 or local storage
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel
-from typing import Optional
+import logging
+import uuid
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, status
+from fastapi.responses import Response
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple, Union
+from app.config import settings
+from app.db import get_db
 from app.utils.auth import get_current_active_user
-from app.models.user import User
-from app.utils.storage import generate_presigned_upload_url, generate_presigned_download_url
+from app.models.user import User, UserRole
+from app.models.post import Post
+from app.models.resource import Resource
+from app.models.upload import ContentObject, MultipartUpload
+from app.utils.dedup import claim_object, is_content_key
+from app.utils.local_storage import MULTIPART_DIR, ChecksumMismatch, InvalidFileKey, file_response, verify_signature
+from app.utils.multipart import MAX_FILE_SIZE, MAX_PARTS, choose_part_size, part_count
+from app.utils.storage import get_storage
+from app.utils.upload_quota import QuotaExceeded, reserve
+
+logger = logging.getLogger("app.upload")
 
 router = APIRouter(prefix="/upload", tags=["upload"])
 
 
+SHA256_PATTERN = "^[0-9a-fA-F]{64}$"
+
+
 class UploadRequest(BaseModel):
     file_name: str
     content_type: str = "application/octet-stream"
     file_type: str = "resource"  # "resource" or "post"
+    size: int = Field(..., gt=0, le=MAX_FILE_SIZE, description="File size in bytes (the upload URL only accepts this size)")
+    sha256: Optional[str] = Field(None, pattern=SHA256_PATTERN, description="Hex SHA-256, to skip uploading known files")
 
 
 class UploadResponse(BaseModel):
+    upload_url: Optional[str]  # None when the file is already stored
+    file_key: str
+    download_url: str
+    exists: bool = False
+
+
+class UploadFileDescriptor(BaseModel):
+    file_name: str
+    content_type: str = "application/octet-stream"
+    file_type: str = Field("resource", pattern="^(resource|post)$")
+    size: int = Field(..., gt=0, le=MAX_FILE_SIZE, description="File size in bytes")
+    sha256: Optional[str] = Field(None, pattern=SHA256_PATTERN, description="Hex SHA-256, to skip uploading known files")
+
+
+class BatchUploadRequest(BaseModel):
+    files: List[UploadFileDescriptor] = Field(..., min_length=1)
+
+
+class BatchUploadItem(UploadResponse):
+    file_name: str
+    size: int
+
+
+class MultipartInitRequest(BaseModel):
+    file_name: str
+    content_type: str = "application/octet-stream"
+    file_type: str = Field("resource", pattern="^(resource|post)$")
+    size: int = Field(..., gt=0, le=MAX_FILE_SIZE, description="Total file size in bytes")
+    part_size: Optional[int] = Field(None, gt=0, description="Requested part size (at least 5 MiB)")
+
+
+class MultipartInitResponse(BaseModel):
+    upload_id: str
+    file_key: str
+    part_size: int
+    part_count: int
+    download_url: str
+
+
+class PartUrlsRequest(BaseModel):
+    part_numbers: List[int] = Field(..., min_length=1, max_length=1000)
+
+
+class PartUrl(BaseModel):
+    part_number: int
     upload_url: str
+
+
+class UploadedPart(BaseModel):
+    part_number: int
+    etag: str
+    size: Optional[int] = None
+
+
+class MultipartStatusResponse(BaseModel):
+    upload_id: str
+    file_key: str
+    status: str
+    size: int
+    part_size: int
+    part_count: int
+    parts: List[UploadedPart]
+
+
+class MultipartCompleteRequest(BaseModel):
+    # Omit to complete with the parts storage has received
+    parts: Optional[List[UploadedPart]] = None
+
+
+class MultipartCompleteResponse(BaseModel):
     file_key: str
     download_url: str
 
 
+def new_file_key(user_id: int, file_name: str, file_type: str) -> str:
+    """Unique storage key: {file_type}/{user_id}/{YYYYMMDD}/{uuid}.{ext}"""
+    timestamp = datetime.now().strftime("%Y%m%d")
+    file_extension = file_name.split('.')[-1] if '.' in file_name else ''
+    return f"{file_type}/{user_id}/{timestamp}/{uuid.uuid4()}.{file_extension}"
+
+
+def _reserve_quota(db: Session, user: User, files: int, size: int) -> None:
+    try:
+        reserve(db, user.id, files, size)
+    except QuotaExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e)
+        )
+
+
+def _resolve_upload(db: Session, user: User, file: Union[UploadRequest, UploadFileDescriptor]) -> Tuple[str, bool]:
+    """
+    Pick the file key for one file; returns (file_key, whether it is already stored)
+    
+    Files declared with a SHA-256 get a content-addressed key of the user's
+    own, already stored when the user uploaded a file with that hash before.
+    """
+    if not file.sha256:
+        # Generate unique file key
+        return new_file_key(user.id, file.file_name, file.file_type), False
+    try:
+        obj, exists = claim_object(db, user.id, file.sha256, file.size, file.file_name, file.file_type)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return obj.file_key, exists
+
+
+def _sign_upload(storage, file: Union[UploadRequest, UploadFileDescriptor], file_key: str, exists: bool) -> UploadResponse:
+    """Sign the upload URL (unless the file is already stored) and download URL for one file"""
+    upload_url = None
+    if not exists:
+        # Generate presigned upload URL
+        upload_url = storage.upload_url(
+            file_key=file_key,
+            content_type=file.content_type,
+            expiration=3600,  # 1 hour
+            size=file.size,
+            sha256=file.sha256.lower() if file.sha256 else None
+        )
+        if not upload_url:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to generate upload URL"
+            )
+    
+    return UploadResponse(
+        upload_url=upload_url,
+        file_key=file_key,
+        download_url=storage.download_url(file_key=file_key, expiration=86400 * 7),  # 7 days
+        exists=exists
+    )
+
+
 @router.post("/presigned-url", response_model=UploadResponse)
 def get_presigned_upload_url(
     upload_request: UploadRequest,
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
 ):
     """
-    Generate a presigned URL for uploading a file to S3
+    Generate a presigned URL for uploading a file (S3 or local storage)
+    
+    With sha256 declared, identical files a user uploads are stored once:
+    if the user already stored the file, exists is true, upload_url is null
+    and the upload is skipped. Otherwise storage only accepts a body with that hash
+    (on S3, send it base64-encoded in the x-amz-checksum-sha256 header).
     
     Returns:
         - upload_url: URL to upload the file (PUT request)
         - file_key: S3 object key to store in database
         - download_url: URL to download the file later
+        - exists: whether the file is already stored
+    
+    A file that gets an upload URL counts against the user's upload quota
+    (UPLOAD_QUOTA_*); 429 once it is used up.
     """
-    import uuid
-    from datetime import datetime
+    file_key, exists = _resolve_upload(db, current_user, upload_request)
+    if not exists:
+        _reserve_quota(db, current_user, 1, upload_request.size)
+    return _sign_upload(get_storage(), upload_request, file_key, exists)
+
+
+@router.post("/presigned-urls", response_model=List[BatchUploadItem])
+def get_presigned_upload_urls(
+    batch_request: BatchUploadRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Generate upload and download URLs for several files in one request
     
-    # Generate unique file key
-    timestamp = datetime.now().strftime("%Y%m%d")
-    file_extension = upload_request.file_name.split('.')[-1] if '.' in upload_request.file_name else ''
-    file_key = f"{upload_request.file_type}/{current_user.id}/{timestamp}/{uuid.uuid4()}.{file_extension}"
+    Each upload URL only accepts a body of the declared size (and SHA-256,
+    if declared; see POST /upload/presigned-url). At most
+    UPLOAD_BATCH_MAX_FILES files and UPLOAD_BATCH_MAX_BYTES in total are
+    accepted per request; larger files belong in a multipart upload. Files
+    that get an upload URL also count against the user's upload quota
+    (UPLOAD_QUOTA_*).
+    """
+    files = batch_request.files
+    if len(files) > settings.UPLOAD_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.UPLOAD_BATCH_MAX_FILES} files per request"
+        )
+    total_size = sum(f.size for f in files)
+    if total_size > settings.UPLOAD_BATCH_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Files total {total_size} bytes; at most {settings.UPLOAD_BATCH_MAX_BYTES} per request"
+        )
     
-    # Generate presigned upload URL
-    upload_url = generate_presigned_upload_url(
-        file_key=file_key,
-        content_type=upload_request.content_type,
-        expiration=3600  # 1 hour
+    resolved = [_resolve_upload(db, current_user, f) for f in files]
+    # Files already stored are skipped, so they do not use up the quota
+    uploads = [f for f, (_, exists) in zip(files, resolved) if not exists]
+    if uploads:
+        _reserve_quota(db, current_user, len(uploads), sum(f.size for f in uploads))
+    storage = get_storage()
+    return [
+        BatchUploadItem(
+            file_name=f.file_name,
+            size=f.size,
+            **_sign_upload(storage, f, file_key, exists).model_dump()
+        )
+        for f, (file_key, exists) in zip(files, resolved)
+    ]
+
+
+def _may_download(db: Session, user: User, file_key: str) -> bool:
+    """Whether a user may download a file: their own uploads, and files of approved posts/resources"""
+    if user.role == UserRole.ADMIN:
+        return True
+    if file_key.startswith((f"post/{user.id}/", f"resource/{user.id}/")):
+        return True
+    if is_content_key(file_key) and db.query(ContentObject.id).filter(
+        ContentObject.file_key == file_key,
+        ContentObject.created_by == user.id
+    ).first() is not None:
+        return True
+    return (
+        db.query(Post.id).filter(Post.media_key == file_key, Post.is_approved == True).first() is not None
+        or db.query(Resource.id).filter(Resource.file_key == file_key, Resource.is_approved == True).first() is not None
+    )
+
+
+@router.get("/download-url/{file_key:path}")
+def get_download_url(
+    file_key: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Generate a presigned download URL for an existing file the user
+    uploaded, or that an approved post/resource uses
+    """
+    download_url = None
+    if _may_download(db, current_user, file_key):
+        download_url = get_storage().download_url(
+            file_key=file_key,
+            expiration=3600  # 1 hour
+        )
+    
+    if not download_url:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+    
+    return {"download_url": download_url}
+
+
+
+def _get_multipart(db: Session, upload_id: str, user: User) -> MultipartUpload:
+    upload = db.query(MultipartUpload).filter(
+        MultipartUpload.upload_id == upload_id,
+        MultipartUpload.user_id == user.id
+    ).first()
+    if not upload:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found"
+        )
+    return upload
+
+
+def _require_in_progress(upload: MultipartUpload):
+    if upload.status != "in_progress":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload is {upload.status}"
+        )
+
+
+def _storage_error(action: str):
+    logger.exception("Multipart %s failed", action)
+    return HTTPException(
+        status_code=status.HTTP_502_BAD_GATEWAY,
+        detail=f"Storage failed to {action} the upload"
     )
+
+
+@router.post("/multipart", response_model=MultipartInitResponse, status_code=status.HTTP_201_CREATED)
+def initiate_multipart_upload(
+    init_request: MultipartInitRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Start a multipart upload for a large file
     
-    # Generate presigned download URL (for later use)
-    download_url = generate_presigned_download_url(
+    Upload parts 1..part_count (each part_size bytes, the last one smaller)
+    to URLs from POST /upload/multipart/{upload_id}/parts, in any order and
+    in parallel, then call .../complete. GET /upload/multipart/{upload_id}
+    lists the parts already received, to resume after a failure. Counts
+    against the user's upload quota (UPLOAD_QUOTA_*).
+    """
+    _reserve_quota(db, current_user, 1, init_request.size)
+    part_size = choose_part_size(init_request.size, init_request.part_size)
+    file_key = new_file_key(current_user.id, init_request.file_name, init_request.file_type)
+    storage = get_storage()
+    try:
+        upload_id = storage.create_multipart(file_key, init_request.content_type)
+    except Exception:
+        raise _storage_error("create")
+    
+    db.add(MultipartUpload(
+        upload_id=upload_id,
+        file_key=file_key,
+        user_id=current_user.id,
+        content_type=init_request.content_type,
+        size=init_request.size,
+        part_size=part_size
+    ))
+    db.commit()
+    
+    return MultipartInitResponse(
+        upload_id=upload_id,
         file_key=file_key,
-        expiration=86400 * 7  # 7 days
+        part_size=part_size,
+        part_count=part_count(init_request.size, part_size),
+        download_url=storage.download_url(file_key=file_key, expiration=86400 * 7)
     )
+
+
+@router.post("/multipart/{upload_id}/parts", response_model=List[PartUrl])
+def get_part_upload_urls(
+    upload_id: str,
+    parts_request: PartUrlsRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Presign upload URLs for several parts at once"""
+    upload = _get_multipart(db, upload_id, current_user)
+    _require_in_progress(upload)
+    total_parts = part_count(upload.size, upload.part_size)
+    invalid = [n for n in parts_request.part_numbers if not 1 <= n <= min(total_parts, MAX_PARTS)]
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Part numbers must be between 1 and {total_parts}: {invalid[:10]}"
+        )
+    try:
+        urls = get_storage().part_upload_urls(upload.file_key, upload_id, sorted(set(parts_request.part_numbers)))
+    except Exception:
+        raise _storage_error("sign parts of")
+    return [PartUrl(part_number=n, upload_url=url) for n, url in urls.items()]
+
+
+@router.get("/multipart/{upload_id}", response_model=MultipartStatusResponse)
+def get_multipart_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Status of a multipart upload and the parts received so far (for resuming)"""
+    upload = _get_multipart(db, upload_id, current_user)
+    parts = []
+    if upload.status == "in_progress":
+        try:
+            parts = get_storage().list_parts(upload.file_key, upload_id)
+        except Exception:
+            raise _storage_error("list parts of")
+    return MultipartStatusResponse(
+        upload_id=upload_id,
+        file_key=upload.file_key,
+        status=upload.status,
+        size=upload.size,
+        part_size=upload.part_size,
+        part_count=part_count(upload.size, upload.part_size),
+        parts=parts
+    )
+
+
+@router.post("/multipart/{upload_id}/complete", response_model=MultipartCompleteResponse)
+def complete_multipart_upload(
+    upload_id: str,
+    complete_request: MultipartCompleteRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Join the uploaded parts into the final file"""
+    upload = _get_multipart(db, upload_id, current_user)
+    _require_in_progress(upload)
+    storage = get_storage()
     
-    if not upload_url:
+    # Sizes come from storage even when the client lists the parts: the file
+    # must have the declared size the upload was authorized for
+    try:
+        received = {part["part_number"]: part for part in storage.list_parts(upload.file_key, upload_id)}
+    except Exception:
+        raise _storage_error("list parts of")
+    if complete_request.parts is not None:
+        parts = [{"part_number": p.part_number, "etag": p.etag} for p in complete_request.parts]
+    else:
+        parts = list(received.values())
+    parts.sort(key=lambda part: part["part_number"])
+    expected = part_count(upload.size, upload.part_size)
+    missing = sorted(set(range(1, expected + 1)) - {part["part_number"] for part in parts if part["part_number"] in received})
+    if missing or len(parts) != expected:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Upload has {len(parts)} of {expected} parts; missing {missing[:10]}"
+        )
+    total = sum(received[part["part_number"]]["size"] for part in parts)
+    if total != upload.size:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to generate upload URL"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Parts total {total} bytes; the upload was declared as {upload.size} bytes"
         )
     
-    return UploadResponse(
-        upload_url=upload_url,
-        file_key=file_key,
-        download_url=download_url
+    try:
+        storage.complete_multipart(upload.file_key, upload_id, parts)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception:
+        raise _storage_error("complete")
+    
+    upload.status = "completed"
+    db.commit()
+    return MultipartCompleteResponse(
+        file_key=upload.file_key,
+        download_url=storage.download_url(file_key=upload.file_key, expiration=86400 * 7)
     )
 
 
-@router.get("/download-url/{file_key}")
-def get_download_url(
+@router.delete("/multipart/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+def abort_multipart_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Abort a multipart upload and discard its parts"""
+    upload = _get_multipart(db, upload_id, current_user)
+    if upload.status == "in_progress":
+        try:
+            get_storage().abort_multipart(upload.file_key, upload_id)
+        except Exception:
+            raise _storage_error("abort")
+        upload.status = "aborted"
+        db.commit()
+    return None
+
+
+def _local_storage():
+    """The local storage backend; 404 when files are stored elsewhere (S3)"""
+    storage = get_storage()
+    if storage.name != "local":
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not found"
+        )
+    return storage
+
+
+def _check_signature(
+    method: str,
     file_key: str,
-    current_user: User = Depends(get_current_active_user)
+    expires: int,
+    signature: str,
+    size: Optional[int] = None,
+    sha256: Optional[str] = None
+):
+    if not verify_signature(method, file_key, expires, signature, size, sha256):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid or expired URL"
+        )
+
+
+@router.put("/files/{file_key:path}", status_code=status.HTTP_204_NO_CONTENT)
+async def put_local_file(
+    file_key: str,
+    request: Request,
+    expires: int = Query(...),
+    signature: str = Query(...),
+    size: Optional[int] = Query(None, ge=0),
+    sha256: Optional[str] = Query(None)
 ):
     """
-    Generate a presigned download URL for an existing file
+    Upload target of presigned URLs issued by the local storage backend.
+    The body is streamed to disk in chunks; URLs signed with a size accept
+    at most that many bytes, URLs signed with a sha256 only that content.
     """
-    download_url = generate_presigned_download_url(
-        file_key=file_key,
-        expiration=3600  # 1 hour
-    )
-    
-    if not download_url:
+    storage = _local_storage()
+    _check_signature("PUT", file_key, expires, signature, size, sha256)
+    try:
+        await storage.save_stream(file_key, request, max_size=size, sha256=sha256)
+    except InvalidFileKey:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid file key"
+        )
+    except OverflowError:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="File too large"
+        )
+    except ChecksumMismatch:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File does not match the declared SHA-256"
+        )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.api_route("/files/{file_key:path}", methods=["GET", "HEAD"])
+def get_local_file(
+    file_key: str,
+    request: Request,
+    expires: int = Query(...),
+    signature: str = Query(...)
+):
+    """
+    Download target of presigned URLs issued by the local storage backend.
+    Supports Range, If-Range and If-None-Match.
+    """
+    storage = _local_storage()
+    _check_signature("GET", file_key, expires, signature)
+    try:
+        return file_response(request, storage.path(file_key), file_key)
+    except (InvalidFileKey, FileNotFoundError):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="File not found"
         )
-    
-    return {"download_url": download_url}
 
+
+@router.put("/multipart/{upload_id}/parts/{part_number}")
+async def put_local_part(
+    request: Request,
+    upload_id: str,
+    part_number: int = Path(..., ge=1, le=MAX_PARTS),
+    expires: int = Query(...),
+    signature: str = Query(...)
+):
+    """Part upload target of presigned URLs issued by the local storage backend"""
+    storage = _local_storage()
+    _check_signature("PUT", f"{MULTIPART_DIR}/{upload_id}/{part_number}", expires, signature)
+    try:
+        etag = await storage.save_part(upload_id, part_number, request)
+    except InvalidFileKey:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found"
+        )
+    except OverflowError:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Part too large"
+        )
+    return Response(status_code=status.HTTP_200_OK, headers={"ETag": etag})
@@ -1,16 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.db import get_db
 from app.models.user import User
+from app.schemas.background_job import BackgroundJobResponse
 from app.schemas.user import UserResponse, UserUpdate
 from app.utils.auth import get_current_active_user
-from app.models.post import Post
-from app.models.resource import Resource
-from app.models.leaderboard import Leaderboard
-from app.models.mentor import Mentor
-from app.models.mentee import Mentee
-from app.models.chat import Chat
-from app.models.admin import Admin
+from app.utils.account_deletion import purge_account, request_deletion
+from app.utils.export import personal_archive
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -50,25 +48,34 @@ def update_current_user_profile(
     return current_user
 
 
-@router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
+@router.get("/me/export")
+def export_current_user_data(
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Download everything the current user owns as a ZIP of NDJSON files
+    (profile, posts, resources, chats), streamed as it is built
+    """
+    filename = f"my-data-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.zip"
+    return StreamingResponse(
+        personal_archive(current_user.id),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.delete("/me", response_model=BackgroundJobResponse, status_code=status.HTTP_202_ACCEPTED)
 def delete_current_user_account(
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    user = db.query(User).filter(User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    db.query(Chat).filter((Chat.sender_id == current_user.id) | (Chat.receiver_id == current_user.id)).delete(synchronize_session=False)
-    db.query(Post).filter(Post.user_id == current_user.id).delete(synchronize_session=False)
-    db.query(Resource).filter(Resource.user_id == current_user.id).delete(synchronize_session=False)
-    db.query(Leaderboard).filter(Leaderboard.user_id == current_user.id).delete(synchronize_session=False)
-    db.query(Mentor).filter(Mentor.user_id == current_user.id).delete(synchronize_session=False)
-    db.query(Mentee).filter(Mentee.user_id == current_user.id).delete(synchronize_session=False)
-    db.query(Admin).filter(Admin.user_id == current_user.id).delete(synchronize_session=False)
-    db.delete(user)
-    db.commit()
-    return None
+    """
+    Delete the current user's account
 
+    The account is disabled immediately; its posts, resources, chats, uploaded
+    files and profile are purged by a background job in small batches.
+    """
+    job = request_deletion(db, current_user)
+    background_tasks.add_task(purge_account, job.id, current_user.id)
+    return job
@@ -5,8 +5,10 @@ from app.schemas.mentee import MenteeCreate, MenteeResponse
 from app.schemas.post import PostCreate, PostResponse, PostListResponse, PostUpdate
 from app.schemas.resource import ResourceCreate, ResourceResponse, ResourceListResponse, ResourceUpdate, ResourceMentorSummary
 from app.schemas.chat import ChatCreate, ChatResponse, ChatReadUpdate
-from app.schemas.leaderboard import LeaderboardResponse
-from app.schemas.admin import AdminCreate, AdminResponse, AdminUpdate
+from app.schemas.leaderboard import LeaderboardResponse, LeaderboardRankResponse, MyRankResponse
+from app.schemas.background_job import BackgroundJobResponse
+from app.schemas.screening import ScreeningRuleCreate, ScreeningRuleResponse, ContentFlagResponse
+from app.schemas.admin import AdminCreate, AdminResponse, AdminUpdate, BulkModerationFilter, BulkModerationRequest, BulkModerationResponse, PostLeaseResponse, ResourceLeaseResponse, LeaseReleaseRequest
 
 # Rebuild models to resolve forward references
 MentorResponse.model_rebuild()
@@ -17,7 +19,10 @@ PostListResponse.model_rebuild()
 ResourceResponse.model_rebuild()
 ResourceListResponse.model_rebuild()
 LeaderboardResponse.model_rebuild()
+LeaderboardRankResponse.model_rebuild()
 AdminResponse.model_rebuild()
+PostLeaseResponse.model_rebuild()
+ResourceLeaseResponse.model_rebuild()
 
 __all__ = [
     "Token",
@@ -45,8 +50,20 @@ __all__ = [
     "ChatResponse",
     "ChatReadUpdate",
     "LeaderboardResponse",
+    "LeaderboardRankResponse",
+    "MyRankResponse",
     "AdminCreate",
     "AdminResponse",
     "AdminUpdate",
+    "BulkModerationFilter",
+    "BulkModerationRequest",
+    "BulkModerationResponse",
+    "PostLeaseResponse",
+    "ResourceLeaseResponse",
+    "LeaseReleaseRequest",
+    "BackgroundJobResponse",
+    "ScreeningRuleCreate",
+    "ScreeningRuleResponse",
+    "ContentFlagResponse",
 ]
 
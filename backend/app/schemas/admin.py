@@ -1,11 +1,13 @@
 from __future__ import annotations
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, TYPE_CHECKING
+from typing import Dict, List, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from app.schemas.user import UserResponse
+    from app.schemas.post import PostResponse
+    from app.schemas.resource import ResourceResponse
 
 
 class AdminCreate(BaseModel):
@@ -48,3 +50,39 @@ def _rebuild_admin_response():
 # Try to rebuild immediately if UserResponse is available
 _rebuild_admin_response()
 
+
+
+class BulkModerationFilter(BaseModel):
+    approved: Optional[bool] = None
+    user_id: Optional[int] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    limit: int = Field(1000, ge=1, le=10000)
+
+
+class BulkModerationRequest(BaseModel):
+    ids: Optional[List[int]] = Field(None, max_length=10000)
+    filter: Optional[BulkModerationFilter] = None
+
+
+class BulkModerationResponse(BaseModel):
+    action: str
+    processed: int
+    not_found: int
+    outcomes: Dict[int, str]
+
+
+class PostLeaseResponse(BaseModel):
+    items: List["PostResponse"]
+    next_cursor: Optional[str]
+    lease_expires_at: datetime
+
+
+class ResourceLeaseResponse(BaseModel):
+    items: List["ResourceResponse"]
+    next_cursor: Optional[str]
+    lease_expires_at: datetime
+
+
+class LeaseReleaseRequest(BaseModel):
+    ids: List[int] = Field(..., max_length=1000)
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Optional
+
+
+class BackgroundJobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str
+    total: Optional[int]
+    processed: int
+    result: Optional[Any]
+    error: Optional[str]
+    created_at: datetime
+    finished_at: Optional[datetime]
+    
+    class Config:
+        from_attributes = True
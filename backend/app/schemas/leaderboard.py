@@ -21,3 +21,14 @@ class LeaderboardResponse(BaseModel):
     class Config:
         from_attributes = True
 
+
+
+class LeaderboardRankResponse(LeaderboardResponse):
+    rank: int
+
+
+class MyRankResponse(BaseModel):
+    user_id: int
+    points: float
+    rank: int
+    total_entries: int
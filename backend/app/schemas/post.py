@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from datetime import datetime
-from typing import Optional, TYPE_CHECKING
+from typing import Any, Dict, Optional, TYPE_CHECKING
+from app.utils.media import signed_info
 
 if TYPE_CHECKING:
     from app.schemas.user import UserResponse
@@ -26,11 +27,18 @@ class PostResponse(BaseModel):
     title: str
     content: str
     media_url: Optional[str]
+    media_info: Optional[Dict[str, Any]] = None
     likes: int
     is_approved: bool
     created_at: datetime
     user: "UserResponse"
     
+    @field_validator("media_info")
+    @classmethod
+    def sign_variant_urls(cls, value):
+        # Variants are stored by key; their URLs are signed per response
+        return signed_info(value)
+    
     class Config:
         from_attributes = True
 
@@ -41,11 +49,18 @@ class PostListResponse(BaseModel):
     title: str
     content: str
     media_url: Optional[str]
+    media_info: Optional[Dict[str, Any]] = None
     likes: int
     is_approved: bool
     created_at: datetime
     user: "UserResponse"
     
+    @field_validator("media_info")
+    @classmethod
+    def sign_variant_urls(cls, value):
+        # Variants are stored by key; their URLs are signed per response
+        return signed_info(value)
+    
     class Config:
         from_attributes = True
 
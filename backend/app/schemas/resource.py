@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from datetime import datetime
-from typing import Optional, TYPE_CHECKING, Union
+from typing import Any, Dict, Optional, TYPE_CHECKING, Union
 from app.models.resource import ResourceType
+from app.utils.media import signed_info
 
 if TYPE_CHECKING:
     from app.schemas.user import UserResponse
@@ -32,11 +33,18 @@ class ResourceResponse(BaseModel):
     description: Optional[str]
     file_url: str
     resource_type: ResourceType
+    file_info: Optional[Dict[str, Any]] = None
     category: Optional[str]
     is_approved: bool
     created_at: datetime
     user: "UserResponse"
     
+    @field_validator("file_info")
+    @classmethod
+    def sign_variant_urls(cls, value):
+        # Variants are stored by key; their URLs are signed per response
+        return signed_info(value)
+    
     class Config:
         from_attributes = True
 
@@ -48,11 +56,18 @@ class ResourceListResponse(BaseModel):
     description: Optional[str]
     file_url: str
     resource_type: ResourceType
+    file_info: Optional[Dict[str, Any]] = None
     category: Optional[str]
     is_approved: bool
     created_at: datetime
     user: "UserResponse"
     
+    @field_validator("file_info")
+    @classmethod
+    def sign_variant_urls(cls, value):
+        # Variants are stored by key; their URLs are signed per response
+        return signed_info(value)
+    
     class Config:
         from_attributes = True
 
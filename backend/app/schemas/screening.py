@@ -0,0 +1,33 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Any, Optional
+
+
+class ScreeningRuleCreate(BaseModel):
+    pattern: str = Field(..., min_length=2, max_length=255)
+    kind: str = Field("term", pattern="^(term|link)$")
+    action: str = Field("flag", pattern="^(flag|unapprove)$")
+
+
+class ScreeningRuleResponse(BaseModel):
+    id: int
+    pattern: str
+    kind: str
+    action: str
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class ContentFlagResponse(BaseModel):
+    id: int
+    item_type: str
+    item_id: int
+    reason: str
+    action: str
+    details: Optional[Any]
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
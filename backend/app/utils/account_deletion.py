@@ -0,0 +1,202 @@
+"""
+Background Account Deletion
+
+Deleting an account disables it at once (the user can no longer sign in)
+and hands the purge to a background job. The job deletes the user's rows in
+chunks of at most CHUNK_SIZE, each in its own short transaction, so a user
+with years of chats never holds long locks on shared tables. Uploaded files
+under the user's post/ and resource/ prefixes are removed from storage before
+the user row itself is deleted last. Deduplicated files shared with other
+users live outside those prefixes; the user's references to them are
+released instead.
+
+Every step is idempotent, so an interrupted purge is simply run again: the
+purge_disabled_accounts scheduler job resumes accounts that have been
+disabled for a while without a live purge.
+"""
+import logging
+from typing import Optional
+from sqlalchemy import delete, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from app.db import SessionLocal
+from app.models.user import User
+from app.models.post import Post
+from app.models.resource import Resource
+from app.models.leaderboard import Leaderboard
+from app.models.mentor import Mentor
+from app.models.mentee import Mentee
+from app.models.admin import Admin
+from app.models.background_job import BackgroundJob
+from app.models.moderation_lease import ModerationLease
+from app.models.screening import ContentFingerprint, ContentFlag
+from app.utils import stats
+from app.utils.background import update_job
+from app.utils.dedup import release_item_files
+from app.utils.ranking import ranked_leaderboard
+from app.utils.storage import get_storage
+
+logger = logging.getLogger("app.account_deletion")
+
+JOB_KIND = "account_deletion"
+CHUNK_SIZE = 1000
+STALE_AFTER_MINUTES = 10
+
+# Key prefixes generated by the upload router: "{file_type}/{user_id}/..."
+UPLOAD_PREFIXES = ("post", "resource")
+
+# Tables purged with plain chunked DELETEs: (name, statement)
+_CHUNKED_DELETES = (
+    ("chats_sent", "DELETE FROM chats WHERE sender_id = :user_id LIMIT :limit"),
+    ("chats_received", "DELETE FROM chats WHERE receiver_id = :user_id LIMIT :limit"),
+    ("daily_contributions", "DELETE FROM daily_contributions WHERE user_id = :user_id LIMIT :limit"),
+)
+
+
+def request_deletion(db: Session, user: User) -> BackgroundJob:
+    """Disable an account and record a pending deletion job; commits"""
+    user.disabled_at = func.now()
+    job = BackgroundJob(
+        kind=JOB_KIND,
+        status="pending",
+        created_by=user.id,
+        processed=0,
+        result={"user_id": user.id}
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _delete_in_chunks(db: Session, statement: str, user_id: int, chunk_size: int) -> int:
+    total = 0
+    while True:
+        count = db.execute(text(statement), {"user_id": user_id, "limit": chunk_size}).rowcount
+        db.commit()
+        total += count
+        if count < chunk_size:
+            return total
+
+
+def _delete_items_in_chunks(db: Session, model, item_type: str, counter: str, user_id: int, chunk_size: int) -> int:
+    """Delete a user's posts/resources with their moderation and screening rows"""
+    total = 0
+    while True:
+        ids = db.execute(
+            select(model.id).where(model.user_id == user_id).order_by(model.id).limit(chunk_size)
+        ).scalars().all()
+        if not ids:
+            return total
+        release_item_files(db, model, ids)
+        for related in (ModerationLease, ContentFlag, ContentFingerprint):
+            db.execute(delete(related).where(related.item_type == item_type, related.item_id.in_(ids)))
+        db.execute(delete(model).where(model.id.in_(ids)))
+        stats.increment(db, **{counter: -len(ids)})
+        db.commit()
+        total += len(ids)
+
+
+def _delete_user_row(db: Session, user_id: int) -> None:
+    """Delete the profile, leaderboard and user rows in one short transaction"""
+    pending_mentors = db.query(Mentor).filter(Mentor.user_id == user_id, Mentor.verified == False).count()
+    db.query(Leaderboard).filter(Leaderboard.user_id == user_id).delete(synchronize_session=False)
+    mentors = db.query(Mentor).filter(Mentor.user_id == user_id).delete(synchronize_session=False)
+    mentees = db.query(Mentee).filter(Mentee.user_id == user_id).delete(synchronize_session=False)
+    db.query(Admin).filter(Admin.user_id == user_id).delete(synchronize_session=False)
+    db.query(User).filter(User.id == user_id).delete(synchronize_session=False)
+    stats.increment(db, mentors=-mentors, mentees=-mentees, pending_mentors=-pending_mentors)
+    db.commit()
+    ranked_leaderboard.remove(user_id)
+
+
+def purge_account(job_id: int, user_id: int, chunk_size: int = CHUNK_SIZE) -> None:
+    """Delete all data of a disabled account, recording progress on its job"""
+    # Imported here: the scheduler module registers this purge as a job
+    from app.utils.scheduler import cluster_lock
+
+    with cluster_lock(f"{JOB_KIND}:{user_id}") as acquired:
+        if not acquired:
+            # Another worker is purging this account right now
+            return
+        db = SessionLocal()
+        deleted = {}
+        processed = 0
+
+        def step(name: str, count: int):
+            nonlocal processed
+            deleted[name] = deleted.get(name, 0) + count
+            processed += count
+            update_job(job_id, processed=processed, result={"user_id": user_id, "step": name, "deleted": deleted})
+
+        try:
+            user = db.query(User).filter(User.id == user_id).first()
+            if user is None:
+                update_job(job_id, status="done", result={"user_id": user_id, "deleted": deleted})
+                return
+            if user.disabled_at is None:
+                update_job(job_id, status="failed", error="Account is not disabled")
+                return
+            update_job(job_id, status="running")
+            db.rollback()
+
+            for name, statement in _CHUNKED_DELETES:
+                step(name, _delete_in_chunks(db, statement, user_id, chunk_size))
+            step("posts", _delete_items_in_chunks(db, Post, "post", "posts", user_id, chunk_size))
+            step("resources", _delete_items_in_chunks(db, Resource, "resource", "resources", user_id, chunk_size))
+            for prefix in UPLOAD_PREFIXES:
+                step("files", get_storage().delete_prefix(f"{prefix}/{user_id}/"))
+            _delete_user_row(db, user_id)
+            step("user", 1)
+
+            update_job(job_id, status="done", result={"user_id": user_id, "deleted": deleted})
+            logger.info("Account %s deleted (job %s): %s", user_id, job_id, deleted)
+        except Exception as e:
+            db.rollback()
+            logger.exception("Deleting account %s failed (job %s)", user_id, job_id)
+            update_job(job_id, status="failed", error=str(e), result={"user_id": user_id, "deleted": deleted})
+        finally:
+            db.close()
+
+
+def _latest_job(db: Session, user_id: int) -> Optional[BackgroundJob]:
+    return db.query(BackgroundJob).filter(
+        BackgroundJob.kind == JOB_KIND,
+        BackgroundJob.created_by == user_id
+    ).order_by(BackgroundJob.id.desc()).first()
+
+
+def resume_stale_deletions(chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Purge accounts disabled more than STALE_AFTER_MINUTES ago whose deletion
+    never finished (worker restarted, S3 unavailable, ...)
+
+    Returns:
+        Number of accounts purged
+    """
+    db = SessionLocal()
+    try:
+        # On the database clock, which set disabled_at and the jobs' timestamps
+        cutoff = db.execute(
+            select(func.timestampadd(text("MINUTE"), -STALE_AFTER_MINUTES, func.now()))
+        ).scalar()
+        user_ids = db.execute(
+            select(User.id).where(User.disabled_at.is_not(None), User.disabled_at < cutoff).order_by(User.id)
+        ).scalars().all()
+        pending = []
+        for user_id in user_ids:
+            job = _latest_job(db, user_id)
+            if job and job.status == "running" and (job.updated_at or job.created_at).replace(tzinfo=None) >= cutoff:
+                continue  # still making progress elsewhere
+            if job is None or job.status == "done":
+                job = BackgroundJob(kind=JOB_KIND, status="pending", created_by=user_id, processed=0,
+                                    result={"user_id": user_id})
+                db.add(job)
+                db.commit()
+            pending.append((job.id, user_id))
+    finally:
+        db.close()
+
+    for job_id, user_id in pending:
+        purge_account(job_id, user_id, chunk_size)
+    return len(pending)
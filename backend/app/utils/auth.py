@@ -65,6 +65,11 @@ def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
     """Get current active user"""
+    if current_user.disabled_at is not None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Account is disabled"
+        )
     return current_user
 
 
@@ -84,5 +89,7 @@ def get_current_user_optional(
     except JWTError:
         return None
     user = db.query(User).filter(User.email == email).first()
+    if user and user.disabled_at is not None:
+        return None
     return user
 
@@ -0,0 +1,33 @@
+"""
+Background Job Tracking
+
+Long-running tasks started from the API record their progress in the
+background_jobs table, so any worker can report status. Progress updates
+use their own short-lived session and commit immediately.
+"""
+from typing import Optional
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from app.db import SessionLocal
+from app.models.background_job import BackgroundJob
+
+
+def create_job(db: Session, kind: str, created_by: Optional[int] = None, total: Optional[int] = None) -> BackgroundJob:
+    """Create a pending job row and commit"""
+    job = BackgroundJob(kind=kind, status="pending", created_by=created_by, total=total, processed=0)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def update_job(job_id: int, **fields) -> None:
+    """Update progress fields (status, processed, total, result, error) of a job"""
+    db = SessionLocal()
+    try:
+        if fields.get("status") in ("done", "failed"):
+            fields["finished_at"] = func.now()
+        db.query(BackgroundJob).filter(BackgroundJob.id == job_id).update(fields, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
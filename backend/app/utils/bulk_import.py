@@ -0,0 +1,270 @@
+"""
+Bulk CSV Import of Mentors and Mentees
+
+The uploaded file is read row by row (never fully in memory), validated,
+and written in batches: one executemany INSERT per table per batch, each
+batch committed in its own short transaction. Password hashing dominates
+the cost of an import, so it runs in a pool of worker processes.
+
+Rows whose email already exists (in the database or earlier in the file)
+are skipped, so a failed or interrupted import can simply be re-run.
+
+Expected columns: email, full_name, password, role (mentor|mentee), plus
+branch, graduation_year, current_company, package, bio, linkedin_url,
+github_url for mentors and branch, current_year, goals for mentees.
+"""
+import csv
+import logging
+import os
+from itertools import islice
+from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, ValidationError, model_validator
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.db import SessionLocal
+from app.models.user import User, UserRole
+from app.models.mentor import Mentor, Branch
+from app.models.mentee import Mentee
+from app.models.leaderboard import Leaderboard
+from app.utils import stats
+from app.utils.auth import get_password_hash
+from app.utils.background import update_job
+from app.utils.scoring import compute_points, sync_rank
+
+logger = logging.getLogger("app.bulk_import")
+
+JOB_KIND = "user_import"
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+HASH_CHUNKSIZE = 16
+
+
+class ImportRow(BaseModel):
+    email: EmailStr
+    full_name: str = Field(min_length=1, max_length=255)
+    password: str = Field(min_length=6)
+    role: UserRole
+    branch: Optional[str] = None
+    graduation_year: Optional[int] = None
+    current_company: Optional[str] = Field(None, max_length=255)
+    package: int = Field(0, ge=0)
+    bio: Optional[str] = Field(None, max_length=1000)
+    linkedin_url: Optional[str] = Field(None, max_length=500)
+    github_url: Optional[str] = Field(None, max_length=500)
+    current_year: Optional[int] = Field(None, ge=1, le=5)
+    goals: Optional[str] = Field(None, max_length=1000)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _normalize(cls, data):
+        # Blank CSV cells mean "not given"; roles are accepted in any case
+        data = {key.strip().lower(): (value.strip() or None) if isinstance(value, str) else value
+                for key, value in data.items() if key}
+        if data.get("role"):
+            data["role"] = data["role"].upper()
+        if data.get("package") is None:
+            data.pop("package", None)
+        return data
+
+    @model_validator(mode="after")
+    def _check_role(self):
+        if self.role == UserRole.ADMIN:
+            raise ValueError("role must be mentor or mentee")
+        if self.role == UserRole.MENTOR:
+            if self.branch not in Branch.__members__:
+                raise ValueError(f"mentor branch must be one of {', '.join(Branch.__members__)}")
+            if self.graduation_year is None:
+                raise ValueError("graduation_year is required for mentors")
+        return self
+
+
+def _error(line: int, message: str) -> dict:
+    return {"line": line, "error": message}
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}"
+        for err in exc.errors()
+    )
+
+
+def _insert_batch(db: Session, rows: list, hashes: list) -> dict:
+    """Insert users, profiles and leaderboard rows for one validated batch. Does not commit."""
+    db.execute(insert(User), [
+        {"email": row.email, "password_hash": password_hash, "full_name": row.full_name, "role": row.role}
+        for row, password_hash in zip(rows, hashes)
+    ])
+    ids = dict(db.execute(
+        select(User.email, User.id).where(User.email.in_([row.email for row in rows]))
+    ).all())
+
+    mentors = [row for row in rows if row.role == UserRole.MENTOR]
+    mentees = [row for row in rows if row.role == UserRole.MENTEE]
+    if mentors:
+        db.execute(insert(Mentor), [
+            {
+                "user_id": ids[row.email],
+                "branch": Branch(row.branch),
+                "graduation_year": row.graduation_year,
+                "current_company": row.current_company,
+                "package": row.package,
+                "verified": False,
+                "bio": row.bio,
+                "linkedin_url": row.linkedin_url,
+                "github_url": row.github_url,
+            }
+            for row in mentors
+        ])
+    if mentees:
+        db.execute(insert(Mentee), [
+            {
+                "user_id": ids[row.email],
+                "branch": row.branch,
+                "current_year": row.current_year,
+                "goals": row.goals,
+            }
+            for row in mentees
+        ])
+    db.execute(insert(Leaderboard), [
+        {
+            "user_id": ids[row.email],
+            "total_resources": 0,
+            "total_posts": 0,
+            "package": row.package if row.role == UserRole.MENTOR else 0,
+            "points": compute_points(0, 0, row.package if row.role == UserRole.MENTOR else 0),
+        }
+        for row in rows
+    ])
+    stats.increment(db, mentors=len(mentors), pending_mentors=len(mentors), mentees=len(mentees))
+    return {"mentors": len(mentors), "mentees": len(mentees), "user_ids": [ids[row.email] for row in rows]}
+
+
+def count_rows(path: str) -> int:
+    """Number of data rows in a CSV file (streamed)"""
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        return max(sum(1 for _ in csv.reader(fh)) - 1, 0)
+
+
+def import_users(
+    db: Session,
+    path: str,
+    batch_size: int = BATCH_SIZE,
+    workers: Optional[int] = None,
+    progress=None,
+) -> dict:
+    """
+    Import mentors and mentees from a CSV file
+
+    Args:
+        db: Database session
+        path: Path of the CSV file
+        batch_size: Rows validated, hashed and inserted per transaction
+        workers: Password hashing processes (default: CPU count)
+        progress: Optional callback called as progress(processed, result) after each batch
+
+    Returns:
+        Summary dict with imported/skipped/failed counts and a sample of row errors
+    """
+    # Imported here: the process pool machinery is slow to import and only needed by imports
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    result = {"imported": 0, "mentors": 0, "mentees": 0, "skipped": 0, "failed": 0, "errors": []}
+    seen = set()
+    processed = 0
+
+    def record_error(line: int, message: str):
+        result["failed"] += 1
+        if len(result["errors"]) < MAX_REPORTED_ERRORS:
+            result["errors"].append(_error(line, message))
+
+    # Spawned rather than forked: this runs in a thread of the API process, and a
+    # fork would copy its DB connections and locks held by other threads
+    with open(path, newline="", encoding="utf-8-sig") as fh, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        # Line 1 is the header
+        lines = enumerate(csv.DictReader(fh), start=2)
+        while True:
+            batch = list(islice(lines, batch_size))
+            if not batch:
+                break
+            processed += len(batch)
+
+            rows, line_numbers = [], []
+            for line, raw in batch:
+                try:
+                    row = ImportRow.model_validate(raw)
+                except ValidationError as e:
+                    record_error(line, _validation_message(e))
+                    continue
+                email = row.email.lower()
+                if email in seen:
+                    result["skipped"] += 1
+                    continue
+                seen.add(email)
+                rows.append(row)
+                line_numbers.append(line)
+
+            if rows:
+                existing = set(
+                    email.lower() for email in db.execute(
+                        select(User.email).where(User.email.in_([row.email for row in rows]))
+                    ).scalars()
+                )
+                if existing:
+                    kept = [(row, line) for row, line in zip(rows, line_numbers) if row.email.lower() not in existing]
+                    result["skipped"] += len(rows) - len(kept)
+                    rows = [row for row, _ in kept]
+                    line_numbers = [line for _, line in kept]
+
+            if rows:
+                hashes = list(pool.map(get_password_hash, [row.password for row in rows], chunksize=HASH_CHUNKSIZE))
+                try:
+                    inserted = _insert_batch(db, rows, hashes)
+                    db.commit()
+                except IntegrityError as e:
+                    # Most likely a concurrent signup with one of these emails;
+                    # re-running the import picks the rest of the batch up
+                    db.rollback()
+                    message = f"batch rejected by database: {e.orig}"
+                    for line in line_numbers:
+                        record_error(line, message)
+                else:
+                    result["imported"] += len(rows)
+                    result["mentors"] += inserted["mentors"]
+                    result["mentees"] += inserted["mentees"]
+                    sync_rank(db, *inserted["user_ids"])
+
+            if progress:
+                progress(processed, result)
+
+    result["processed"] = processed
+    return result
+
+
+def run_import_job(job_id: int, path: str, batch_size: int = BATCH_SIZE) -> None:
+    """Run an import recorded as a background job, then remove the uploaded file"""
+    db = SessionLocal()
+    try:
+        update_job(job_id, status="running", total=count_rows(path))
+        result = import_users(
+            db,
+            path,
+            batch_size=batch_size,
+            progress=lambda processed, partial: update_job(job_id, processed=processed, result=partial),
+        )
+        update_job(job_id, status="done", processed=result["processed"], result=result)
+        logger.info("User import %s finished: %s imported, %s skipped, %s failed",
+                    job_id, result["imported"], result["skipped"], result["failed"])
+    except Exception as e:
+        db.rollback()
+        logger.exception("User import %s failed", job_id)
+        update_job(job_id, status="failed", error=str(e))
+    finally:
+        db.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
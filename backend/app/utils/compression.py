@@ -0,0 +1,197 @@
+"""
+Response Compression
+
+CompressionMiddleware compresses HTTP responses with Brotli or gzip,
+whichever the client accepts (Brotli preferred), when:
+
+- the Content-Type is in COMPRESSIBLE_TYPES (JSON, text, SVG...); images,
+  archives and other already-compressed bodies are sent as they are
+- the body is at least COMPRESSION_MIN_SIZE bytes: below that the
+  compressed body plus header saves little and costs CPU (streamed bodies,
+  whose size is not known up front, are always compressed)
+- the response is not already encoded, and is not a partial (206 or
+  Content-Range) response, whose ranges refer to the unencoded body
+
+An encoded response's ETag is weakened (W/"..."): the encoded bytes differ
+from the ones the strong validator identifies. Responses sent other than as
+body messages (e.g. the zero-copy send extension) pass through untouched.
+
+Streaming responses (CSV exports...) are compressed chunk by chunk, each
+chunk flushed so the client receives data as it is produced. Responses that
+could be compressed carry "Vary: Accept-Encoding" for caches.
+
+Brotli needs the brotli package; without it only gzip is offered.
+"""
+import importlib.util
+import zlib
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+
+BROTLI_AVAILABLE = importlib.util.find_spec("brotli") is not None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/problem+json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+
+def _accepted(accept_encoding: str) -> dict:
+    """Accept-Encoding as {coding: q}"""
+    codings = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """The coding to use for a request's Accept-Encoding: "br", "gzip" or None"""
+    codings = _accepted(accept_encoding)
+    wildcard = codings.get("*", 0.0)
+    offered = ("br", "gzip") if BROTLI_AVAILABLE else ("gzip",)
+    best, best_q = None, 0.0
+    for coding in offered:
+        q = codings.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return any(
+        media_type.startswith(allowed) if allowed.endswith("/") else media_type == allowed
+        for allowed in COMPRESSIBLE_TYPES
+    )
+
+
+class _Compressor:
+    """Incremental encoder for one response body"""
+
+    def __init__(self, coding: str, gzip_level: int, brotli_quality: int):
+        if coding == "br":
+            import brotli
+
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, zlib.MAX_WBITS | 16)  # gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it, so it can be sent right away"""
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: Optional[int] = None,
+        gzip_level: Optional[int] = None,
+        brotli_quality: Optional[int] = None,
+    ):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+        self.gzip_level = settings.COMPRESSION_GZIP_LEVEL if gzip_level is None else gzip_level
+        self.brotli_quality = settings.COMPRESSION_BROTLI_QUALITY if brotli_quality is None else brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingResponder(self, coding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    def __init__(self, middleware: CompressionMiddleware, coding: str, send: Send):
+        self.middleware = middleware
+        self.coding = coding
+        self._send = send
+        self.start: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk shows whether to compress
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            if self.start is not None and self.compressor is None and not self.passthrough:
+                # The body is not sent as body messages (zerocopysend...): leave it alone
+                self.passthrough = True
+                await self._send(self.start)
+            await self._send(message)
+            return
+        if self.passthrough:
+            await self._send(message)
+            return
+        if self.compressor is not None:
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            chunk = self.compressor.compress(body) if more_body else self.compressor.finish(body)
+            await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            return
+        await self._first_body(message)
+
+    async def _first_body(self, message: Message) -> None:
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        headers = MutableHeaders(raw=self.start["headers"])
+        compressible = (
+            "content-encoding" not in headers
+            and self.start["status"] != 206
+            and "content-range" not in headers
+            and is_compressible(headers.get("content-type", ""))
+        )
+        if compressible:
+            headers.add_vary_header("Accept-Encoding")
+        if not compressible or (not more_body and len(body) < self.middleware.minimum_size):
+            self.passthrough = True
+            await self._send(self.start)
+            await self._send(message)
+            return
+
+        self.compressor = _Compressor(self.coding, self.middleware.gzip_level, self.middleware.brotli_quality)
+        headers["Content-Encoding"] = self.coding
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        if more_body:
+            # Streamed: the final length is unknown
+            del headers["Content-Length"]
+            chunk = self.compressor.compress(body)
+        else:
+            chunk = self.compressor.finish(body)
+            headers["Content-Length"] = str(len(chunk))
+        await self._send(self.start)
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
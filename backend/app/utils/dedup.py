@@ -0,0 +1,184 @@
+"""
+Content-Addressed Upload Deduplication
+
+A client that declares a file's SHA-256 gets a key derived from its user id
+and the hash, "{file_type}/sha256/{user_id}/{hash}.{ext}", recorded in
+content_objects. When the user's object for that hash is already stored the
+upload is skipped; otherwise the upload URL only accepts a body with that
+hash, so an index entry never points at other content.
+
+Files are deduplicated within each user's own uploads (content_objects is
+unique on the owner and the hash): knowing a hash must not grant access to
+a file someone else uploaded, so every user stores their own copy once.
+
+Posts and resources using a deduplicated file hold a reference: ref_count is
+raised in the transaction creating the item and lowered in the one deleting
+it, which enqueues a "file.released" event. The event deletes the file and
+its media variants once nothing references it, unless an upload request
+resolved to it within CLAIM_GRACE_MINUTES (an item is probably about to use
+it; the orphan collector removes it later if not).
+
+Content-addressed keys are outside the per-user upload prefixes, so
+deleting an account releases their references (and the files with the
+last one) rather than deleting them outright.
+"""
+import logging
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from app.models.post import Post
+from app.models.upload import ContentObject
+from app.utils.media import delete_derived
+from app.utils.outbox import enqueue
+from app.utils.storage import file_key_from_url, get_storage
+
+logger = logging.getLogger("app.dedup")
+
+CONTENT_KEY_SEGMENT = "/sha256/"
+CLAIM_GRACE_MINUTES = 60  # lifetime of an upload URL
+
+
+def content_key(user_id: int, sha256: str, file_name: str, file_type: str) -> str:
+    """Content-addressed storage key: {file_type}/sha256/{user_id}/{hash}.{ext}"""
+    file_extension = file_name.split('.')[-1].lower() if '.' in file_name else ''
+    return f"{file_type}{CONTENT_KEY_SEGMENT}{user_id}/{sha256}.{file_extension}"
+
+
+def is_content_key(file_key: Optional[str]) -> bool:
+    """Whether a key is content-addressed (also the older {file_type}/sha256/{hash}.{ext} keys)"""
+    return bool(file_key) and CONTENT_KEY_SEGMENT in file_key
+
+
+def claim_object(
+    db: Session,
+    user_id: int,
+    sha256: str,
+    size: Optional[int],
+    file_name: str,
+    file_type: str
+) -> Tuple[ContentObject, bool]:
+    """
+    Get or create the user's object for a content hash; commits
+
+    Returns:
+        (object, whether it is already stored so the upload can be skipped)
+
+    Raises:
+        ValueError: if size contradicts the size the user recorded for the hash
+    """
+    sha256 = sha256.lower()
+    owned = (ContentObject.created_by == user_id, ContentObject.sha256 == sha256)
+    obj = db.query(ContentObject).filter(*owned).first()
+    if obj is None:
+        obj = ContentObject(
+            sha256=sha256,
+            file_key=content_key(user_id, sha256, file_name, file_type),
+            size=size,
+            status="pending",
+            ref_count=0,
+            created_by=user_id
+        )
+        db.add(obj)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Claimed concurrently by another upload of the same bytes by this user
+            db.rollback()
+            obj = db.query(ContentObject).filter(*owned).one()
+    if size is not None and obj.size is not None and size != obj.size:
+        raise ValueError(f"A file with this SHA-256 is {obj.size} bytes, not {size}")
+
+    stored = obj.status == "stored"
+    if not stored and get_storage().exists(obj.file_key):
+        # Uploaded (with the checksum enforced) since the object was claimed
+        obj.status = "stored"
+        stored = True
+    obj.claimed_at = func.now()
+    db.commit()
+    return obj, stored
+
+
+def owned_file_key(db: Session, user_id: int, url: Optional[str], file_type: str) -> Optional[str]:
+    """
+    The storage key of a file URL given for a new post/resource by user_id
+
+    Only the user's own uploads can be referenced: keys under
+    "{file_type}/{user_id}/", and content keys the user claimed whatever
+    file_type they were first declared as (the same bytes resolve to the
+    same object for a post and a resource).
+
+    Returns:
+        The key, or None for a link outside storage
+
+    Raises:
+        ValueError: if the URL points at a stored file of someone else
+    """
+    file_key = file_key_from_url(url)
+    if file_key is None:
+        return None
+    if is_content_key(file_key):
+        owned = db.query(ContentObject.id).filter(
+            ContentObject.file_key == file_key,
+            ContentObject.created_by == user_id
+        ).first() is not None
+    else:
+        owned = file_key.startswith(f"{file_type}/{user_id}/")
+    if not owned:
+        raise ValueError(f"Only files you uploaded as a {file_type} can be attached")
+    return file_key
+
+
+def retain_file(db: Session, file_key: Optional[str]) -> None:
+    """Count a new reference to a deduplicated file. Does not commit."""
+    if not is_content_key(file_key):
+        return
+    db.query(ContentObject).filter(ContentObject.file_key == file_key).update(
+        {ContentObject.ref_count: ContentObject.ref_count + 1}, synchronize_session=False
+    )
+
+
+def release_files(db: Session, file_keys: Iterable[Optional[str]]) -> None:
+    """Drop one reference per given key (deduplicated files only). Does not commit."""
+    for file_key, count in Counter(key for key in file_keys if is_content_key(key)).items():
+        updated = db.query(ContentObject).filter(ContentObject.file_key == file_key).update(
+            {ContentObject.ref_count: func.greatest(ContentObject.ref_count - count, 0)},
+            synchronize_session=False
+        )
+        if updated:
+            enqueue(db, "file.released", {"file_key": file_key})
+
+
+def release_item_files(db: Session, model, ids: List[int]) -> None:
+    """Release the files of posts/resources about to be deleted. Does not commit."""
+    if not ids:
+        return
+    key_column = model.media_key if model is Post else model.file_key
+    release_files(db, db.query(key_column).filter(model.id.in_(ids), key_column.is_not(None)).scalars())
+
+
+def delete_if_unreferenced(db: Session, file_key: str) -> bool:
+    """
+    Delete a deduplicated file, its media variants and its index entry if
+    nothing references it. Does not commit.
+
+    Returns:
+        Whether the file was deleted
+    """
+    obj = db.query(ContentObject).filter(ContentObject.file_key == file_key).with_for_update().first()
+    if obj is None or obj.ref_count > 0:
+        return False
+    if obj.claimed_at is not None:
+        # claimed_at is set by the database: compare on its clock
+        grace = db.execute(select(func.timestampadd(text("MINUTE"), -CLAIM_GRACE_MINUTES, func.now()))).scalar()
+        if obj.claimed_at.replace(tzinfo=None) > grace:
+            return False
+    storage = get_storage()
+    if storage.exists(file_key) and not storage.delete(file_key):
+        raise RuntimeError(f"Failed to delete {file_key}")
+    delete_derived(db, file_key)
+    db.delete(obj)
+    logger.info("Deleted unreferenced file %s", file_key)
+    return True
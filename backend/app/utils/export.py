@@ -0,0 +1,230 @@
+"""
+Streaming Data Export
+
+Rows are read with a server-side cursor (stream_results/yield_per) and
+encoded as CSV or NDJSON in chunks, optionally gzip-compressed on the fly,
+so an export uses constant memory regardless of table size. Personal data
+archives put one NDJSON file per dataset into a ZIP that is written
+incrementally as the rows are read.
+"""
+import csv
+import enum
+import io
+import json
+import zipfile
+import zlib
+from datetime import date, datetime
+from typing import Iterable, Iterator, Optional, Tuple
+from sqlalchemy import select
+from app.db import SessionLocal
+from app.models.user import User
+from app.models.post import Post
+from app.models.resource import Resource
+from app.models.chat import Chat
+from app.models.mentor import Mentor
+from app.models.mentee import Mentee
+from app.models.leaderboard import Leaderboard
+
+YIELD_PER = 1000
+CHUNK_BYTES = 64 * 1024
+
+# dataset -> (model, exported columns); password hashes are never exported
+EXPORTS = {
+    "users": (User, [User.id, User.email, User.full_name, User.role, User.created_at]),
+    "posts": (Post, [
+        Post.id, Post.user_id, Post.title, Post.content, Post.media_url,
+        Post.likes, Post.is_approved, Post.created_at,
+    ]),
+    "resources": (Resource, [
+        Resource.id, Resource.user_id, Resource.title, Resource.description, Resource.file_url,
+        Resource.resource_type, Resource.category, Resource.is_approved, Resource.created_at,
+    ]),
+    "chats": (Chat, [
+        Chat.id, Chat.sender_id, Chat.receiver_id, Chat.message, Chat.is_read, Chat.created_at,
+    ]),
+}
+
+
+def _plain(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def build_query(
+    dataset: str,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    approved: Optional[bool] = None,
+    user_id: Optional[int] = None,
+):
+    """Column-only SELECT for a dataset with optional filters, in id order"""
+    model, columns = EXPORTS[dataset]
+    stmt = select(*columns)
+    if created_after is not None:
+        stmt = stmt.where(model.created_at >= created_after)
+    if created_before is not None:
+        stmt = stmt.where(model.created_at < created_before)
+    if approved is not None and hasattr(model, "is_approved"):
+        stmt = stmt.where(model.is_approved == approved)
+    if user_id is not None:
+        if model is Chat:
+            stmt = stmt.where((Chat.sender_id == user_id) | (Chat.receiver_id == user_id))
+        elif model is User:
+            stmt = stmt.where(User.id == user_id)
+        else:
+            stmt = stmt.where(model.user_id == user_id)
+    return stmt.order_by(model.id)
+
+
+def column_names(dataset: str) -> list:
+    return [column.key for column in EXPORTS[dataset][1]]
+
+
+def stream_rows(stmt, session=None) -> Iterator[tuple]:
+    """
+    Yield result rows through a server-side cursor
+
+    Opens (and closes) its own session unless one is given, because a
+    streaming response outlives the request's dependency-scoped session.
+    """
+    db = session or SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(stream_results=True, yield_per=YIELD_PER))
+        for partition in result.partitions():
+            for row in partition:
+                yield tuple(row)
+    finally:
+        if session is None:
+            db.close()
+
+
+def _buffered(lines: Iterable[str]) -> Iterator[bytes]:
+    """Join encoded lines into ~CHUNK_BYTES chunks"""
+    buffer = []
+    size = 0
+    for line in lines:
+        data = line.encode("utf-8")
+        buffer.append(data)
+        size += len(data)
+        if size >= CHUNK_BYTES:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def csv_lines(names: list, rows: Iterable[tuple]) -> Iterator[str]:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(names)
+    for row in rows:
+        writer.writerow([_plain(value) for value in row])
+        yield out.getvalue()
+        out.seek(0)
+        out.truncate()
+    if out.tell():
+        yield out.getvalue()
+
+
+def ndjson_lines(names: list, rows: Iterable[tuple]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps({name: _plain(value) for name, value in zip(names, row)}, ensure_ascii=False) + "\n"
+
+
+def encode(fmt: str, names: list, rows: Iterable[tuple]) -> Iterator[bytes]:
+    """Encode rows as CSV or NDJSON byte chunks"""
+    lines = csv_lines(names, rows) if fmt == "csv" else ndjson_lines(names, rows)
+    return _buffered(lines)
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compress a byte stream into gzip format incrementally"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# Profile records in a personal archive: (record type, model, exported columns)
+PROFILE_RECORDS = (
+    ("user", User, EXPORTS["users"][1]),
+    ("mentor", Mentor, [
+        Mentor.branch, Mentor.graduation_year, Mentor.current_company, Mentor.package,
+        Mentor.verified, Mentor.bio, Mentor.linkedin_url, Mentor.github_url, Mentor.created_at,
+    ]),
+    ("mentee", Mentee, [Mentee.branch, Mentee.current_year, Mentee.goals, Mentee.created_at]),
+    ("leaderboard", Leaderboard, [
+        Leaderboard.total_resources, Leaderboard.total_posts, Leaderboard.package, Leaderboard.points,
+    ]),
+)
+
+
+def _profile_lines(user_id: int) -> Iterator[str]:
+    """NDJSON lines for the user's account, profile and leaderboard records"""
+    db = SessionLocal()
+    try:
+        for record_type, model, columns in PROFILE_RECORDS:
+            key = model.id if model is User else model.user_id
+            row = db.execute(select(*columns).where(key == user_id)).first()
+            if row is not None:
+                record = {"type": record_type}
+                record.update({column.key: _plain(value) for column, value in zip(columns, row)})
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+    finally:
+        db.close()
+
+
+class _ChunkSink:
+    """Write-only, non-seekable file object collecting what ZipFile writes"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def zip_chunks(entries: Iterable[Tuple[str, Iterable[bytes]]]) -> Iterator[bytes]:
+    """
+    Build a ZIP archive from (file name, byte chunks) entries as a byte stream
+
+    The output is not seekable, so ZipFile writes sizes and CRCs in data
+    descriptors after each entry instead of going back to the local header.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, chunks in entries:
+            with archive.open(name, mode="w", force_zip64=True) as entry:
+                for chunk in chunks:
+                    entry.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
+
+
+def personal_archive(user_id: int) -> Iterator[bytes]:
+    """Stream a ZIP with profile.ndjson plus posts, resources and chats of one user"""
+    entries = [("profile.ndjson", _buffered(_profile_lines(user_id)))]
+    for dataset in ("posts", "resources", "chats"):
+        rows = stream_rows(build_query(dataset, user_id=user_id))
+        entries.append((f"{dataset}.ndjson", encode("ndjson", column_names(dataset), rows)))
+    return zip_chunks(entries)
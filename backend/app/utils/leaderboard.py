@@ -0,0 +1,240 @@
+"""
+Set-based Leaderboard Recalculation and Windowed Leaderboard Queries
+"""
+from typing import Callable, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.utils.cache import TTLCache
+from app.utils.scoring import compute_points, points_sql, weights
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_DIFF_ENTRIES = 100
+
+# Recounted values for a range of leaderboard rows, built from joined
+# aggregates over the source tables instead of one query per user
+_RECOUNT_SELECT = """
+    SELECT lb.user_id AS user_id,
+           lb.total_resources AS old_resources,
+           lb.total_posts AS old_posts,
+           lb.package AS old_package,
+           lb.points AS old_points,
+           COALESCE(r.cnt, 0) AS new_resources,
+           COALESCE(p.cnt, 0) AS new_posts,
+           COALESCE(m.package, 0) AS new_package
+    FROM leaderboard lb
+    LEFT JOIN (
+        SELECT user_id, COUNT(*) AS cnt FROM resources
+        WHERE user_id BETWEEN :lo AND :hi GROUP BY user_id
+    ) r ON r.user_id = lb.user_id
+    LEFT JOIN (
+        SELECT user_id, COUNT(*) AS cnt FROM posts
+        WHERE user_id BETWEEN :lo AND :hi GROUP BY user_id
+    ) p ON p.user_id = lb.user_id
+    LEFT JOIN mentors m ON m.user_id = lb.user_id
+    WHERE lb.user_id BETWEEN :lo AND :hi
+"""
+
+_RECOUNT_UPDATE = f"""
+    UPDATE leaderboard lb
+    LEFT JOIN (
+        SELECT user_id, COUNT(*) AS cnt FROM resources
+        WHERE user_id BETWEEN :lo AND :hi GROUP BY user_id
+    ) r ON r.user_id = lb.user_id
+    LEFT JOIN (
+        SELECT user_id, COUNT(*) AS cnt FROM posts
+        WHERE user_id BETWEEN :lo AND :hi GROUP BY user_id
+    ) p ON p.user_id = lb.user_id
+    LEFT JOIN mentors m ON m.user_id = lb.user_id
+    SET lb.total_resources = COALESCE(r.cnt, 0),
+        lb.total_posts = COALESCE(p.cnt, 0),
+        lb.package = COALESCE(m.package, 0),
+        lb.points = {points_sql("COALESCE(r.cnt, 0)", "COALESCE(p.cnt, 0)", "COALESCE(m.package, 0)")}
+    WHERE lb.user_id BETWEEN :lo AND :hi
+"""
+
+
+def _iter_user_id_ranges(db: Session, chunk_size: int):
+    """Yield (lo, hi) user_id bounds covering at most chunk_size leaderboard rows each"""
+    last_user_id = 0
+    while True:
+        ids = db.execute(
+            text(
+                "SELECT user_id FROM leaderboard WHERE user_id > :after "
+                "ORDER BY user_id LIMIT :limit"
+            ),
+            {"after": last_user_id, "limit": chunk_size},
+        ).scalars().all()
+        if not ids:
+            return
+        yield ids[0], ids[-1], len(ids)
+        last_user_id = ids[-1]
+
+
+def recalculate_leaderboard(
+    db: Session,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    dry_run: bool = False,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> dict:
+    """
+    Recount resources, posts and package for every leaderboard row and recompute points
+
+    Rows are processed in user_id order, chunk_size rows at a time, and each
+    chunk is committed in its own short transaction.
+
+    Args:
+        db: Database session
+        chunk_size: Maximum number of leaderboard rows per chunk
+        dry_run: Report the rows that would change without writing anything
+        progress: Optional callback called as progress(processed, total) after each chunk
+
+    Returns:
+        Summary dict with processed/changed counts and, in dry-run mode, a
+        sample of per-user differences
+    """
+    total = db.execute(text("SELECT COUNT(*) FROM leaderboard")).scalar() or 0
+    params = weights()
+    processed = 0
+    changed = 0
+    chunks = 0
+    diff = []
+
+    for lo, hi, count in _iter_user_id_ranges(db, chunk_size):
+        rows = db.execute(text(_RECOUNT_SELECT), {"lo": lo, "hi": hi}).mappings().all()
+        for row in rows:
+            new_points = compute_points(row["new_resources"], row["new_posts"], row["new_package"])
+            if (
+                row["old_resources"] != row["new_resources"]
+                or row["old_posts"] != row["new_posts"]
+                or row["old_package"] != row["new_package"]
+                or float(row["old_points"] or 0) != new_points
+            ):
+                changed += 1
+                if dry_run and len(diff) < MAX_DIFF_ENTRIES:
+                    diff.append({
+                        "user_id": row["user_id"],
+                        "total_resources": [row["old_resources"], row["new_resources"]],
+                        "total_posts": [row["old_posts"], row["new_posts"]],
+                        "package": [row["old_package"], row["new_package"]],
+                        "points": [row["old_points"], new_points],
+                    })
+
+        if dry_run:
+            db.rollback()
+        else:
+            db.execute(text(_RECOUNT_UPDATE), {"lo": lo, "hi": hi, **params})
+            db.commit()
+
+        processed += count
+        chunks += 1
+        if progress:
+            progress(processed, total)
+
+    result = {
+        "dry_run": dry_run,
+        "processed_entries": processed,
+        "changed_entries": changed,
+        "chunks": chunks,
+    }
+    if dry_run:
+        result["diff"] = diff
+    return result
+
+
+WEEK = "week"
+MONTH = "month"
+
+# Window start dates, evaluated by MySQL so they agree with CURRENT_DATE()
+# used when the daily rollups are written
+_WINDOW_START = {
+    WEEK: "CURRENT_DATE() - INTERVAL WEEKDAY(CURRENT_DATE()) DAY",
+    MONTH: "CURRENT_DATE() - INTERVAL (DAYOFMONTH(CURRENT_DATE()) - 1) DAY",
+}
+
+# Windowed/per-branch pages are aggregated from rollups; cache them briefly
+windowed_cache = TTLCache(maxsize=256, ttl=60)
+
+
+def windowed_leaderboard(
+    db: Session,
+    window: Optional[str] = None,
+    branch: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> list:
+    """
+    Top contributors for the current week/month and/or a mentor branch
+
+    Windowed totals are summed from daily_contributions; points for a window
+    count only resources and posts (package is not a contribution). Without a
+    window, the all-time leaderboard is filtered by branch.
+
+    Returns:
+        List of dicts shaped like leaderboard rows (id, user_id, total_resources,
+        total_posts, package, points, updated_at)
+    """
+    params = {"skip": skip, "limit": limit, **weights()}
+    branch_join = ""
+    if branch:
+        branch_join = "JOIN mentors m ON m.user_id = t.user_id AND m.branch = :branch"
+        params["branch"] = branch
+
+    if window:
+        source = f"""
+            SELECT dc.user_id AS user_id,
+                   SUM(dc.total_resources) AS total_resources,
+                   SUM(dc.total_posts) AS total_posts
+            FROM daily_contributions dc
+            WHERE dc.day >= {_WINDOW_START[window]}
+            GROUP BY dc.user_id
+        """
+        points = points_sql("t.total_resources", "t.total_posts", "0")
+    else:
+        source = "SELECT user_id, total_resources, total_posts, package FROM leaderboard"
+        points = points_sql("t.total_resources", "t.total_posts", "t.package")
+
+    sql = f"""
+        SELECT lb.id AS id,
+               t.user_id AS user_id,
+               t.total_resources AS total_resources,
+               t.total_posts AS total_posts,
+               COALESCE(lb.package, 0) AS package,
+               {points} AS points,
+               lb.updated_at AS updated_at
+        FROM ({source}) t
+        {branch_join}
+        JOIN leaderboard lb ON lb.user_id = t.user_id
+        WHERE t.total_resources > 0 OR t.total_posts > 0 OR COALESCE(lb.package, 0) > 0
+        ORDER BY points DESC, t.user_id ASC
+        LIMIT :limit OFFSET :skip
+    """
+    return [dict(row) for row in db.execute(text(sql), params).mappings().all()]
+
+
+def rebuild_contribution_rollups(db: Session) -> int:
+    """
+    Rebuild daily_contributions from posts and resources
+
+    Used once to backfill history, or to repair drift. Returns the number of
+    rollup rows written.
+    """
+    db.execute(text("DELETE FROM daily_contributions"))
+    # The rebuilt rows already include any changes still waiting in the outbox
+    db.execute(text(
+        "UPDATE outbox_events SET status = 'done', processed_at = NOW() "
+        "WHERE event_type = 'contribution.changed' AND status = 'pending'"
+    ))
+    result = db.execute(text("""
+        INSERT INTO daily_contributions (user_id, day, total_resources, total_posts)
+        SELECT user_id, day, SUM(resources), SUM(posts)
+        FROM (
+            SELECT user_id, DATE(created_at) AS day, COUNT(*) AS resources, 0 AS posts
+            FROM resources GROUP BY user_id, DATE(created_at)
+            UNION ALL
+            SELECT user_id, DATE(created_at) AS day, 0 AS resources, COUNT(*) AS posts
+            FROM posts GROUP BY user_id, DATE(created_at)
+        ) c
+        GROUP BY user_id, day
+    """))
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,472 @@
+"""
+Local Filesystem Storage Backend
+
+Files are stored under LOCAL_STORAGE_ROOT and uploaded/downloaded through
+the /upload/files/{file_key} endpoints with URLs signed like S3 presigned
+URLs (HMAC of method, key and expiry with the app's SECRET_KEY), so the
+client code is the same for both backends.
+
+Uploads are streamed to a temporary file in chunks and moved into place
+atomically. Downloads support conditional requests (ETag/If-None-Match),
+single byte ranges, and are sent without copying through Python when the
+server supports the ASGI zero-copy send extension, or handed to nginx with
+X-Accel-Redirect when LOCAL_STORAGE_ACCEL_REDIRECT is set.
+"""
+import hashlib
+import hmac
+import mimetypes
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from email.utils import formatdate
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, urlencode
+import anyio
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+from app.config import settings
+from app.utils.storage import StorageBackend
+
+LOCAL_STORAGE_ROOT = os.path.abspath(os.getenv("LOCAL_STORAGE_ROOT", "uploads"))
+LOCAL_STORAGE_BASE_URL = os.getenv("LOCAL_STORAGE_BASE_URL", "http://localhost:8000").rstrip("/")
+LOCAL_STORAGE_MAX_UPLOAD_BYTES = int(os.getenv("LOCAL_STORAGE_MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+# Internal nginx location serving LOCAL_STORAGE_ROOT, e.g. "/protected-uploads/"
+LOCAL_STORAGE_ACCEL_REDIRECT = os.getenv("LOCAL_STORAGE_ACCEL_REDIRECT", "")
+
+CHUNK_SIZE = 64 * 1024
+MULTIPART_DIR = ".multipart"
+ZERO_COPY_EXTENSION = "http.response.zerocopysend"
+
+
+class ChecksumMismatch(ValueError):
+    """Uploaded body does not match the SHA-256 the URL was signed for"""
+
+
+class InvalidFileKey(ValueError):
+    pass
+
+
+def sign(method: str, file_key: str, expires: int, size: Optional[int] = None, sha256: Optional[str] = None) -> str:
+    message = f"{method}\n{file_key}\n{expires}"
+    if size is not None:
+        message += f"\n{size}"
+    if sha256 is not None:
+        message += f"\nsha256={sha256}"
+    return hmac.new(settings.SECRET_KEY.encode("utf-8"), message.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def verify_signature(
+    method: str,
+    file_key: str,
+    expires: int,
+    signature: str,
+    size: Optional[int] = None,
+    sha256: Optional[str] = None
+) -> bool:
+    """Whether a signed URL is authentic and not expired"""
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(sign(method, file_key, expires, size, sha256), signature)
+
+
+class LocalStorage(StorageBackend):
+    """Files on local disk, served by this API"""
+    name = "local"
+
+    def __init__(self, root: str = LOCAL_STORAGE_ROOT, base_url: str = LOCAL_STORAGE_BASE_URL):
+        self.root = root
+        self.base_url = base_url
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, file_key: str) -> str:
+        """Absolute path of a file key; rejects keys escaping the storage root"""
+        if not file_key or file_key.startswith("/") or "\\" in file_key or "\0" in file_key:
+            raise InvalidFileKey(file_key)
+        path = os.path.realpath(os.path.join(self.root, file_key))
+        if not path.startswith(os.path.realpath(self.root) + os.sep):
+            raise InvalidFileKey(file_key)
+        return path
+
+    def _signed_url(
+        self,
+        method: str,
+        file_key: str,
+        expiration: int,
+        size: Optional[int] = None,
+        sha256: Optional[str] = None
+    ) -> str:
+        expires = int(time.time()) + expiration
+        params = {"expires": expires, "signature": sign(method, file_key, expires, size, sha256)}
+        if size is not None:
+            params["size"] = size
+        if sha256 is not None:
+            params["sha256"] = sha256
+        return f"{self.base_url}/upload/files/{quote(file_key)}?{urlencode(params)}"
+
+    def upload_url(
+        self,
+        file_key: str,
+        content_type: str = "application/octet-stream",
+        expiration: int = 3600,
+        size: Optional[int] = None,
+        sha256: Optional[str] = None
+    ) -> Optional[str]:
+        self.path(file_key)
+        return self._signed_url("PUT", file_key, expiration, size, sha256)
+
+    def download_url(self, file_key: str, expiration: int = 3600) -> Optional[str]:
+        self.path(file_key)
+        return self._signed_url("GET", file_key, expiration)
+
+    def delete(self, file_key: str) -> bool:
+        try:
+            os.remove(self.path(file_key))
+            return True
+        except (OSError, InvalidFileKey):
+            return False
+
+    def exists(self, file_key: str) -> bool:
+        try:
+            return os.path.isfile(self.path(file_key))
+        except InvalidFileKey:
+            return False
+
+    def delete_many(self, file_keys: List[str]) -> int:
+        return sum(1 for file_key in file_keys if self.delete(file_key))
+
+    def list_files(self, prefix: str, page_size: int = 1000) -> Iterator[List[dict]]:
+        directory = os.path.join(self.root, os.path.dirname(prefix))
+        if not os.path.realpath(directory).startswith(os.path.realpath(self.root)):
+            raise InvalidFileKey(prefix)
+        keys = []
+        for dirpath, dirnames, filenames in os.walk(directory):
+            dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+            for filename in filenames:
+                if filename.startswith("."):
+                    continue  # uploads in progress
+                key = os.path.relpath(os.path.join(dirpath, filename), self.root).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    keys.append(key)
+        keys.sort()
+        for start in range(0, len(keys), page_size):
+            page = []
+            for key in keys[start:start + page_size]:
+                try:
+                    stat_result = os.stat(os.path.join(self.root, key))
+                except FileNotFoundError:
+                    continue
+                page.append({
+                    "key": key,
+                    "size": stat_result.st_size,
+                    "last_modified": datetime.utcfromtimestamp(stat_result.st_mtime),
+                })
+            yield page
+
+    def delete_prefix(self, prefix: str) -> int:
+        directory = os.path.join(self.root, prefix)
+        if not os.path.realpath(directory).startswith(os.path.realpath(self.root) + os.sep):
+            raise InvalidFileKey(prefix)
+        deleted = 0
+        for dirpath, _, filenames in os.walk(directory, topdown=False):
+            for filename in filenames:
+                os.remove(os.path.join(dirpath, filename))
+                deleted += 1
+            if dirpath != self.root:
+                try:
+                    os.rmdir(dirpath)
+                except OSError:
+                    pass
+        return deleted
+
+    def download_to(self, file_key: str, path: str) -> None:
+        shutil.copyfile(self.path(file_key), path)
+
+    def upload_from(self, path: str, file_key: str, content_type: str = "application/octet-stream") -> None:
+        target = self.path(file_key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".upload-")
+        os.close(fd)
+        try:
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    async def save_stream(
+        self,
+        file_key: str,
+        request: Request,
+        max_size: Optional[int] = None,
+        sha256: Optional[str] = None
+    ) -> int:
+        """
+        Stream a request body to the file, chunk by chunk
+
+        The body goes to a temporary file in the target directory that is
+        renamed over the destination when complete, so readers never see a
+        partial file.
+
+        Returns:
+            Number of bytes written
+
+        Raises:
+            OverflowError: if the body exceeds max_size (the size declared
+                when the URL was signed) or LOCAL_STORAGE_MAX_UPLOAD_BYTES
+            ChecksumMismatch: if the body's SHA-256 is not the declared one
+        """
+        size, _ = await _stream_to_file(request, self.path(file_key), max_size, sha256)
+        return size
+
+    # Multipart uploads keep their parts in MULTIPART_DIR/{upload_id}/ until completed
+
+    def _upload_dir(self, upload_id: str) -> str:
+        if not upload_id.isalnum():
+            raise InvalidFileKey(upload_id)
+        return os.path.join(self.root, MULTIPART_DIR, upload_id)
+
+    def create_multipart(self, file_key: str, content_type: str = "application/octet-stream") -> str:
+        self.path(file_key)
+        upload_id = uuid.uuid4().hex
+        directory = self._upload_dir(upload_id)
+        os.makedirs(directory)
+        with open(os.path.join(directory, "key"), "w") as fh:
+            fh.write(file_key)
+        return upload_id
+
+    def _check_upload(self, file_key: str, upload_id: str) -> str:
+        directory = self._upload_dir(upload_id)
+        try:
+            with open(os.path.join(directory, "key")) as fh:
+                if fh.read() != file_key:
+                    raise InvalidFileKey(file_key)
+        except FileNotFoundError:
+            raise InvalidFileKey(upload_id)
+        return directory
+
+    def part_upload_urls(self, file_key: str, upload_id: str, part_numbers: List[int], expiration: int = 3600) -> Dict[int, str]:
+        self._check_upload(file_key, upload_id)
+        expires = int(time.time()) + expiration
+        urls = {}
+        for part_number in part_numbers:
+            target = f"{MULTIPART_DIR}/{upload_id}/{part_number}"
+            query = urlencode({"expires": expires, "signature": sign("PUT", target, expires)})
+            urls[part_number] = f"{self.base_url}/upload/multipart/{upload_id}/parts/{part_number}?{query}"
+        return urls
+
+    async def save_part(self, upload_id: str, part_number: int, request: Request) -> str:
+        """Stream one part to disk; returns its ETag (quoted MD5, as S3 does)"""
+        directory = self._upload_dir(upload_id)
+        if not os.path.isdir(directory):
+            raise InvalidFileKey(upload_id)
+        _, md5 = await _stream_to_file(request, os.path.join(directory, f"{part_number}.part"))
+        etag = f'"{md5}"'
+        with open(os.path.join(directory, f"{part_number}.etag"), "w") as fh:
+            fh.write(etag)
+        return etag
+
+    def list_parts(self, file_key: str, upload_id: str) -> List[dict]:
+        directory = self._check_upload(file_key, upload_id)
+        parts = []
+        for name in os.listdir(directory):
+            if not name.endswith(".etag"):
+                continue
+            part_number = int(name[:-len(".etag")])
+            with open(os.path.join(directory, name)) as fh:
+                etag = fh.read()
+            size = os.path.getsize(os.path.join(directory, f"{part_number}.part"))
+            parts.append({"part_number": part_number, "etag": etag, "size": size})
+        return sorted(parts, key=lambda part: part["part_number"])
+
+    def complete_multipart(self, file_key: str, upload_id: str, parts: List[dict]) -> None:
+        directory = self._check_upload(file_key, upload_id)
+        received = {part["part_number"]: part["etag"] for part in self.list_parts(file_key, upload_id)}
+        for part in parts:
+            if received.get(part["part_number"]) != part["etag"]:
+                raise ValueError(f"Part {part['part_number']} is missing or does not match its ETag")
+        path = self.path(file_key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for part in parts:
+                    with open(os.path.join(directory, f"{part['part_number']}.part"), "rb") as src:
+                        shutil.copyfileobj(src, out, CHUNK_SIZE)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def abort_multipart(self, file_key: str, upload_id: str) -> None:
+        shutil.rmtree(self._upload_dir(upload_id), ignore_errors=True)
+
+    def stale_multipart_uploads(self, prefix: str, older_than: datetime) -> List[Tuple[str, str]]:
+        root = os.path.join(self.root, MULTIPART_DIR)
+        if not os.path.isdir(root):
+            return []
+        cutoff = older_than.replace(tzinfo=timezone.utc).timestamp()
+        stale = []
+        for upload_id in os.listdir(root):
+            key_path = os.path.join(root, upload_id, "key")
+            try:
+                if os.path.getmtime(key_path) >= cutoff:
+                    continue
+                with open(key_path) as fh:
+                    file_key = fh.read()
+            except OSError:
+                continue
+            if file_key.startswith(prefix):
+                stale.append((file_key, upload_id))
+        return stale
+
+
+async def _stream_to_file(
+    request: Request,
+    path: str,
+    max_size: Optional[int] = None,
+    sha256: Optional[str] = None
+) -> Tuple[int, str]:
+    """
+    Write a request body to path through a temporary file in the same
+    directory, renamed into place when complete (and only if it matches
+    sha256, when given)
+
+    Returns:
+        (size in bytes, hex MD5 of the body)
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+    os.close(fd)
+    limit = min(max_size, LOCAL_STORAGE_MAX_UPLOAD_BYTES) if max_size is not None else LOCAL_STORAGE_MAX_UPLOAD_BYTES
+    size = 0
+    digest = hashlib.md5(usedforsecurity=False)
+    content_digest = hashlib.sha256() if sha256 is not None else None
+    try:
+        async with await anyio.open_file(tmp_path, "wb") as out:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > limit:
+                    raise OverflowError(size)
+                if chunk:
+                    digest.update(chunk)
+                    if content_digest is not None:
+                        content_digest.update(chunk)
+                    await out.write(chunk)
+        if content_digest is not None and content_digest.hexdigest() != sha256:
+            raise ChecksumMismatch(content_digest.hexdigest())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return size, digest.hexdigest()
+
+
+def _etag(stat_result: os.stat_result) -> str:
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single "bytes=start-end" range into inclusive bounds
+
+    Returns None for headers that should be ignored (multiple ranges,
+    other units); raises ValueError for unsatisfiable ranges.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start, _, end = spec.strip().partition("-")
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length <= 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, min(end, size - 1)
+
+
+class FileRangeResponse(Response):
+    """Send all or part of a file, zero-copy when the server supports it"""
+
+    def __init__(self, path: str, start: int, end: int, status_code: int, headers: dict, media_type: str):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.count = end - start + 1
+        self.headers["content-length"] = str(self.count)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"] == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        if ZERO_COPY_EXTENSION in scope.get("extensions", {}):
+            with open(self.path, "rb") as fh:
+                await send({
+                    "type": ZERO_COPY_EXTENSION,
+                    "file": fh,
+                    "offset": self.start,
+                    "count": self.count,
+                    "more_body": False,
+                })
+            return
+        remaining = self.count
+        async with await anyio.open_file(self.path, "rb") as fh:
+            await fh.seek(self.start)
+            while remaining > 0:
+                chunk = await fh.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break  # file shrank while sending
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def file_response(request: Request, path: str, file_key: str) -> Response:
+    """Build the response for a download, honouring If-None-Match, If-Range and Range"""
+    stat_result = os.stat(path)
+    size = stat_result.st_size
+    etag = _etag(stat_result)
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    headers = {
+        "etag": etag,
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "accept-ranges": "bytes",
+        "cache-control": "private, max-age=3600",
+    }
+
+    # Weak comparison: the compression middleware sends the ETag weakened (W/)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [
+        t.strip().removeprefix("W/") for t in if_none_match.split(",")
+    ]):
+        return Response(status_code=304, headers=headers)
+
+    if LOCAL_STORAGE_ACCEL_REDIRECT:
+        # nginx serves the file itself (sendfile, ranges) from its internal location
+        headers["x-accel-redirect"] = LOCAL_STORAGE_ACCEL_REDIRECT.rstrip("/") + "/" + quote(file_key)
+        return Response(status_code=200, headers=headers, media_type=media_type)
+
+    start, end, status_code = 0, size - 1, 200
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and size and (not if_range or if_range.strip() == etag):
+        try:
+            bounds = _parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+        if bounds:
+            start, end = bounds
+            status_code = 206
+            headers["content-range"] = f"bytes {start}-{end}/{size}"
+    return FileRangeResponse(path, start, end, status_code, headers, media_type)
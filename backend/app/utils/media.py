@@ -0,0 +1,281 @@
+"""
+Media Processing Pipeline
+
+Posts and resources referencing an uploaded file record its storage key
+(Post.media_key / Resource.file_key) and enqueue a "media.uploaded" outbox
+event, which registers a pending MediaAsset for the key. The process_media
+job claims pending assets and processes up to MEDIA_WORKERS of them at a
+time in a process pool:
+
+- images get WebP variants (IMAGE_VARIANTS, longest side in pixels) stored
+  next to the original as "{stem}_{variant}.webp"
+- all files get their MIME type (sniffed from the content) and size; PDFs
+  also their page count
+
+Results are kept on the asset and copied into Post.media_info /
+Resource.file_info of every item using the file. Variants are stored by key
+only; the response schemas sign their URLs when a response is built
+(signed_info), from the storage backend's download URL cache. There is one
+asset per file key, so a file is processed once however many items
+reference it, and re-running a failed asset overwrites the same variant
+keys.
+
+Pillow and pypdf are optional: without them files still get their MIME
+type and size.
+"""
+import importlib.util
+import logging
+import mimetypes
+import os
+import tempfile
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from app.config import settings
+from app.models.media import MediaAsset
+from app.models.post import Post
+from app.models.resource import Resource
+from app.utils.storage import get_storage
+
+logger = logging.getLogger("app.media")
+
+PIL_AVAILABLE = importlib.util.find_spec("PIL") is not None
+PYPDF_AVAILABLE = importlib.util.find_spec("pypdf") is not None
+
+# (variant name, longest side); the thumbnail is always made, larger
+# variants only when the original is bigger
+IMAGE_VARIANTS = (("thumb", 320), ("medium", 960), ("large", 1920))
+VARIANT_QUALITY = 80
+IMAGE_TYPES = ("image/jpeg", "image/png", "image/gif", "image/webp", "image/bmp", "image/tiff")
+
+MAX_ATTEMPTS = 3
+STALE_AFTER_MINUTES = 30
+VARIANT_URL_EXPIRATION = 86400  # variant URLs are signed per response
+
+# Leading bytes -> MIME type; ZIP containers (docx, xlsx, ...) fall back to the extension
+_MAGIC = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"%PDF-", "application/pdf"),
+)
+
+# item_type -> (model, key column, info column)
+ITEMS = {
+    "post": (Post, Post.media_key, "media_info"),
+    "resource": (Resource, Resource.file_key, "file_info"),
+}
+
+
+def sniff_mime_type(path: str, file_key: str) -> str:
+    """MIME type from the file's first bytes, else from its extension"""
+    with open(path, "rb") as fh:
+        head = fh.read(16)
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for magic, mime_type in _MAGIC:
+        if head.startswith(magic):
+            return mime_type
+    return mimetypes.guess_type(file_key)[0] or "application/octet-stream"
+
+
+def variant_key(file_key: str, name: str) -> str:
+    stem, _ = os.path.splitext(file_key)
+    return f"{stem}_{name}.webp"
+
+
+def _image_info(storage, file_key: str, source: str, workdir: str) -> dict:
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        width, height = image.size
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+        variants = {}
+        for name, longest in IMAGE_VARIANTS:
+            if variants and max(width, height) <= longest:
+                break
+            resized = image.copy()
+            resized.thumbnail((longest, longest))
+            path = os.path.join(workdir, f"{name}.webp")
+            resized.save(path, "WEBP", quality=VARIANT_QUALITY)
+            key = variant_key(file_key, name)
+            storage.upload_from(path, key, "image/webp")
+            variants[name] = {"key": key, "width": resized.width, "height": resized.height}
+    return {"width": width, "height": height, "variants": variants}
+
+
+def _pdf_page_count(source: str) -> int:
+    from pypdf import PdfReader
+
+    return len(PdfReader(source).pages)
+
+
+def process_file(file_key: str) -> dict:
+    """
+    Derive metadata and image variants of one stored file
+
+    Runs in a worker process: downloads the file to a temporary directory,
+    uploads any variants, and returns the asset fields to record.
+    """
+    storage = get_storage()
+    with tempfile.TemporaryDirectory(prefix="media-") as workdir:
+        source = os.path.join(workdir, "source" + os.path.splitext(file_key)[1])
+        storage.download_to(file_key, source)
+        info = {"size": os.path.getsize(source), "mime_type": sniff_mime_type(source, file_key)}
+        if info["mime_type"] in IMAGE_TYPES and PIL_AVAILABLE:
+            info.update(_image_info(storage, file_key, source, workdir))
+        elif info["mime_type"] == "application/pdf" and PYPDF_AVAILABLE:
+            info["page_count"] = _pdf_page_count(source)
+    return info
+
+
+def asset_info(asset: MediaAsset) -> dict:
+    """What posts/resources store about their file: metadata plus variant keys and sizes"""
+    info = {"mime_type": asset.mime_type, "size": asset.size}
+    if asset.width is not None:
+        info["width"] = asset.width
+        info["height"] = asset.height
+    if asset.page_count is not None:
+        info["page_count"] = asset.page_count
+    if asset.variants:
+        info["variants"] = {
+            name: {"key": variant["key"], "width": variant["width"], "height": variant["height"]}
+            for name, variant in asset.variants.items()
+        }
+    return info
+
+
+def signed_info(info: Optional[dict]) -> Optional[dict]:
+    """Stored media_info/file_info with a signed URL added to each variant, for a response"""
+    if not info or not info.get("variants"):
+        return info
+    storage = get_storage()
+    variants = {}
+    for name, variant in info["variants"].items():
+        if "key" in variant:
+            variant = {**variant, "url": storage.download_url(variant["key"], expiration=VARIANT_URL_EXPIRATION)}
+        variants[name] = variant
+    return {**info, "variants": variants}
+
+
+def apply_to_items(db: Session, asset: MediaAsset) -> int:
+    """Copy a processed asset's info to every post/resource using its file. Does not commit."""
+    info = asset_info(asset)
+    updated = 0
+    for model, key_column, info_column in ITEMS.values():
+        updated += db.query(model).filter(key_column == asset.file_key).update(
+            {info_column: info}, synchronize_session=False
+        )
+    return updated
+
+
+def register_upload(db: Session, file_key: str) -> MediaAsset:
+    """
+    Get or create the asset of a file key (idempotent). Does not commit.
+
+    Items added after the file was processed get its info right away;
+    otherwise the process_media job fills it in.
+    """
+    asset = db.query(MediaAsset).filter(MediaAsset.file_key == file_key).first()
+    if asset is None:
+        try:
+            with db.begin_nested():
+                asset = MediaAsset(file_key=file_key, status="pending", attempts=0)
+                db.add(asset)
+        except IntegrityError:
+            # Registered concurrently by another item using the same file
+            asset = db.query(MediaAsset).filter(MediaAsset.file_key == file_key).one()
+    if asset.status == "done":
+        apply_to_items(db, asset)
+    return asset
+
+
+def _record_result(db: Session, asset: MediaAsset, info: dict) -> None:
+    asset.mime_type = info["mime_type"]
+    asset.size = info["size"]
+    asset.width = info.get("width")
+    asset.height = info.get("height")
+    asset.page_count = info.get("page_count")
+    asset.variants = info.get("variants")
+    asset.status = "done"
+    asset.error = None
+    asset.processed_at = func.now()
+    apply_to_items(db, asset)
+
+
+def process_pending(db: Session, batch_size: Optional[int] = None, workers: Optional[int] = None) -> int:
+    """
+    Process up to batch_size pending assets in a pool of worker processes
+
+    Assets left "processing" by a crashed worker for STALE_AFTER_MINUTES are
+    retried; an asset failing MAX_ATTEMPTS times is marked failed.
+
+    Returns:
+        Number of assets processed successfully
+    """
+    # updated_at is set by the database: compare on its clock
+    db.query(MediaAsset).filter(
+        MediaAsset.status == "processing",
+        MediaAsset.updated_at < func.timestampadd(text("MINUTE"), -STALE_AFTER_MINUTES, func.now())
+    ).update({"status": "pending"}, synchronize_session=False)
+    assets = db.query(MediaAsset).filter(
+        MediaAsset.status == "pending"
+    ).order_by(MediaAsset.id).limit(batch_size or settings.MEDIA_BATCH_SIZE).all()
+    if not assets:
+        db.commit()
+        return 0
+    for asset in assets:
+        asset.status = "processing"
+        asset.attempts += 1
+    db.commit()
+
+    # Imported here: the process pool machinery is slow to import and only needed by this job
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    done = 0
+    # Spawned rather than forked: the S3 client and pooled DB connections are not fork-safe
+    with ProcessPoolExecutor(
+        max_workers=workers or settings.MEDIA_WORKERS,
+        mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        futures = {pool.submit(process_file, asset.file_key): asset for asset in assets}
+        for future in as_completed(futures):
+            asset = futures[future]
+            try:
+                _record_result(db, asset, future.result())
+                done += 1
+            except Exception as e:
+                db.rollback()
+                logger.warning("Processing %s failed (attempt %s): %s", asset.file_key, asset.attempts, e)
+                asset.status = "failed" if asset.attempts >= MAX_ATTEMPTS else "pending"
+                asset.error = str(e)[:2000]
+            db.commit()
+    return done
+
+
+def delete_derived(db: Session, file_key: str) -> int:
+    """
+    Delete the stored variants and the asset of a file being deleted. Does not commit.
+
+    Returns:
+        Number of variants deleted
+    """
+    asset = db.query(MediaAsset).filter(MediaAsset.file_key == file_key).first()
+    if asset is None:
+        return 0
+    storage = get_storage()
+    deleted = 0
+    for variant in (asset.variants or {}).values():
+        if storage.delete(variant["key"]):
+            deleted += 1
+    db.delete(asset)
+    return deleted
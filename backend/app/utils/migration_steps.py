@@ -0,0 +1,156 @@
+"""
+Schema Migrations
+
+Numbered in the order they are applied; never edit or renumber one that
+has shipped. Versions 1-4 are the steps of the former hand-run
+database_migrations.sql, so databases that ran some or all of it converge
+on the same schema.
+"""
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+from app.utils.migrations import Operations, migration
+
+
+@migration(1, "Admin profile, resource type, moderation flag, post media and chat read status columns")
+def legacy_columns(op: Operations) -> None:
+    op.add_column("admin", "department_name", "VARCHAR(255) NULL")
+    op.add_column("admin", "designation", "VARCHAR(255) NULL")
+    op.add_column("admin", "contact_number", "VARCHAR(20) NULL")
+    op.add_column("admin", "updated_at", "DATETIME NULL")
+    op.add_column("resources", "resource_type", "VARCHAR(50) NOT NULL DEFAULT 'OTHER'")
+    op.add_column("resources", "is_approved", "BOOLEAN NOT NULL DEFAULT TRUE")
+    op.add_column("posts", "media_url", "VARCHAR(500) NULL")
+    op.add_column("posts", "is_approved", "BOOLEAN NOT NULL DEFAULT TRUE")
+    op.add_column("chats", "is_read", "BOOLEAN NOT NULL DEFAULT FALSE")
+
+
+@migration(2, "Moderation queue keyset indexes")
+def moderation_indexes(op: Operations) -> None:
+    op.add_index("posts", "idx_post_moderation", ["is_approved", "created_at", "id"])
+    op.add_index("resources", "idx_resource_moderation", ["is_approved", "created_at", "id"])
+
+
+@migration(3, "Account deletion: users.disabled_at")
+def user_disabled_at(op: Operations) -> None:
+    op.add_column("users", "disabled_at", "DATETIME NULL")
+
+
+@migration(4, "Media pipeline: upload keys and derived info on posts and resources")
+def media_columns(op: Operations) -> None:
+    op.add_column("posts", "media_key", "VARCHAR(500) NULL")
+    op.add_column("posts", "media_info", "JSON NULL")
+    op.add_index("posts", "ix_posts_media_key", ["media_key"])
+    op.add_column("resources", "file_key", "VARCHAR(500) NULL")
+    op.add_column("resources", "file_info", "JSON NULL")
+    op.add_index("resources", "ix_resources_file_key", ["file_key"])
+
+
+@migration(5, "Store roles and resource types as upper-case enum names")
+def uppercase_enums(op: Operations) -> None:
+    """
+    database_setup.sql declared users.role as ENUM('mentor', 'mentee',
+    'admin') and database_migrations.sql resources.resource_type as
+    ENUM('Study Material', ...), while the models store the upper-case
+    names. Convert both columns to VARCHAR and their values to the names.
+
+    Changing a column's type rebuilds the table (writes wait meanwhile);
+    users and resources are small enough for that. Only MySQL databases
+    were created by those scripts.
+    """
+    if not op.mysql:
+        return
+    if op.is_enum("users", "role"):
+        op.execute("ALTER TABLE users MODIFY COLUMN role VARCHAR(50) NOT NULL")
+    # The tables' collation is case-insensitive: compare as binary
+    op.execute("UPDATE users SET role = UPPER(role) WHERE BINARY role <> BINARY UPPER(role)")
+    if op.is_enum("resources", "resource_type"):
+        op.execute("ALTER TABLE resources MODIFY COLUMN resource_type VARCHAR(50) NOT NULL DEFAULT 'OTHER'")
+    op.execute(
+        "UPDATE resources SET resource_type = UPPER(REPLACE(resource_type, ' ', '_')) "
+        "WHERE BINARY resource_type <> BINARY UPPER(REPLACE(resource_type, ' ', '_'))"
+    )
+
+
+@migration(6, "Hot-path indexes for chats, posts, resources and the leaderboard")
+def hot_path_indexes(op: Operations) -> None:
+    # Conversation polling: both directions of a pair, in time order
+    op.add_index("chats", "idx_chat_conversation", ["sender_id", "receiver_id", "created_at"])
+    # Unread counts per sender
+    op.add_index("chats", "idx_chat_unread", ["receiver_id", "is_read", "sender_id"])
+    # A user's posts (profile, export, account deletion, contribution counts)
+    op.add_index("posts", "idx_post_user", ["user_id", "created_at"])
+    # Resource list filtered by author or category, newest first
+    op.add_index("resources", "idx_resource_user", ["user_id", "is_approved", "created_at"])
+    op.add_index("resources", "idx_resource_category", ["category", "is_approved", "created_at"])
+    # SQL fallback of the leaderboard: points descending, ties by user id
+    op.add_index("leaderboard", "idx_leaderboard_points", ["points DESC", "user_id"])
+
+
+LEGACY_SCORING_TRIGGERS = ("trg_resources_ai", "trg_resources_ad", "trg_posts_ai", "trg_posts_ad", "trg_mentors_au")
+
+
+@migration(7, "Drop the leaderboard triggers replaced by app-side scoring, then recount")
+def drop_scoring_triggers(op: Operations) -> None:
+    """
+    Leaderboard counters are maintained by app.utils.scoring in the
+    transaction writing the content. Databases that installed the old
+    triggers (POST /admin/db/install) counted every post and resource twice
+    until then; drop the triggers and recount the counters they inflated.
+    """
+    if not op.mysql:
+        return
+    found = op.conn.execute(
+        text(
+            "SELECT TRIGGER_NAME FROM information_schema.TRIGGERS "
+            "WHERE TRIGGER_SCHEMA = DATABASE() AND TRIGGER_NAME IN :names"
+        ).bindparams(bindparam("names", expanding=True)),
+        {"names": list(LEGACY_SCORING_TRIGGERS)}
+    ).scalars().all()
+    if not found:
+        return
+    for trigger in found:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+    from app.utils.leaderboard import recalculate_leaderboard
+
+    db = Session(bind=op.conn)
+    try:
+        recalculate_leaderboard(db)
+    finally:
+        db.close()
+
+
+@migration(8, "Per-user content objects; media variant keys instead of signed URLs")
+def unsigned_media_info(op: Operations) -> None:
+    """
+    Uploads are deduplicated per user: content_objects is unique on
+    (created_by, sha256) instead of sha256. Existing objects keep their
+    keys ({file_type}/sha256/{hash}.{ext}); new ones include the owner.
+
+    media_info/file_info held variant URLs signed for 7 days when the file
+    was processed, long expired since. Rewrite them from the processed
+    assets; responses now sign the URLs from the stored keys.
+    """
+    op.add_index("content_objects", "uq_content_object_owner_sha256", ["created_by", "sha256"], unique=True)
+    op.drop_index("content_objects", ["sha256"])
+
+    from app.models.media import MediaAsset
+    from app.utils.media import apply_to_items
+
+    db = Session(bind=op.conn)
+    try:
+        last_id = 0
+        while True:
+            assets = db.query(MediaAsset).filter(
+                MediaAsset.id > last_id,
+                MediaAsset.status == "done",
+                MediaAsset.variants.is_not(None)
+            ).order_by(MediaAsset.id).limit(500).all()
+            if not assets:
+                break
+            for asset in assets:
+                apply_to_items(db, asset)
+            last_id = assets[-1].id
+            db.expunge_all()
+    finally:
+        db.close()
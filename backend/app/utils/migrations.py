@@ -0,0 +1,210 @@
+"""
+Versioned Schema Migrations
+
+Changes to existing tables are numbered migrations, registered with
+@migration in app/utils/migration_steps.py; schema_migrations records the
+ones applied, and its highest version is the schema version. upgrade()
+(run by `python -m app.bootstrap`) brings a database up to date:
+
+- a database without any of the app's tables gets every table from the
+  models and is stamped with the latest version: the models are the schema
+  at head
+- otherwise missing tables are created from the models (new tables need no
+  migration) and pending migrations run in order, each recorded as soon as
+  it finishes
+
+MySQL commits DDL implicitly, so a migration cannot be rolled back halfway.
+Each one checks before it changes anything (column missing, index missing,
+column still an ENUM...) and is simply run again after a failure. This is
+also how databases created from the old hand-run SQL scripts, in whatever
+state they are in, start from version 0.
+
+Indexes are added with online DDL (ALGORITHM=INPLACE, LOCK=NONE): reads and
+writes continue while the index builds, and MySQL refuses the statement
+rather than silently locking the table when the change cannot be made
+online. Concurrent runs (several workers deploying at once) wait for each
+other on a MySQL named lock.
+
+Adding a migration: register the next version in migration_steps.py and
+make the same change to the model, so new databases match.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import Enum, func, insert, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+from app.db import Base
+from app.models.schema_migration import SchemaMigration
+
+logger = logging.getLogger("app.migrations")
+
+LOCK_NAME = "app:schema_migrations"
+LOCK_TIMEOUT_SECONDS = 600
+
+# version -> (description, upgrade(op))
+MIGRATIONS: Dict[int, Tuple[str, Callable[["Operations"], None]]] = {}
+
+
+def migration(version: int, description: str):
+    """Register a function as the upgrade of a schema version"""
+    def decorator(func: Callable[["Operations"], None]):
+        if version in MIGRATIONS:
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS[version] = (description, func)
+        return func
+    return decorator
+
+
+class Operations:
+    """Idempotent schema changes on one connection"""
+
+    def __init__(self, conn: Connection):
+        self.conn = conn
+        self.mysql = conn.dialect.name == "mysql"
+
+    def _inspector(self):
+        # A fresh inspector per check: a cached one would not see our own changes
+        return inspect(self.conn)
+
+    def execute(self, sql: str, **params) -> int:
+        return self.conn.execute(text(sql), params).rowcount
+
+    def _column(self, table: str, column: str) -> Optional[dict]:
+        for info in self._inspector().get_columns(table):
+            if info["name"] == column:
+                return info
+        return None
+
+    def has_column(self, table: str, column: str) -> bool:
+        return self._column(table, column) is not None
+
+    def is_enum(self, table: str, column: str) -> bool:
+        info = self._column(table, column)
+        return info is not None and isinstance(info["type"], Enum)
+
+    def has_index(self, table: str, name: str, columns: Sequence[str]) -> bool:
+        """Whether the table has an index of this name, or one on exactly these columns"""
+        names = [column.split()[0] for column in columns]
+        return any(
+            index["name"] == name or list(index["column_names"]) == names
+            for index in self._inspector().get_indexes(table)
+        )
+
+    def add_column(self, table: str, column: str, definition: str) -> bool:
+        """Add a column unless it exists; appended last, so MySQL adds it instantly"""
+        if self.has_column(table, column):
+            return False
+        self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
+
+    def add_index(self, table: str, name: str, columns: Sequence[str], unique: bool = False) -> bool:
+        """
+        Add an index online unless it (or one on the same columns) exists
+
+        Columns may carry a direction, e.g. "points DESC".
+        """
+        if self.has_index(table, name, columns):
+            return False
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        column_list = ", ".join(columns)
+        if self.mysql:
+            self.execute(f"ALTER TABLE {table} ADD {kind} {name} ({column_list}), ALGORITHM=INPLACE, LOCK=NONE")
+        else:
+            self.execute(f"CREATE {kind} {name} ON {table} ({column_list})")
+        return True
+
+    def drop_index(self, table: str, columns: Sequence[str]) -> bool:
+        """Drop the index on exactly these columns, whatever its name, if there is one"""
+        for index in self._inspector().get_indexes(table):
+            if list(index["column_names"]) == list(columns):
+                if self.mysql:
+                    self.execute(f"ALTER TABLE {table} DROP INDEX {index['name']}, ALGORITHM=INPLACE, LOCK=NONE")
+                else:
+                    self.execute(f"DROP INDEX {index['name']}")
+                return True
+        return False
+
+
+def _load_steps() -> None:
+    import app.utils.migration_steps  # noqa: F401  (registers migrations)
+
+
+def head_version() -> int:
+    _load_steps()
+    return max(MIGRATIONS, default=0)
+
+
+def current_version(conn: Connection) -> int:
+    """Schema version of a database; 0 if it has never been migrated"""
+    if not inspect(conn).has_table(SchemaMigration.__tablename__):
+        return 0
+    return conn.execute(select(func.max(SchemaMigration.version))).scalar() or 0
+
+
+def pending_migrations(conn: Connection) -> List[Tuple[int, str]]:
+    """(version, description) of the migrations not applied yet, in order"""
+    _load_steps()
+    version = current_version(conn)
+    return [(v, MIGRATIONS[v][0]) for v in sorted(MIGRATIONS) if v > version]
+
+
+def _record(conn: Connection, version: int, duration_ms: Optional[int]) -> None:
+    conn.execute(insert(SchemaMigration).values(
+        version=version,
+        description=MIGRATIONS[version][0],
+        duration_ms=duration_ms
+    ))
+    conn.commit()
+
+
+@contextmanager
+def _migration_lock(conn: Connection):
+    """Serialize migration runs across hosts (MySQL only)"""
+    if conn.dialect.name != "mysql":
+        yield
+        return
+    acquired = conn.execute(
+        text("SELECT GET_LOCK(:name, :timeout)"),
+        {"name": LOCK_NAME, "timeout": LOCK_TIMEOUT_SECONDS}
+    ).scalar()
+    if acquired != 1:
+        raise RuntimeError(f"Timed out after {LOCK_TIMEOUT_SECONDS}s waiting for another migration run")
+    try:
+        yield
+    finally:
+        conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": LOCK_NAME})
+
+
+def upgrade(engine: Engine) -> dict:
+    """
+    Create missing tables and apply pending migrations
+
+    Returns:
+        {"created": table names, "applied": versions, "version": schema version}
+    """
+    _load_steps()
+    with engine.connect() as conn, _migration_lock(conn):
+        existing = set(inspect(conn).get_table_names())
+        Base.metadata.create_all(bind=conn)
+        conn.commit()
+        created = sorted(set(Base.metadata.tables) - existing)
+        if created:
+            logger.info("Created tables: %s", ", ".join(created))
+
+        if not existing & (set(Base.metadata.tables) - {SchemaMigration.__tablename__}):
+            # New database: created at head, nothing to migrate
+            for version in sorted(MIGRATIONS):
+                _record(conn, version, None)
+            return {"created": created, "applied": [], "version": head_version()}
+
+        applied = []
+        for version, description in pending_migrations(conn):
+            logger.info("Applying migration %s: %s", version, description)
+            started = time.perf_counter()
+            MIGRATIONS[version][1](Operations(conn))
+            conn.commit()
+            _record(conn, version, int((time.perf_counter() - started) * 1000))
+            applied.append(version)
+        return {"created": created, "applied": applied, "version": current_version(conn)}
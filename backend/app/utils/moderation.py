@@ -0,0 +1,237 @@
+"""
+Bulk Moderation and the Moderation Queue
+
+Approves, rejects or deletes posts/resources by ID list or filter using
+set-based UPDATE/DELETE statements over bounded chunks, each committed in
+its own short transaction. Deletions adjust leaderboard and dashboard
+counters in the same transaction as the DELETE.
+
+The moderation queue hands each admin the next items in
+(is_approved, created_at, id) order that no other admin currently holds a
+lease on. Candidate rows are locked with FOR UPDATE SKIP LOCKED while the
+lease is written, so concurrent admins never receive the same item.
+"""
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import and_, bindparam, func, select, text, tuple_
+from sqlalchemy.orm import Session, selectinload
+from app.models.moderation_lease import ModerationLease
+from app.utils import stats
+from app.utils.dedup import release_item_files
+from app.utils.scoring import apply_deltas, sync_rank
+
+APPROVE = "approve"
+REJECT = "reject"
+DELETE = "delete"
+ACTIONS = (APPROVE, REJECT, DELETE)
+
+_OUTCOME = {APPROVE: "approved", REJECT: "rejected", DELETE: "deleted"}
+
+# Lease item_type for each moderated table
+ITEM_TYPES = {"posts": "post", "resources": "resource"}
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def _chunks(items: List[int], size: int) -> Iterable[List[int]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def select_ids(
+    db: Session,
+    model,
+    approved: Optional[bool] = None,
+    user_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    limit: int = 1000,
+) -> List[int]:
+    """IDs of rows matching a moderation filter, oldest first"""
+    query = db.query(model.id)
+    if approved is not None:
+        query = query.filter(model.is_approved == approved)
+    if user_id is not None:
+        query = query.filter(model.user_id == user_id)
+    if created_after is not None:
+        query = query.filter(model.created_at >= created_after)
+    if created_before is not None:
+        query = query.filter(model.created_at < created_before)
+    return [row.id for row in query.order_by(model.id).limit(limit).all()]
+
+
+def bulk_moderate(
+    db: Session,
+    model,
+    action: str,
+    ids: List[int],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> dict:
+    """
+    Apply a moderation action to the given post/resource IDs
+
+    Args:
+        db: Database session
+        model: Post or Resource
+        action: "approve", "reject" or "delete"
+        ids: Target row IDs
+        chunk_size: Rows per UPDATE/DELETE statement and transaction
+
+    Returns:
+        Mapping of ID -> outcome ("approved", "rejected", "deleted" or "not_found")
+    """
+    counter = "posts" if model.__tablename__ == "posts" else "resources"
+    outcomes = {}
+    for chunk in _chunks(sorted(set(ids)), chunk_size):
+        # Locked so the counter deltas match the rows this DELETE removes
+        # (a concurrent delete of the same rows waits, then finds them gone)
+        rows = (
+            db.query(model.id, model.user_id, model.created_at)
+            .filter(model.id.in_(chunk))
+            .with_for_update()
+            .all()
+        )
+        found = [row.id for row in rows]
+        for target_id in chunk:
+            outcomes[target_id] = "not_found"
+        if not found:
+            continue
+
+        touched_users = set()
+        release_leases(db, model, found)
+        if action == DELETE:
+            deltas = {}
+            for row in rows:
+                key = (row.user_id, row.created_at.date() if row.created_at else None)
+                r, p = deltas.get(key, (0, 0))
+                deltas[key] = (r + 1, p) if counter == "resources" else (r, p + 1)
+                touched_users.add(row.user_id)
+            negated = {key: (-r, -p) for key, (r, p) in deltas.items()}
+            release_item_files(db, model, found)
+            db.query(model).filter(model.id.in_(found)).delete(synchronize_session=False)
+            apply_deltas(db, negated)
+            stats.increment(db, **{counter: -len(found)})
+        else:
+            db.query(model).filter(model.id.in_(found)).update(
+                {model.is_approved: action == APPROVE}, synchronize_session=False
+            )
+        db.commit()
+        if touched_users:
+            sync_rank(db, *touched_users)
+        for target_id in found:
+            outcomes[target_id] = _OUTCOME[action]
+    return outcomes
+
+
+# Takes over a lease only when it expired or is already the admin's: the
+# lease read by the queue query comes from the transaction's snapshot and may
+# have been taken since. MySQL applies the assignments in order, so
+# expires_at sees the new admin_user_id.
+_UPSERT_LEASE = """
+    INSERT INTO moderation_leases (item_type, item_id, admin_user_id, expires_at)
+    VALUES (:item_type, :item_id, :admin_user_id, :expires_at)
+    ON DUPLICATE KEY UPDATE
+        admin_user_id = IF(expires_at <= :now OR admin_user_id = :admin_user_id, :admin_user_id, admin_user_id),
+        expires_at = IF(admin_user_id = :admin_user_id, :expires_at, expires_at)
+"""
+
+_HELD_LEASES = """
+    SELECT item_id FROM moderation_leases
+    WHERE item_type = :item_type AND item_id IN :item_ids AND admin_user_id = :admin_user_id
+    FOR UPDATE
+"""
+
+
+def encode_cursor(row) -> str:
+    return f"{int(row.is_approved)}|{row.created_at.isoformat()}|{row.id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[bool, datetime, int]:
+    try:
+        approved, created_at, row_id = cursor.split("|")
+        return approved == "1", datetime.fromisoformat(created_at), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def lease_items(
+    db: Session,
+    model,
+    admin_user_id: int,
+    limit: int = 20,
+    lease_seconds: int = 300,
+    cursor: Optional[str] = None,
+    approved: Optional[bool] = None,
+) -> Tuple[list, Optional[str], datetime]:
+    """
+    Lease the next unleased items of the queue to an admin
+
+    Items already leased to the same admin are handed out again (and their
+    lease renewed). An item leased by another admin after this transaction's
+    snapshot is left out, so a page can hold fewer than limit items. Pass
+    the returned cursor back to continue after the last item of this page.
+    Does not commit: the caller should serialize the items and then commit,
+    which releases the row locks.
+
+    Returns:
+        (items, next_cursor, lease_expires_at)
+    """
+    item_type = ITEM_TYPES[model.__tablename__]
+    now = db.execute(select(func.now())).scalar()
+    expires_at = now + timedelta(seconds=lease_seconds)
+
+    query = (
+        db.query(model)
+        .outerjoin(
+            ModerationLease,
+            and_(
+                ModerationLease.item_type == item_type,
+                ModerationLease.item_id == model.id,
+                ModerationLease.expires_at > now,
+                ModerationLease.admin_user_id != admin_user_id,
+            ),
+        )
+        .filter(ModerationLease.item_id.is_(None))
+    )
+    if approved is not None:
+        query = query.filter(model.is_approved == approved)
+    if cursor:
+        query = query.filter(
+            tuple_(model.is_approved, model.created_at, model.id) > tuple_(*decode_cursor(cursor))
+        )
+    rows = (
+        query.order_by(model.is_approved, model.created_at, model.id)
+        .limit(limit)
+        .options(selectinload(model.user))
+        .with_for_update(skip_locked=True, of=model)
+        .all()
+    )
+    items = []
+    if rows:
+        db.execute(text(_UPSERT_LEASE), [
+            {"item_type": item_type, "item_id": row.id, "admin_user_id": admin_user_id,
+             "expires_at": expires_at, "now": now}
+            for row in rows
+        ])
+        # A locking read sees the leases as they are now, not as in the snapshot
+        held = set(db.execute(
+            text(_HELD_LEASES).bindparams(bindparam("item_ids", expanding=True)),
+            {"item_type": item_type, "item_ids": [row.id for row in rows], "admin_user_id": admin_user_id}
+        ).scalars())
+        items = [row for row in rows if row.id in held]
+    next_cursor = encode_cursor(rows[-1]) if len(rows) == limit else None
+    return items, next_cursor, expires_at
+
+
+def release_leases(db: Session, model, ids: List[int], admin_user_id: Optional[int] = None) -> int:
+    """Drop leases on items (optionally only those held by one admin). Does not commit."""
+    if not ids:
+        return 0
+    query = db.query(ModerationLease).filter(
+        ModerationLease.item_type == ITEM_TYPES[model.__tablename__],
+        ModerationLease.item_id.in_(ids),
+    )
+    if admin_user_id is not None:
+        query = query.filter(ModerationLease.admin_user_id == admin_user_id)
+    return query.delete(synchronize_session=False)
@@ -0,0 +1,76 @@
+"""
+Multipart Upload Bookkeeping
+
+Multipart uploads are tracked in the multipart_uploads table so that only
+their owner can sign parts, complete or abort them, and so that uploads
+abandoned by the client can be aborted by the abort_stale_uploads job
+(storage keeps unfinished parts, and bills for them on S3, until then).
+"""
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+from app.models.upload import MultipartUpload
+from app.utils.storage import get_storage
+
+logger = logging.getLogger("app.multipart")
+
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 minimum for every part but the last
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+MAX_PARTS = 10000
+MAX_FILE_SIZE = 5 * 1024 * 1024 * 1024
+STALE_AFTER_HOURS = 24
+
+# Key prefixes generated by the upload router
+UPLOAD_PREFIXES = ("post/", "resource/")
+
+
+def part_count(size: int, part_size: int) -> int:
+    return max(math.ceil(size / part_size), 1)
+
+
+def choose_part_size(size: int, requested: Optional[int] = None) -> int:
+    """Part size to use: the requested one (at least MIN_PART_SIZE), grown so the file fits in MAX_PARTS"""
+    part_size = max(requested or DEFAULT_PART_SIZE, MIN_PART_SIZE)
+    return max(part_size, math.ceil(size / MAX_PARTS))
+
+
+def abort_stale_uploads(db: Session) -> int:
+    """
+    Abort multipart uploads started more than STALE_AFTER_HOURS ago and not
+    completed, including ones storage knows about but the table does not
+
+    Returns:
+        Number of uploads aborted
+    """
+    storage = get_storage()
+    aborted = 0
+
+    # created_at is set by the database: compare on its clock
+    stale = db.query(MultipartUpload).filter(
+        MultipartUpload.status == "in_progress",
+        MultipartUpload.created_at < func.timestampadd(text("HOUR"), -STALE_AFTER_HOURS, func.now())
+    ).all()
+    for upload in stale:
+        storage.abort_multipart(upload.file_key, upload.upload_id)
+        upload.status = "aborted"
+        db.commit()
+        aborted += 1
+
+    # Storage reports start times in UTC
+    cutoff = datetime.utcnow() - timedelta(hours=STALE_AFTER_HOURS)
+    for prefix in UPLOAD_PREFIXES:
+        for file_key, upload_id in storage.stale_multipart_uploads(prefix, cutoff):
+            storage.abort_multipart(file_key, upload_id)
+            db.query(MultipartUpload).filter(
+                MultipartUpload.upload_id == upload_id,
+                MultipartUpload.status == "in_progress"
+            ).update({"status": "aborted"}, synchronize_session=False)
+            db.commit()
+            aborted += 1
+
+    if aborted:
+        logger.info("Aborted %s stale multipart uploads", aborted)
+    return aborted
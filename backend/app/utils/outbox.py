@@ -0,0 +1,130 @@
+"""
+Transactional Outbox
+
+Write paths call enqueue() on their own session so that follow-up work is
+recorded atomically with the main row and the request can return right
+after its single commit. A background dispatcher drains due events in
+batches: each handler runs in a savepoint together with marking its event
+done, so an event's effects are committed exactly once. Failed events are
+retried with exponential backoff until MAX_ATTEMPTS.
+
+A deadlock or lock wait timeout in a handler is different: MySQL may have
+rolled back the whole transaction, claims and savepoint included. The batch
+is then rolled back and ends, and its events are claimed again by the next
+run without counting an attempt.
+"""
+import json
+import logging
+from typing import Callable, Dict
+from sqlalchemy import func, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from app.models.outbox import OutboxEvent
+
+logger = logging.getLogger("app.outbox")
+
+MAX_ATTEMPTS = 8
+MAX_BACKOFF_SECONDS = 3600
+DEFAULT_BATCH_SIZE = 100
+
+# MySQL errors after which the transaction may be gone: lock wait timeout, deadlock
+TRANSACTION_ABORTED_CODES = (1205, 1213)
+
+# event_type -> handler(db, event)
+HANDLERS: Dict[str, Callable[[Session, OutboxEvent], None]] = {}
+
+
+def handler(event_type: str):
+    """Register a function as the handler for an event type"""
+    def decorator(func: Callable[[Session, OutboxEvent], None]):
+        HANDLERS[event_type] = func
+        return func
+    return decorator
+
+
+def enqueue(db: Session, event_type: str, payload: dict) -> None:
+    """Record an event on the caller's session. Does not commit."""
+    db.add(OutboxEvent(event_type=event_type, payload=payload))
+
+
+def _transaction_aborted(error: BaseException) -> bool:
+    """
+    Whether an error is a deadlock or lock wait timeout, or was raised while
+    handling one (the savepoint rollback fails once MySQL dropped it)
+    """
+    while error is not None:
+        if isinstance(error, OperationalError):
+            args = getattr(error.orig, "args", ())
+            if args and args[0] in TRANSACTION_ABORTED_CODES:
+                return True
+        error = error.__context__
+    return False
+
+
+def dispatch_batch(db: Session, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Process up to batch_size due events and commit
+
+    Rows are claimed with FOR UPDATE SKIP LOCKED, so several workers can
+    drain the outbox concurrently without handling the same event twice.
+
+    Returns:
+        Number of events processed successfully (0 when the batch was rolled
+        back after a deadlock or lock wait timeout)
+    """
+    events = (
+        db.query(OutboxEvent)
+        .filter(OutboxEvent.status == "pending", OutboxEvent.available_at <= func.now())
+        .order_by(OutboxEvent.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    done = 0
+    for event in events:
+        handle = HANDLERS.get(event.event_type)
+        try:
+            if handle is None:
+                raise LookupError(f"No handler for event type {event.event_type!r}")
+            with db.begin_nested():
+                handle(db, event)
+            event.status = "done"
+            event.processed_at = func.now()
+            done += 1
+        except Exception as e:
+            if _transaction_aborted(e):
+                db.rollback()
+                logger.warning(json.dumps({
+                    "event": "outbox_batch_rolled_back",
+                    "id": event.id,
+                    "event_type": event.event_type,
+                    "error": str(e),
+                }))
+                return 0
+            event.attempts += 1
+            event.last_error = str(e)[:2000]
+            if event.attempts >= MAX_ATTEMPTS:
+                event.status = "failed"
+            else:
+                backoff = min(2 ** event.attempts, MAX_BACKOFF_SECONDS)
+                event.available_at = func.timestampadd(text("SECOND"), backoff, func.now())
+            logger.warning(json.dumps({
+                "event": "outbox_event_failed",
+                "id": event.id,
+                "event_type": event.event_type,
+                "attempts": event.attempts,
+                "error": str(e),
+            }))
+    db.commit()
+    return done
+
+
+def dispatch_pending(db: Session, batch_size: int = DEFAULT_BATCH_SIZE, max_batches: int = 50) -> int:
+    """Drain due events batch by batch; returns the number processed"""
+    total = 0
+    for _ in range(max_batches):
+        processed = dispatch_batch(db, batch_size)
+        total += processed
+        if processed < batch_size:
+            break
+    return total
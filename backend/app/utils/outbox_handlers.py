@@ -0,0 +1,68 @@
+"""
+Outbox Event Handlers
+
+Handlers must be idempotent: an event can be retried after a partial
+failure. Importing this module registers them with app.utils.outbox.
+"""
+from datetime import date
+from sqlalchemy.orm import Session
+from app.models.admin import Admin
+from app.models.chat import Chat
+from app.models.outbox import OutboxEvent
+from app.utils.dedup import delete_if_unreferenced
+from app.utils.media import register_upload
+from app.utils.outbox import handler
+from app.utils.scoring import apply_daily_delta
+from app.utils.screening import screen_item
+
+
+@handler("contribution.changed")
+def handle_contribution_changed(db: Session, event: OutboxEvent) -> None:
+    """Add a post/resource count change to the daily contribution rollups"""
+    payload = event.payload
+    day = date.fromisoformat(payload["day"]) if payload.get("day") else event.created_at.date()
+    apply_daily_delta(
+        db, payload["user_id"], day,
+        resources=payload.get("resources", 0),
+        posts=payload.get("posts", 0)
+    )
+
+
+@handler("mentor.created")
+def handle_mentor_created(db: Session, event: OutboxEvent) -> None:
+    """Notify admins via chat message that a new mentor requires verification"""
+    payload = event.payload
+    message = f"New mentor {payload['full_name']} requires verification"
+    already_notified = {
+        receiver_id for (receiver_id,) in db.query(Chat.receiver_id).filter(
+            Chat.sender_id == payload["user_id"],
+            Chat.message == message
+        ).all()
+    }
+    for admin in db.query(Admin).all():
+        if admin.user_id in already_notified:
+            continue
+        db.add(Chat(
+            sender_id=payload["user_id"],
+            receiver_id=admin.user_id,
+            message=message
+        ))
+
+
+@handler("content.created")
+def handle_content_created(db: Session, event: OutboxEvent) -> None:
+    """Screen a new post/resource against banned terms/links and for duplicates"""
+    payload = event.payload
+    screen_item(db, payload["item_type"], payload["item_id"])
+
+
+@handler("media.uploaded")
+def handle_media_uploaded(db: Session, event: OutboxEvent) -> None:
+    """Queue an uploaded file referenced by a new post/resource for media processing"""
+    register_upload(db, event.payload["file_key"])
+
+
+@handler("file.released")
+def handle_file_released(db: Session, event: OutboxEvent) -> None:
+    """Delete a deduplicated file once no post/resource references it"""
+    delete_if_unreferenced(db, event.payload["file_key"])
@@ -0,0 +1,73 @@
+"""
+Read-Only Projections
+
+List endpoints that only read (the feed, resource list, mentor list,
+leaderboard) select just the columns their response schema shows, with a
+Core select() joined to the author, and return plain dicts built from the
+rows. FastAPI's response_model validation then builds the response models
+from those dicts in pydantic-core. The ORM path instead hydrates a full
+object per row (identity map, attribute instrumentation, a lazy load of
+each author) which Pydantic then reads back attribute by attribute with
+from_attributes=True.
+
+Statements are built once per combination of filters, with bound
+parameters for the values, and reused: SQLAlchemy memoizes a reused
+statement's cache key and serves its compiled SQL from the engine's cache.
+
+Only for reads: the dicts are not tracked by the session.
+"""
+import threading
+from typing import Callable, Dict, Hashable, List, Type
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from app.models.user import User
+from app.schemas.user import UserResponse
+
+USER_FIELD = "user"
+USER_COLUMNS = tuple(UserResponse.model_fields)
+
+
+class Projection:
+    """The columns of a list response schema, selected from its model and the author (model.user_id)"""
+
+    def __init__(self, schema: Type[BaseModel], model):
+        self.schema = schema
+        self.model = model
+        self.fields = tuple(name for name in schema.model_fields if name != USER_FIELD)
+        self.with_user = USER_FIELD in schema.model_fields
+        columns = [getattr(model, name).label(name) for name in self.fields]
+        if self.with_user:
+            columns += [getattr(User, name).label(f"{USER_FIELD}__{name}") for name in USER_COLUMNS]
+        base = select(*columns).select_from(model)
+        if self.with_user:
+            base = base.join(User, User.id == model.user_id)
+        self.base = base
+        self._statements: Dict[Hashable, Select] = {}
+        self._lock = threading.Lock()
+
+    def statement(self, key: Hashable, build: Callable[[Select], Select]) -> Select:
+        """
+        The statement for key, built from the base select on first use
+
+        key must identify the statement's shape (which filters are applied);
+        values go in bound parameters, passed to records().
+        """
+        stmt = self._statements.get(key)
+        if stmt is None:
+            with self._lock:
+                stmt = self._statements.setdefault(key, build(self.base))
+        return stmt
+
+    def records(self, db: Session, stmt: Select, **params) -> List[dict]:
+        """Run a statement; one dict per row, shaped like the response schema"""
+        rows = db.execute(stmt, params).all()
+        fields = self.fields
+        if not self.with_user:
+            return [dict(zip(fields, row)) for row in rows]
+        split = len(fields)
+        return [
+            {**dict(zip(fields, row)), USER_FIELD: dict(zip(USER_COLUMNS, row[split:]))}
+            for row in rows
+        ]
@@ -0,0 +1,171 @@
+"""
+In-memory Ranked Leaderboard Index
+
+Keeps every leaderboard entry in a sorted array keyed by (-points, user_id),
+so that rank lookups are a binary search instead of an ORDER BY over the whole
+table. Ties on points are broken deterministically by user_id (lower first).
+
+Each worker process holds its own index. It is loaded at startup, updated
+in-place by the write paths of this process, and periodically compared
+against the database to pick up changes made by other processes. The
+comparison starts with a one-row signature of the table (row count, points
+total and a checksum of every (user_id, points) pair) computed by MySQL;
+rows are only read when the signature moved since the last check.
+"""
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.models.leaderboard import Leaderboard
+
+COMPETITION = "competition"  # 1, 2, 2, 4
+DENSE = "dense"  # 1, 2, 2, 3
+RANKING_METHODS = (COMPETITION, DENSE)
+
+_SIGNATURE = text(
+    "SELECT COUNT(*), COALESCE(SUM(points), 0), "
+    "COALESCE(BIT_XOR(CRC32(CONCAT_WS(':', user_id, points))), 0) FROM leaderboard"
+)
+
+
+def table_signature(db: Session) -> tuple:
+    """Changes whenever a leaderboard row is added, removed or its points change"""
+    count, total, checksum = db.execute(_SIGNATURE).one()
+    return int(count), float(total), int(checksum)
+
+
+class RankedLeaderboard:
+    """Sorted-array leaderboard index with O(log n) rank queries"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys: List[Tuple[float, int]] = []  # sorted (-points, user_id)
+        self._points: Dict[int, float] = {}  # user_id -> points
+        self._distinct: List[float] = []  # sorted distinct -points, for dense ranking
+        self._distinct_counts: Dict[float, int] = {}
+        self.loaded = False
+        self.signature: Optional[tuple] = None  # table_signature() the index last matched
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def load(self, db: Session) -> int:
+        """(Re)build the index from the leaderboard table"""
+        # Taken first: a change made meanwhile leaves it stale, forcing a re-check
+        signature = table_signature(db)
+        rows = db.query(Leaderboard.user_id, Leaderboard.points).all()
+        points = {user_id: float(p or 0) for user_id, p in rows}
+        keys = sorted((-p, user_id) for user_id, p in points.items())
+        counts: Dict[float, int] = {}
+        for neg_points, _ in keys:
+            counts[neg_points] = counts.get(neg_points, 0) + 1
+        with self._lock:
+            self._points = points
+            self._keys = keys
+            self._distinct_counts = counts
+            self._distinct = sorted(counts)
+            self.loaded = True
+            self.signature = signature
+        return len(keys)
+
+    def _remove_locked(self, user_id: int) -> None:
+        old = self._points.pop(user_id, None)
+        if old is None:
+            return
+        key = (-old, user_id)
+        idx = bisect_left(self._keys, key)
+        if idx < len(self._keys) and self._keys[idx] == key:
+            del self._keys[idx]
+        remaining = self._distinct_counts[-old] - 1
+        if remaining:
+            self._distinct_counts[-old] = remaining
+        else:
+            del self._distinct_counts[-old]
+            del self._distinct[bisect_left(self._distinct, -old)]
+
+    def update(self, user_id: int, points: float) -> None:
+        """Insert or move a user after their points changed"""
+        points = float(points or 0)
+        with self._lock:
+            if self._points.get(user_id) == points:
+                return
+            self._remove_locked(user_id)
+            self._points[user_id] = points
+            insort(self._keys, (-points, user_id))
+            if -points in self._distinct_counts:
+                self._distinct_counts[-points] += 1
+            else:
+                self._distinct_counts[-points] = 1
+                insort(self._distinct, -points)
+
+    def remove(self, user_id: int) -> None:
+        """Drop a user from the index"""
+        with self._lock:
+            self._remove_locked(user_id)
+
+    def points_of(self, user_id: int) -> Optional[float]:
+        return self._points.get(user_id)
+
+    def _rank_locked(self, user_id: int, method: str) -> Optional[int]:
+        points = self._points.get(user_id)
+        if points is None:
+            return None
+        if method == DENSE:
+            return bisect_left(self._distinct, -points) + 1
+        # Number of users with strictly more points, plus one
+        return bisect_left(self._keys, (-points,)) + 1
+
+    def rank(self, user_id: int, method: str = COMPETITION) -> Optional[int]:
+        """Rank of a user (1-based), or None if the user has no entry"""
+        with self._lock:
+            return self._rank_locked(user_id, method)
+
+    def position(self, user_id: int) -> Optional[int]:
+        """0-based position of a user in the tie-broken ordering"""
+        with self._lock:
+            points = self._points.get(user_id)
+            if points is None:
+                return None
+            return bisect_left(self._keys, (-points, user_id))
+
+    def page(self, skip: int = 0, limit: int = 100, method: str = COMPETITION) -> List[Tuple[int, float, int]]:
+        """Return (user_id, points, rank) for a slice of the ordering"""
+        with self._lock:
+            return [
+                (user_id, -neg_points, self._rank_locked(user_id, method))
+                for neg_points, user_id in self._keys[skip:skip + limit]
+            ]
+
+    def around(self, user_id: int, radius: int = 5, method: str = COMPETITION) -> List[Tuple[int, float, int]]:
+        """Return (user_id, points, rank) for the users surrounding user_id"""
+        with self._lock:
+            pos = self.position(user_id)
+            if pos is None:
+                return []
+            start = max(0, pos - radius)
+            return self.page(start, pos - start + radius + 1, method)
+
+    def check_consistency(self, db: Session) -> dict:
+        """Compare the index against the leaderboard table"""
+        rows = db.query(Leaderboard.user_id, Leaderboard.points).all()
+        db_points = {user_id: float(p or 0) for user_id, p in rows}
+        with self._lock:
+            mem_points = dict(self._points)
+        missing = [uid for uid in db_points if uid not in mem_points]
+        extra = [uid for uid in mem_points if uid not in db_points]
+        mismatched = [
+            uid for uid, p in db_points.items()
+            if uid in mem_points and mem_points[uid] != p
+        ]
+        return {
+            "in_sync": not (missing or extra or mismatched),
+            "db_entries": len(db_points),
+            "index_entries": len(mem_points),
+            "missing": missing[:100],
+            "extra": extra[:100],
+            "mismatched": mismatched[:100],
+        }
+
+
+ranked_leaderboard = RankedLeaderboard()
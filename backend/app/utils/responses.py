@@ -0,0 +1,36 @@
+"""
+Fast JSON Responses
+
+FastJSONResponse is the app's default response class. FastAPI has already
+validated and dumped the endpoint's return value through its response_model
+(JSON mode) by the time the response renders, so only the final encoding
+changes: orjson instead of the stdlib json module, typically several times
+faster on large lists.
+
+The JSON is the same as JSONResponse's: compact, UTF-8 (not \\u-escaped),
+non-string dict keys converted to strings. Floats are written in their
+shortest round-trip form either way, though exponents differ in spelling
+(1e-05 vs 1e-5). NaN/Infinity, which the stdlib response refuses, become
+null.
+
+orjson is optional: without it this is the stdlib JSONResponse.
+"""
+import importlib.util
+from typing import Any
+from fastapi.responses import JSONResponse
+
+ORJSON_AVAILABLE = importlib.util.find_spec("orjson") is not None
+
+if ORJSON_AVAILABLE:
+    import orjson
+
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed"""
+
+    def render(self, content: Any) -> bytes:
+        if not ORJSON_AVAILABLE:
+            return super().render(content)
+        return orjson.dumps(content, option=_ORJSON_OPTIONS)
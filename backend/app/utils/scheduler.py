@@ -1,64 +1,560 @@
 """
-Background Scheduler for Leaderboard Auto-Recalculation
+Background Scheduler for Leaderboard Auto-Recalculation and Maintenance Jobs
+
+Every uvicorn worker starts its own scheduler. Jobs registered as
+cluster-wide take a named lock before running (MySQL GET_LOCK, or an flock'd
+file when the database is not MySQL), so they run once per schedule across
+all workers; per-process jobs (such as syncing this worker's in-memory
+index) run everywhere.
+
+A cluster-wide run is also recorded in job_runs, keyed by the job and the
+fire time of its slot: the first worker to insert the row runs the slot, and
+a worker reaching a slot already in the table (its lock was free because the
+other run had finished) skips it. Interval triggers start at SLOT_EPOCH so
+every worker computes the same slots. The admin jobs endpoint reads
+cluster-wide history from job_runs; per-process jobs keep this worker's
+statistics in JOB_METRICS.
 """
+import fcntl
+import json
+import logging
+import os
+import socket
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.schedulers.base import SchedulerNotRunningError
 from apscheduler.triggers.cron import CronTrigger
-from app.db import SessionLocal
-from app.models.leaderboard import Leaderboard
-from app.models.mentor import Mentor
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import case, delete, func, select, text
+from sqlalchemy.exc import IntegrityError
+from app.db import SessionLocal, engine
+from app.models.job_run import JobRun
+from app.utils.account_deletion import resume_stale_deletions
+from app.utils.leaderboard import recalculate_leaderboard
+from app.utils.media import process_pending as process_pending_media
+from app.utils.multipart import abort_stale_uploads
+from app.utils.outbox import dispatch_pending
+from app.utils.stats import reconcile as reconcile_stats
+from app.utils.storage_gc import collect_orphans
+import app.utils.outbox_handlers  # noqa: F401  (registers outbox handlers)
+from app.utils.ranking import ranked_leaderboard, table_signature
+
+logger = logging.getLogger("app.scheduler")
 
 scheduler = BackgroundScheduler()
 
+LOCK_PREFIX = "mentorship_job:"
+LOCK_DIR = os.getenv("SCHEDULER_LOCK_DIR", tempfile.gettempdir())
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Start of every interval trigger, so all workers share the same slots
+SLOT_EPOCH = datetime(2024, 1, 1)
+# A scheduled run starting later than this after its fire time is skipped
+MISFIRE_GRACE_SECONDS = 10
+JOB_RUN_RETENTION_DAYS = 14
+
+# job_id -> {"func", "name", "trigger", "cluster_wide"}
+JOBS: Dict[str, dict] = {}
+# job_id -> run statistics for this process (cluster-wide jobs: skipped runs only)
+JOB_METRICS: Dict[str, dict] = {}
+
+
+def log_event(event: str, **fields):
+    """Emit a structured (JSON) log line"""
+    logger.info(json.dumps({"event": event, **fields}, default=str))
+
+
+@contextmanager
+def _file_lock(name: str):
+    """Hold an exclusive non-blocking flock on a per-job file; yields whether it was acquired"""
+    path = os.path.join(LOCK_DIR, name.replace(":", "_") + ".lock")
+    with open(path, "w") as fh:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+@contextmanager
+def _no_lock():
+    yield True
+
+
+@contextmanager
+def cluster_lock(job_id: str):
+    """
+    Lock a job across workers; yields whether the lock was acquired
+
+    Uses MySQL GET_LOCK on a dedicated connection, so the lock is released if
+    the worker dies. Falls back to a file lock (single host only) when the
+    database is not MySQL or cannot be reached.
+    """
+    name = LOCK_PREFIX + job_id
+    conn = None
+    if engine.dialect.name == "mysql":
+        try:
+            conn = engine.connect()
+        except Exception as e:
+            log_event("job_lock_fallback", job_id=job_id, error=str(e))
+    if conn is None:
+        with _file_lock(name) as acquired:
+            yield acquired
+        return
+    try:
+        acquired = conn.execute(text("SELECT GET_LOCK(:name, 0)"), {"name": name}).scalar() == 1
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": name})
+    finally:
+        conn.close()
+
+
+def _slot(trigger, now: datetime) -> Optional[datetime]:
+    """
+    Fire time (UTC, naive) of the trigger's slot a scheduled run belongs to
+
+    APScheduler starts a run at most MISFIRE_GRACE_SECONDS after its fire
+    time, so the slot is the first fire time in that window; None if there
+    is none (the run is late).
+    """
+    fire_time = trigger.get_next_fire_time(None, now - timedelta(seconds=MISFIRE_GRACE_SECONDS))
+    if fire_time is None or fire_time > now:
+        return None
+    return fire_time.astimezone(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+def _claim_slot(job_id: str, scheduled_at: datetime, trigger: str, started_at: datetime) -> bool:
+    """Insert the job_runs row of a slot; False if another worker already has"""
+    db = SessionLocal()
+    try:
+        db.add(JobRun(
+            job_id=job_id,
+            scheduled_at=scheduled_at,
+            trigger=trigger,
+            worker=WORKER_ID,
+            status="running",
+            started_at=started_at,
+        ))
+        db.commit()
+        return True
+    except IntegrityError:
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+
+def _finish_slot(job_id: str, scheduled_at: datetime, **fields) -> None:
+    db = SessionLocal()
+    try:
+        db.query(JobRun).filter(
+            JobRun.job_id == job_id,
+            JobRun.scheduled_at == scheduled_at
+        ).update(fields, synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        log_event("job_run_record_failed", job_id=job_id, error=str(e))
+    finally:
+        db.close()
+
+
+def _process_metrics(job_id: str) -> dict:
+    return JOB_METRICS.setdefault(job_id, {
+        "runs": 0,
+        "failures": 0,
+        "skipped": 0,
+        "last_run_at": None,
+        "last_duration_ms": None,
+        "last_rows": None,
+        "last_status": None,
+        "last_error": None,
+    })
+
+
+def _skip(job_id: str, reason: str) -> None:
+    metrics = _process_metrics(job_id)
+    metrics["skipped"] += 1
+    metrics["last_status"] = "skipped"
+    log_event("job_skipped", job_id=job_id, reason=reason)
+
+
+def run_job(job_id: str, manual: bool = False) -> Optional[int]:
+    """
+    Run a registered job, recording its outcome; returns rows touched
+
+    Cluster-wide jobs run under their lock, once per slot (see the module
+    docstring); a manual run is its own slot, keyed by its start time.
+    """
+    spec = JOBS[job_id]
+    cluster_wide = spec["cluster_wide"]
+    lock = cluster_lock(job_id) if cluster_wide else _no_lock()
+    with lock as acquired:
+        if not acquired:
+            _skip(job_id, "locked by another worker")
+            return None
+        started_at = datetime.utcnow().replace(microsecond=0)
+        scheduled_at = None
+        if cluster_wide:
+            scheduled_at = started_at if manual else _slot(spec["trigger"], datetime.now(timezone.utc))
+            if scheduled_at is None:
+                _skip(job_id, "missed its slot")
+                return None
+            if not _claim_slot(job_id, scheduled_at, "manual" if manual else "schedule", started_at):
+                _skip(job_id, "slot already run")
+                return None
+        start = time.perf_counter()
+        try:
+            rows = spec["func"]()
+        except Exception as e:
+            duration_ms = round((time.perf_counter() - start) * 1000, 1)
+            outcome = {"status": "failed", "duration_ms": duration_ms, "rows": None, "error": str(e)}
+            logger.exception(json.dumps({"event": "job_failed", "job_id": job_id, "duration_ms": duration_ms, "error": str(e)}))
+        else:
+            duration_ms = round((time.perf_counter() - start) * 1000, 1)
+            outcome = {"status": "ok", "duration_ms": duration_ms, "rows": rows, "error": None}
+            log_event("job_finished", job_id=job_id, duration_ms=duration_ms, rows=rows)
+
+        if cluster_wide:
+            _finish_slot(job_id, scheduled_at, **outcome)
+        else:
+            metrics = _process_metrics(job_id)
+            metrics.update(
+                runs=metrics["runs"] + 1,
+                failures=metrics["failures"] + (outcome["status"] == "failed"),
+                last_run_at=started_at,
+                last_duration_ms=outcome["duration_ms"],
+                last_rows=outcome["rows"],
+                last_status=outcome["status"],
+                last_error=outcome["error"],
+            )
+        return outcome["rows"]
+
+
+def register_job(job_id: str, name: str, func: Callable[[], Optional[int]], trigger, cluster_wide: bool = True):
+    """Register a job to be scheduled by start_scheduler()"""
+    JOBS[job_id] = {"func": func, "name": name, "trigger": trigger, "cluster_wide": cluster_wide}
+
 
-def recalculate_leaderboard_job():
+def recalculate_leaderboard_job() -> int:
     """
     Background job to recalculate leaderboard points for all users
     Runs daily at midnight
     """
     db = SessionLocal()
     try:
-        leaderboards = db.query(Leaderboard).all()
-        
-        for lb in leaderboards:
-            # Get package from mentor profile if exists
-            mentor = db.query(Mentor).filter(Mentor.user_id == lb.user_id).first()
-            package = mentor.package if mentor else 0
-            
-            # Recalculate points
-            lb.package = package
-            lb.points = (lb.total_resources * 10) + (lb.total_posts * 5) + (package * 2)
-        
-        db.commit()
-        print(f"Leaderboard recalculated for {len(leaderboards)} users")
+        result = recalculate_leaderboard(
+            db,
+            progress=lambda done, total: log_event("leaderboard_recalc_progress", processed=done, total=total)
+        )
+        ranked_leaderboard.load(db)
+        return result["changed_entries"]
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def load_ranked_leaderboard():
+    """Build the in-memory ranked leaderboard index from the database"""
+    db = SessionLocal()
+    try:
+        count = ranked_leaderboard.load(db)
+        log_event("ranked_leaderboard_loaded", entries=count)
     except Exception as e:
-        print(f"Error recalculating leaderboard: {e}")
+        logger.exception(json.dumps({"event": "ranked_leaderboard_load_failed", "error": str(e)}))
+    finally:
+        db.close()
+
+
+def sync_ranked_leaderboard_job() -> int:
+    """
+    Background job to compare the ranked leaderboard index with the database
+    and rebuild it on drift (e.g. points changed by another worker process)
+    Runs every 30 seconds in every worker; rows are only compared when the
+    table's signature changed since the last check
+    """
+    db = SessionLocal()
+    try:
+        signature = table_signature(db)
+        if signature == ranked_leaderboard.signature:
+            return 0
+        report = ranked_leaderboard.check_consistency(db)
+        if report["in_sync"]:
+            # Changed only by this process's own writes, already applied
+            ranked_leaderboard.signature = signature
+            return 0
+        ranked_leaderboard.load(db)
+        log_event(
+            "ranked_leaderboard_rebuilt",
+            missing=len(report["missing"]),
+            extra=len(report["extra"]),
+            mismatched=len(report["mismatched"]),
+        )
+        return len(report["missing"]) + len(report["extra"]) + len(report["mismatched"])
+    finally:
+        db.close()
+
+
+def dispatch_outbox_job() -> int:
+    """
+    Background job to run side effects recorded in the outbox
+    Runs every few seconds in every worker (events are claimed with SKIP LOCKED)
+    """
+    db = SessionLocal()
+    try:
+        return dispatch_pending(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def reconcile_stats_job() -> int:
+    """
+    Background job to correct drift in the admin dashboard counters
+    Runs hourly
+    """
+    db = SessionLocal()
+    try:
+        return reconcile_stats(db)
+    except Exception:
         db.rollback()
+        raise
     finally:
         db.close()
 
 
+def abort_stale_uploads_job() -> int:
+    """
+    Background job to abort multipart uploads the client never completed
+    Runs hourly
+    """
+    db = SessionLocal()
+    try:
+        return abort_stale_uploads(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def process_media_job() -> int:
+    """
+    Background job to derive image variants and document metadata of uploads
+    Runs every 30 seconds
+    """
+    db = SessionLocal()
+    try:
+        return process_pending_media(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def collect_orphaned_files_job() -> int:
+    """
+    Background job to delete uploaded files nothing references any more
+    Runs daily
+    """
+    db = SessionLocal()
+    try:
+        return collect_orphans(db)["deleted"]
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def prune_job_runs_job() -> int:
+    """
+    Background job to delete job_runs older than JOB_RUN_RETENTION_DAYS
+    Runs daily
+    """
+    db = SessionLocal()
+    try:
+        deleted = db.execute(
+            delete(JobRun).where(
+                JobRun.started_at < func.timestampadd(text("DAY"), -JOB_RUN_RETENTION_DAYS, func.utc_timestamp())
+            )
+        ).rowcount
+        db.commit()
+        return deleted
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+register_job(
+    "recalculate_leaderboard",
+    "Recalculate Leaderboard Points",
+    recalculate_leaderboard_job,
+    CronTrigger(hour=0, minute=0),  # Daily at midnight
+)
+register_job(
+    "sync_ranked_leaderboard",
+    "Sync Ranked Leaderboard Index",
+    sync_ranked_leaderboard_job,
+    IntervalTrigger(seconds=30, start_date=SLOT_EPOCH),
+    cluster_wide=False,
+)
+register_job(
+    "reconcile_stats",
+    "Reconcile Admin Stat Counters",
+    reconcile_stats_job,
+    CronTrigger(minute=15),  # Hourly
+)
+register_job(
+    "abort_stale_uploads",
+    "Abort Stale Multipart Uploads",
+    abort_stale_uploads_job,
+    CronTrigger(minute=45),  # Hourly
+)
+register_job(
+    "collect_orphaned_files",
+    "Delete Orphaned Uploaded Files",
+    collect_orphaned_files_job,
+    CronTrigger(hour=3, minute=30),  # Daily
+)
+register_job(
+    "purge_disabled_accounts",
+    "Resume Unfinished Account Deletions",
+    resume_stale_deletions,
+    IntervalTrigger(minutes=10, start_date=SLOT_EPOCH),
+)
+register_job(
+    "process_media",
+    "Process Uploaded Media",
+    process_media_job,
+    IntervalTrigger(seconds=30, start_date=SLOT_EPOCH),
+)
+register_job(
+    "dispatch_outbox",
+    "Dispatch Outbox Events",
+    dispatch_outbox_job,
+    IntervalTrigger(seconds=5, start_date=SLOT_EPOCH),
+    cluster_wide=False,
+)
+register_job(
+    "prune_job_runs",
+    "Prune Job Run History",
+    prune_job_runs_job,
+    CronTrigger(hour=4, minute=10),  # Daily
+)
+
+
+def trigger_job(job_id: str) -> bool:
+    """Schedule a registered job to run now; returns False if the job is unknown"""
+    if job_id not in JOBS:
+        return False
+    if scheduler.running:
+        # A job without a trigger runs once, immediately, on the scheduler's thread pool
+        scheduler.add_job(run_job, args=[job_id, True], id=f"{job_id}:manual", replace_existing=True)
+    else:
+        run_job(job_id, manual=True)
+    return True
+
+
+def _cluster_history() -> Dict[str, dict]:
+    """job_id -> run counts and last run of the cluster-wide jobs, from job_runs"""
+    db = SessionLocal()
+    try:
+        totals = db.execute(
+            select(
+                JobRun.job_id,
+                func.count().label("runs"),
+                func.sum(case((JobRun.status == "failed", 1), else_=0)).label("failures"),
+                func.max(JobRun.started_at).label("last_run_at"),
+            ).group_by(JobRun.job_id)
+        ).all()
+        history = {}
+        for job_id, runs, failures, last_run_at in totals:
+            last = db.query(JobRun).filter(
+                JobRun.job_id == job_id,
+                JobRun.started_at == last_run_at
+            ).order_by(JobRun.scheduled_at.desc()).first()
+            history[job_id] = {
+                "runs": runs,
+                "failures": int(failures or 0),
+                "last_run_at": last.started_at,
+                "last_scheduled_at": last.scheduled_at,
+                "last_trigger": last.trigger,
+                "last_worker": last.worker,
+                "last_duration_ms": last.duration_ms,
+                "last_rows": last.rows,
+                "last_status": last.status,
+                "last_error": last.error,
+            }
+        return history
+    finally:
+        db.close()
+
+
+def list_jobs() -> list:
+    """
+    Registered jobs with their next run time and run statistics: from
+    job_runs (every worker) for cluster-wide jobs, from this process's
+    JOB_METRICS for the others
+    """
+    history = _cluster_history()
+    jobs = []
+    for job_id, spec in JOBS.items():
+        job = scheduler.get_job(job_id) if scheduler.running else None
+        metrics = dict(JOB_METRICS.get(job_id, {}))
+        if spec["cluster_wide"]:
+            metrics = {"skipped": metrics.get("skipped", 0), **history.get(job_id, {"runs": 0, "failures": 0})}
+        jobs.append({
+            "id": job_id,
+            "name": spec["name"],
+            "cluster_wide": spec["cluster_wide"],
+            "trigger": str(spec["trigger"]),
+            "next_run_time": job.next_run_time if job else None,
+            **metrics,
+        })
+    return jobs
+
+
 def start_scheduler():
     """Start the background scheduler"""
-    # Schedule daily recalculation at midnight
-    scheduler.add_job(
-        recalculate_leaderboard_job,
-        trigger=CronTrigger(hour=0, minute=0),  # Daily at midnight
-        id='recalculate_leaderboard',
-        name='Recalculate Leaderboard Points',
-        replace_existing=True
-    )
-    
+    for job_id, spec in JOBS.items():
+        scheduler.add_job(
+            run_job,
+            trigger=spec["trigger"],
+            args=[job_id],
+            id=job_id,
+            name=spec["name"],
+            misfire_grace_time=MISFIRE_GRACE_SECONDS,
+            replace_existing=True
+        )
+
     scheduler.start()
-    print("Background scheduler started - Leaderboard will recalculate daily at midnight")
+    log_event("scheduler_started", jobs=list(JOBS))
 
 
 def stop_scheduler():
     """Stop the background scheduler"""
     try:
         scheduler.shutdown()
-        print("Background scheduler stopped")
+        log_event("scheduler_stopped")
     except SchedulerNotRunningError:
         # Ignore if not running
         pass
-
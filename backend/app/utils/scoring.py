@@ -0,0 +1,152 @@
+"""
+Leaderboard Scoring
+
+Single home for the points formula:
+    points = total_resources*RESOURCE + total_posts*POST + package*PACKAGE
+with weights taken from settings. Counter changes are applied as atomic SQL
+increments on the caller's session, so they commit (or roll back) together
+with the content write that caused them. Call sync_rank() after the commit
+to move the user in the in-memory ranked leaderboard.
+
+Every counter change also enqueues a "contribution.changed" outbox event;
+its handler adds the change to the user's daily_contributions row for the
+day the content was created, which windowed leaderboards sum over.
+"""
+from datetime import date
+from typing import Optional
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.utils.outbox import enqueue
+from app.utils.ranking import ranked_leaderboard
+
+
+def weights() -> dict:
+    """Current scoring weights as SQL bind parameters"""
+    return {
+        "w_resource": settings.LEADERBOARD_RESOURCE_POINTS,
+        "w_post": settings.LEADERBOARD_POST_POINTS,
+        "w_package": settings.LEADERBOARD_PACKAGE_POINTS,
+    }
+
+
+def compute_points(total_resources: int, total_posts: int, package: int) -> float:
+    """Points for a set of counters, using the configured weights"""
+    return float(
+        (total_resources or 0) * settings.LEADERBOARD_RESOURCE_POINTS
+        + (total_posts or 0) * settings.LEADERBOARD_POST_POINTS
+        + (package or 0) * settings.LEADERBOARD_PACKAGE_POINTS
+    )
+
+
+def points_sql(resources: str = "total_resources", posts: str = "total_posts", package: str = "package") -> str:
+    """SQL expression for points over the given column expressions"""
+    return f"({resources})*:w_resource + ({posts})*:w_post + ({package})*:w_package"
+
+
+# MySQL evaluates ON DUPLICATE KEY UPDATE assignments left to right, so the
+# points assignment sees the already-incremented counters.
+_MENTOR_PACKAGE = "COALESCE((SELECT m.package FROM mentors m WHERE m.user_id = :user_id), 0)"
+
+_APPLY_DELTA = f"""
+    INSERT INTO leaderboard (user_id, total_resources, total_posts, package, points)
+    VALUES (
+        :user_id, GREATEST(:d_resources, 0), GREATEST(:d_posts, 0), {_MENTOR_PACKAGE},
+        {points_sql("GREATEST(:d_resources, 0)", "GREATEST(:d_posts, 0)", _MENTOR_PACKAGE)}
+    )
+    ON DUPLICATE KEY UPDATE
+        total_resources = GREATEST(total_resources + :d_resources, 0),
+        total_posts = GREATEST(total_posts + :d_posts, 0),
+        points = {points_sql()}
+"""
+
+_APPLY_DAILY_DELTA = """
+    INSERT INTO daily_contributions (user_id, day, total_resources, total_posts)
+    VALUES (:user_id, COALESCE(:day, CURRENT_DATE()), GREATEST(:d_resources, 0), GREATEST(:d_posts, 0))
+    ON DUPLICATE KEY UPDATE
+        total_resources = GREATEST(total_resources + :d_resources, 0),
+        total_posts = GREATEST(total_posts + :d_posts, 0)
+"""
+
+_SET_PACKAGE = f"""
+    INSERT INTO leaderboard (user_id, total_resources, total_posts, package, points)
+    VALUES (:user_id, 0, 0, :package, {points_sql("0", "0", ":package")})
+    ON DUPLICATE KEY UPDATE
+        package = :package,
+        points = {points_sql()}
+"""
+
+
+def apply_delta(
+    db: Session,
+    user_id: int,
+    resources: int = 0,
+    posts: int = 0,
+    day: Optional[date] = None
+) -> None:
+    """
+    Atomically adjust a user's resource/post counters and points
+
+    Creates the leaderboard row if missing. `day` is the date the content was
+    created (defaults to today) and selects the daily rollup row to adjust.
+    Does not commit.
+    """
+    apply_deltas(db, {(user_id, day): (resources, posts)})
+
+
+def apply_deltas(db: Session, deltas: dict) -> None:
+    """
+    Apply {(user_id, day): (resources, posts)} adjustments in one batch
+
+    `day` may be None for today. Does not commit.
+    """
+    totals = {}
+    for (user_id, day), (r, p) in deltas.items():
+        if not (r or p):
+            continue
+        enqueue(db, "contribution.changed", {
+            "user_id": user_id,
+            "day": day.isoformat() if day else None,
+            "resources": r,
+            "posts": p,
+        })
+        total_r, total_p = totals.get(user_id, (0, 0))
+        totals[user_id] = (total_r + r, total_p + p)
+    params = [
+        {"user_id": user_id, "d_resources": r, "d_posts": p, **weights()}
+        for user_id, (r, p) in totals.items()
+        if r or p
+    ]
+    if params:
+        db.execute(text(_APPLY_DELTA), params)
+
+
+def apply_daily_delta(db: Session, user_id: int, day, resources: int = 0, posts: int = 0) -> None:
+    """Adjust a user's daily_contributions row for `day`. Does not commit."""
+    db.execute(
+        text(_APPLY_DAILY_DELTA),
+        {"user_id": user_id, "day": day, "d_resources": resources, "d_posts": posts}
+    )
+
+
+def set_package(db: Session, user_id: int, package: Optional[int]) -> None:
+    """Store a mentor's package on the leaderboard and recompute points. Does not commit."""
+    db.execute(text(_SET_PACKAGE), {"user_id": user_id, "package": package or 0, **weights()})
+
+
+def sync_rank(db: Session, *user_ids: int) -> None:
+    """Refresh the in-memory ranked leaderboard for users whose points changed"""
+    if not user_ids:
+        return
+    rows = db.execute(
+        text("SELECT user_id, points FROM leaderboard WHERE user_id IN :ids").bindparams(
+            bindparam("ids", expanding=True)
+        ),
+        {"ids": list(user_ids)},
+    ).all()
+    found = set()
+    for user_id, points in rows:
+        ranked_leaderboard.update(user_id, points)
+        found.add(user_id)
+    for user_id in set(user_ids) - found:
+        ranked_leaderboard.remove(user_id)
@@ -0,0 +1,246 @@
+"""
+Automated Content Screening
+
+New posts and resources are screened after commit by the outbox dispatcher
+("content.created" events), so screening never slows down the request.
+
+Banned terms and links are matched in a single pass over the text with an
+Aho-Corasick automaton, so the cost per item does not grow with the number
+of rules. Each worker compiles the automaton once and rebuilds it when the
+rule list changes (checked every SCREENING_RELOAD_SECONDS, or immediately
+after a change made through this worker).
+
+Duplicates are detected by hashing the normalized text: a copy of existing
+content is flagged, and a user posting the same text SCREENING_SPAM_THRESHOLD
+times within the window has the item unapproved as spam.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.post import Post
+from app.models.resource import Resource
+from app.models.screening import ContentFingerprint, ContentFlag, ScreeningRule
+
+TERM = "term"
+LINK = "link"
+RULE_KINDS = (TERM, LINK)
+
+FLAG = "flag"
+UNAPPROVE = "unapprove"
+RULE_ACTIONS = (FLAG, UNAPPROVE)
+
+# item_type -> (model, screened text columns)
+SCREENED = {
+    "post": (Post, ("title", "content", "media_url")),
+    "resource": (Resource, ("title", "description", "file_url")),
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class Automaton:
+    """Aho-Corasick automaton matching many patterns in one pass"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[str, ...]] = [()]
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str) -> None:
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] = self._out[state] + (pattern,)
+
+    def _build(self) -> None:
+        # Breadth-first, so a state's failure target is final before its children are linked
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def search(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Yield (start index, pattern) for every occurrence of every pattern"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pattern in out[state]:
+                yield i - len(pattern) + 1, pattern
+
+
+def _is_word(text: str, start: int, end: int) -> bool:
+    """Whether text[start:end] is not part of a longer word"""
+    return (start == 0 or not text[start - 1].isalnum()) and (end >= len(text) or not text[end].isalnum())
+
+
+class RuleSet:
+    """Compiled screening rules, shared by all threads of a worker"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._automaton = Automaton(())
+        self._rules: Dict[str, Tuple[str, str]] = {}  # pattern -> (kind, action)
+        self._signature = None
+        self._checked_at = 0.0
+
+    def invalidate(self) -> None:
+        """Force a reload check on next use (after rules were changed by this worker)"""
+        self._checked_at = 0.0
+
+    def _current(self, db: Session) -> Tuple[Automaton, Dict[str, Tuple[str, str]]]:
+        if time.monotonic() - self._checked_at < settings.SCREENING_RELOAD_SECONDS:
+            return self._automaton, self._rules
+        with self._lock:
+            if time.monotonic() - self._checked_at >= settings.SCREENING_RELOAD_SECONDS:
+                # Rules are only added or deleted, so count and max id identify a version
+                signature = tuple(db.query(func.count(ScreeningRule.id), func.max(ScreeningRule.id)).one())
+                if signature != self._signature:
+                    rules = {
+                        pattern: (kind, action)
+                        for pattern, kind, action in db.query(
+                            ScreeningRule.pattern, ScreeningRule.kind, ScreeningRule.action
+                        ).all()
+                    }
+                    self._automaton = Automaton(rules)
+                    self._rules = rules
+                    self._signature = signature
+                self._checked_at = time.monotonic()
+            return self._automaton, self._rules
+
+    def match(self, db: Session, text: str) -> Dict[str, dict]:
+        """
+        Match text against the rules
+
+        Returns:
+            {kind: {"patterns": [...], "action": strongest action}} for kinds that matched
+        """
+        automaton, rules = self._current(db)
+        text = text.lower()
+        found: Dict[str, dict] = {}
+        for start, pattern in automaton.search(text):
+            kind, action = rules[pattern]
+            if kind == TERM and not _is_word(text, start, start + len(pattern)):
+                continue
+            entry = found.setdefault(kind, {"patterns": [], "action": FLAG})
+            if pattern not in entry["patterns"]:
+                entry["patterns"].append(pattern)
+            if action == UNAPPROVE:
+                entry["action"] = UNAPPROVE
+        return found
+
+
+rule_set = RuleSet()
+
+
+def content_hash(text: str) -> Optional[str]:
+    """SHA-256 of case- and whitespace-normalized text, or None if too short to be meaningful"""
+    normalized = _WHITESPACE.sub(" ", text.lower()).strip()
+    if len(normalized) < settings.SCREENING_MIN_HASH_LENGTH:
+        return None
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _check_duplicates(db: Session, item_type: str, item, digest: str) -> Dict[str, dict]:
+    """Record the item's fingerprint and report duplicate/spam findings"""
+    if not db.query(ContentFingerprint).filter(
+        ContentFingerprint.item_type == item_type,
+        ContentFingerprint.item_id == item.id
+    ).first():
+        db.add(ContentFingerprint(
+            item_type=item_type,
+            item_id=item.id,
+            user_id=item.user_id,
+            content_hash=digest,
+            created_at=item.created_at
+        ))
+        db.flush()
+
+    since = (item.created_at or datetime.utcnow()) - timedelta(hours=settings.SCREENING_DUPLICATE_WINDOW_HOURS)
+    copies = db.query(ContentFingerprint.item_type, ContentFingerprint.item_id, ContentFingerprint.user_id).filter(
+        ContentFingerprint.content_hash == digest,
+        ContentFingerprint.created_at >= since,
+        (ContentFingerprint.item_type != item_type) | (ContentFingerprint.item_id != item.id)
+    ).limit(100).all()
+    # Fingerprints of deleted items are not cleaned up eagerly; ignore them here
+    live = set()
+    for copy_type, (model, _) in SCREENED.items():
+        ids = [i for t, i, _ in copies if t == copy_type]
+        if ids:
+            live.update((copy_type, i) for (i,) in db.query(model.id).filter(model.id.in_(ids)).all())
+    copies = [copy for copy in copies if (copy[0], copy[1]) in live]
+    if not copies:
+        return {}
+    same_user = [f"{t}:{i}" for t, i, user_id in copies if user_id == item.user_id]
+    if len(same_user) + 1 >= settings.SCREENING_SPAM_THRESHOLD:
+        return {"spam": {"copies": same_user, "action": UNAPPROVE}}
+    return {"duplicate": {"copies": [f"{t}:{i}" for t, i, _ in copies], "action": FLAG}}
+
+
+def screen_item(db: Session, item_type: str, item_id: int) -> List[ContentFlag]:
+    """
+    Screen one post/resource, recording flags and unapproving it if a rule says so
+
+    Idempotent: flags already recorded for the item are not duplicated.
+    Does not commit.
+    """
+    model, columns = SCREENED[item_type]
+    item = db.query(model).filter(model.id == item_id).first()
+    if not item:
+        return []
+    text = "\n".join(getattr(item, column) or "" for column in columns)
+
+    findings = rule_set.match(db, text)
+    digest = content_hash(text)
+    if digest:
+        findings.update(_check_duplicates(db, item_type, item, digest))
+    if not findings:
+        return []
+
+    existing = {
+        reason for (reason,) in db.query(ContentFlag.reason).filter(
+            ContentFlag.item_type == item_type,
+            ContentFlag.item_id == item_id
+        ).all()
+    }
+    flags = []
+    for reason, details in findings.items():
+        action = details.pop("action")
+        if action == UNAPPROVE:
+            item.is_approved = False
+        if reason in existing:
+            continue
+        flag = ContentFlag(item_type=item_type, item_id=item_id, reason=reason, action=action, details=details)
+        db.add(flag)
+        flags.append(flag)
+    return flags
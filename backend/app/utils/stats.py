@@ -0,0 +1,85 @@
+"""
+Admin Dashboard Counters
+
+Counts for the admin dashboard are kept in the stat_counters table and
+adjusted by the write paths in the same transaction as the write. Reads
+are served from a short-lived in-process cache; when counters have not
+been initialised yet, all counts are computed with a single query. A
+periodic reconciliation job creates the counters and rewrites them from the
+source tables to correct any drift.
+"""
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.utils.cache import TTLCache
+
+COUNTERS = ("mentors", "mentees", "pending_mentors", "resources", "posts")
+
+STATS_CACHE_TTL = 10  # seconds
+stats_cache = TTLCache(maxsize=1, ttl=STATS_CACHE_TTL)
+
+_COUNT_ALL = """
+    SELECT
+        (SELECT COUNT(*) FROM mentors) AS mentors,
+        (SELECT COUNT(*) FROM mentees) AS mentees,
+        (SELECT COUNT(*) FROM mentors WHERE verified = 0) AS pending_mentors,
+        (SELECT COUNT(*) FROM resources) AS resources,
+        (SELECT COUNT(*) FROM posts) AS posts
+"""
+
+# Counters are only created by reconcile(), so an increment never starts a
+# counter from zero on a table that already has rows
+_INCREMENT = "UPDATE stat_counters SET value = GREATEST(value + :delta, 0) WHERE name = :name"
+
+_SET = """
+    INSERT INTO stat_counters (name, value) VALUES (:name, :value)
+    ON DUPLICATE KEY UPDATE value = :value
+"""
+
+
+def increment(db: Session, **deltas: int) -> None:
+    """Adjust counters, e.g. increment(db, posts=1). Does not commit."""
+    params = [{"name": name, "delta": delta} for name, delta in deltas.items() if delta]
+    if params:
+        db.execute(text(_INCREMENT), params)
+
+
+def count_all(db: Session) -> dict:
+    """Count every dashboard statistic from the source tables in one round trip"""
+    row = db.execute(text(_COUNT_ALL)).mappings().one()
+    return {name: int(row[name] or 0) for name in COUNTERS}
+
+
+def get_stats(db: Session) -> dict:
+    """Dashboard counts from cache, the counters table, or the source tables"""
+    cached = stats_cache.get("stats")
+    if cached is not None:
+        return cached
+    rows = dict(db.execute(text("SELECT name, value FROM stat_counters")).all())
+    if all(name in rows for name in COUNTERS):
+        stats = {name: int(rows[name]) for name in COUNTERS}
+    else:
+        stats = count_all(db)
+    stats_cache.set("stats", stats)
+    return stats
+
+
+def reconcile(db: Session) -> int:
+    """
+    Rewrite counters from the source tables and commit
+
+    The counters are locked before counting: a write that adjusted one has
+    committed (and is in the counts) or waits for this transaction and
+    applies its adjustment on top of the rewritten value. Counting first
+    would overwrite adjustments committed in between.
+
+    Returns:
+        Number of counters that had drifted
+    """
+    db.rollback()  # count in a snapshot taken after the lock, not an earlier one
+    stored = dict(db.execute(text("SELECT name, value FROM stat_counters FOR UPDATE")).all())
+    actual = count_all(db)
+    drifted = sum(1 for name in COUNTERS if stored.get(name) != actual[name])
+    db.execute(text(_SET), [{"name": name, "value": value} for name, value in actual.items()])
+    db.commit()
+    stats_cache.clear()
+    return drifted
@@ -1,10 +1,27 @@
 """
 Cloud Storage Utilities for AWS S3 (or compatible) presigned URLs
+
+Routers go through get_storage(), which returns the configured backend:
+S3Storage below or LocalStorage (app/utils/local_storage.py) for
+deployments without S3.
+
+The boto3 client is created on first use rather than at import, so workers
+and scripts that never touch S3 do not pay for it. Signed download URLs are
+cached per (file_key, expiration) and reused while at least
+PRESIGNED_URL_MIN_REMAINING of their lifetime is left.
 """
+import base64
+import importlib.util
 import os
-from typing import Optional
-from datetime import timedelta
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional, Tuple
+from datetime import datetime, timedelta
+from urllib.parse import unquote, urlsplit
 from app.config import settings
+from app.utils.cache import TTLCache
 
 # Mock S3 configuration - Replace with actual AWS credentials in production
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID", "")
@@ -12,46 +29,85 @@ AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY", "")
 AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 AWS_BUCKET_NAME = os.getenv("AWS_BUCKET_NAME", "mentorship-platform")
 AWS_S3_ENDPOINT = os.getenv("AWS_S3_ENDPOINT", None)  # For S3-compatible services
+AWS_S3_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_S3_MAX_POOL_CONNECTIONS", "50"))
+# "path" for local S3-compatible stand-ins (MinIO) that do not resolve bucket subdomains
+AWS_S3_ADDRESSING_STYLE = os.getenv("AWS_S3_ADDRESSING_STYLE", "auto")
+
+# Signed download URL cache
+PRESIGNED_URL_CACHE_SIZE = int(os.getenv("PRESIGNED_URL_CACHE_SIZE", "10000"))
+PRESIGNED_URL_MIN_REMAINING = 0.5  # fraction of the requested lifetime a cached URL must still have
+
+S3_AVAILABLE = importlib.util.find_spec("boto3") is not None
+
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+download_url_cache = TTLCache(maxsize=PRESIGNED_URL_CACHE_SIZE, ttl=3600)
+
+# Signing calls made by this process (cache misses)
+SIGNING_METRICS = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": None}
+_metrics_lock = threading.Lock()
 
-try:
-    import boto3
-    from botocore.config import Config
+
+def get_s3_client():
+    """Return the shared S3 client, creating it on first use; None if boto3 is not installed"""
+    global _s3_client
+    if _s3_client is None and S3_AVAILABLE:
+        with _s3_client_lock:
+            if _s3_client is None:
+                import boto3
+                from botocore.config import Config
+                
+                s3_config = Config(
+                    region_name=AWS_REGION,
+                    signature_version='s3v4',
+                    max_pool_connections=AWS_S3_MAX_POOL_CONNECTIONS,
+                    s3={'addressing_style': AWS_S3_ADDRESSING_STYLE}
+                )
+                # endpoint_url is set for S3-compatible services (MinIO, DigitalOcean Spaces, etc.)
+                _s3_client = boto3.client(
+                    's3',
+                    endpoint_url=AWS_S3_ENDPOINT,
+                    aws_access_key_id=AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+                    config=s3_config
+                )
+    return _s3_client
+
+
+def _client_error():
     from botocore.exceptions import ClientError
-    
-    # Initialize S3 client
-    s3_config = Config(
-        region_name=AWS_REGION,
-        signature_version='s3v4'
-    )
-    
-    if AWS_S3_ENDPOINT:
-        # For S3-compatible services (MinIO, DigitalOcean Spaces, etc.)
-        s3_client = boto3.client(
-            's3',
-            endpoint_url=AWS_S3_ENDPOINT,
-            aws_access_key_id=AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-            config=s3_config
-        )
-    else:
-        # Standard AWS S3
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-            config=s3_config
-        )
-    
-    S3_AVAILABLE = True
-except ImportError:
-    S3_AVAILABLE = False
-    s3_client = None
+    return ClientError
+
+
+def _record_signing(started: float) -> None:
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    with _metrics_lock:
+        SIGNING_METRICS["count"] += 1
+        SIGNING_METRICS["total_ms"] += elapsed_ms
+        SIGNING_METRICS["max_ms"] = max(SIGNING_METRICS["max_ms"], elapsed_ms)
+        SIGNING_METRICS["last_ms"] = elapsed_ms
+
+
+def storage_metrics() -> dict:
+    """Signing latency and download URL cache statistics for this process"""
+    with _metrics_lock:
+        signing = dict(SIGNING_METRICS)
+    signing["avg_ms"] = signing["total_ms"] / signing["count"] if signing["count"] else None
+    return {
+        "backend": get_storage().name,
+        "client_initialized": _s3_client is not None,
+        "signing": signing,
+        "download_url_cache": download_url_cache.stats(),
+    }
 
 
 def generate_presigned_upload_url(
     file_key: str,
     content_type: str = "application/octet-stream",
-    expiration: int = 3600
+    expiration: int = 3600,
+    content_length: Optional[int] = None,
+    checksum_sha256: Optional[str] = None
 ) -> Optional[str]:
     """
     Generate a presigned URL for uploading a file to S3
@@ -60,26 +116,37 @@ def generate_presigned_upload_url(
         file_key: S3 object key (path/filename)
         content_type: MIME type of the file
         expiration: URL expiration time in seconds (default: 1 hour)
+        content_length: If given, the signature only accepts a body of exactly this size
+        checksum_sha256: Hex SHA-256 the body must have; S3 rejects other content
+            (the client sends it base64-encoded as x-amz-checksum-sha256)
     
     Returns:
         Presigned URL string or None if S3 is not configured
     """
-    if not S3_AVAILABLE or not s3_client:
+    s3_client = get_s3_client()
+    if not s3_client:
         # Return mock URL for development
         return f"https://{AWS_BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/{file_key}"
     
     try:
+        params = {
+            'Bucket': AWS_BUCKET_NAME,
+            'Key': file_key,
+            'ContentType': content_type
+        }
+        if content_length is not None:
+            params['ContentLength'] = content_length
+        if checksum_sha256 is not None:
+            params['ChecksumSHA256'] = base64.b64encode(bytes.fromhex(checksum_sha256)).decode('ascii')
+        started = time.perf_counter()
         presigned_url = s3_client.generate_presigned_url(
             'put_object',
-            Params={
-                'Bucket': AWS_BUCKET_NAME,
-                'Key': file_key,
-                'ContentType': content_type
-            },
+            Params=params,
             ExpiresIn=expiration
         )
+        _record_signing(started)
         return presigned_url
-    except ClientError as e:
+    except _client_error() as e:
         print(f"Error generating presigned URL: {e}")
         return None
 
@@ -91,6 +158,9 @@ def generate_presigned_download_url(
     """
     Generate a presigned URL for downloading a file from S3
     
+    A URL signed earlier for the same key and expiration is returned while
+    it still has PRESIGNED_URL_MIN_REMAINING of its lifetime left.
+    
     Args:
         file_key: S3 object key (path/filename)
         expiration: URL expiration time in seconds (default: 1 hour)
@@ -98,11 +168,18 @@ def generate_presigned_download_url(
     Returns:
         Presigned URL string or None if S3 is not configured
     """
-    if not S3_AVAILABLE or not s3_client:
+    s3_client = get_s3_client()
+    if not s3_client:
         # Return mock URL for development
         return f"https://{AWS_BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/{file_key}"
     
+    cache_key = (file_key, expiration)
+    cached = download_url_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
+        started = time.perf_counter()
         presigned_url = s3_client.generate_presigned_url(
             'get_object',
             Params={
@@ -111,10 +188,21 @@ def generate_presigned_download_url(
             },
             ExpiresIn=expiration
         )
-        return presigned_url
-    except ClientError as e:
+        _record_signing(started)
+    except _client_error() as e:
         print(f"Error generating presigned URL: {e}")
         return None
+    
+    download_url_cache.set(cache_key, presigned_url, ttl=expiration * (1 - PRESIGNED_URL_MIN_REMAINING))
+    return presigned_url
+
+
+def invalidate_download_urls(file_key: Optional[str] = None, prefix: Optional[str] = None) -> None:
+    """Drop cached download URLs of deleted objects (one key, or every key under a prefix)"""
+    if prefix is not None:
+        download_url_cache.invalidate_matching(lambda key: key[0].startswith(prefix))
+    else:
+        download_url_cache.invalidate_matching(lambda key: key[0] == file_key)
 
 
 def delete_file_from_s3(file_key: str) -> bool:
@@ -127,13 +215,325 @@ def delete_file_from_s3(file_key: str) -> bool:
     Returns:
         True if successful, False otherwise
     """
-    if not S3_AVAILABLE or not s3_client:
+    s3_client = get_s3_client()
+    if not s3_client:
         return False
     
     try:
         s3_client.delete_object(Bucket=AWS_BUCKET_NAME, Key=file_key)
+        invalidate_download_urls(file_key)
         return True
-    except ClientError as e:
+    except _client_error() as e:
         print(f"Error deleting file from S3: {e}")
         return False
 
+
+DELETE_BATCH_SIZE = 1000  # DeleteObjects limit
+
+
+def delete_files(file_keys: List[str]) -> int:
+    """
+    Delete many objects with DeleteObjects requests of up to DELETE_BATCH_SIZE keys
+    
+    Returns:
+        Number of objects deleted (0 if S3 is not configured)
+    
+    Raises:
+        ClientError: if a delete fails, so the caller can retry
+    """
+    s3_client = get_s3_client()
+    if not s3_client:
+        return 0
+    
+    deleted = 0
+    for start in range(0, len(file_keys), DELETE_BATCH_SIZE):
+        keys = [{'Key': key} for key in file_keys[start:start + DELETE_BATCH_SIZE]]
+        response = s3_client.delete_objects(
+            Bucket=AWS_BUCKET_NAME,
+            Delete={'Objects': keys, 'Quiet': True}
+        )
+        errors = response.get('Errors', [])
+        if errors:
+            raise _client_error()(
+                {'Error': {'Code': errors[0].get('Code'), 'Message': errors[0].get('Message')}},
+                'DeleteObjects'
+            )
+        gone = {key['Key'] for key in keys}
+        download_url_cache.invalidate_matching(lambda cached: cached[0] in gone)
+        deleted += len(keys)
+    return deleted
+
+
+def delete_files_with_prefix(prefix: str) -> int:
+    """
+    Delete every object under a key prefix (e.g. "post/42/")
+    
+    Objects are listed a page at a time and removed with batched
+    DeleteObjects requests (up to 1000 keys each).
+    
+    Args:
+        prefix: S3 key prefix
+    
+    Returns:
+        Number of objects deleted (0 if S3 is not configured)
+    
+    Raises:
+        ClientError: if listing or deleting fails, so the caller can retry
+    """
+    s3_client = get_s3_client()
+    if not s3_client:
+        return 0
+    
+    deleted = 0
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=AWS_BUCKET_NAME, Prefix=prefix, PaginationConfig={'PageSize': 1000}):
+        keys = [obj['Key'] for obj in page.get('Contents', [])]
+        if keys:
+            deleted += delete_files(keys)
+    invalidate_download_urls(prefix=prefix)
+    return deleted
+
+
+class StorageBackend(ABC):
+    """
+    Where uploaded files are stored
+    
+    Clients upload and download directly with the URLs a backend hands out;
+    the API only stores file keys ("{file_type}/{user_id}/{date}/{uuid}.{ext}").
+    """
+    name = "base"
+    
+    @abstractmethod
+    def upload_url(
+        self,
+        file_key: str,
+        content_type: str = "application/octet-stream",
+        expiration: int = 3600,
+        size: Optional[int] = None,
+        sha256: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        URL the client PUTs the file body to; with size/sha256 (hex), the
+        upload is only accepted if the body has that size/SHA-256
+        """
+    
+    @abstractmethod
+    def download_url(self, file_key: str, expiration: int = 3600) -> Optional[str]:
+        """URL the client GETs the file from"""
+    
+    @abstractmethod
+    def delete(self, file_key: str) -> bool:
+        """Delete one file; returns whether it was deleted"""
+    
+    @abstractmethod
+    def delete_prefix(self, prefix: str) -> int:
+        """Delete every file under a key prefix; returns the number deleted"""
+    
+    @abstractmethod
+    def exists(self, file_key: str) -> bool:
+        """Whether a file is stored under file_key"""
+    
+    @abstractmethod
+    def delete_many(self, file_keys: List[str]) -> int:
+        """Delete the given files; returns the number deleted"""
+    
+    @abstractmethod
+    def list_files(self, prefix: str) -> Iterator[List[dict]]:
+        """Files under a key prefix, a page at a time, in key order: [{"key", "size", "last_modified"}]"""
+    
+    @abstractmethod
+    def download_to(self, file_key: str, path: str) -> None:
+        """Copy a stored file to a local path (for server-side processing)"""
+    
+    @abstractmethod
+    def upload_from(self, path: str, file_key: str, content_type: str = "application/octet-stream") -> None:
+        """Store a local file under file_key, replacing any existing file"""
+    
+    # Multipart uploads: the client uploads numbered parts (in parallel, and
+    # resuming after failures), then the parts are joined into one file.
+    
+    @abstractmethod
+    def create_multipart(self, file_key: str, content_type: str = "application/octet-stream") -> str:
+        """Start a multipart upload; returns its upload id"""
+    
+    @abstractmethod
+    def part_upload_urls(self, file_key: str, upload_id: str, part_numbers: List[int], expiration: int = 3600) -> Dict[int, str]:
+        """URLs the client PUTs each part to"""
+    
+    @abstractmethod
+    def list_parts(self, file_key: str, upload_id: str) -> List[dict]:
+        """Parts received so far: [{"part_number", "etag", "size"}] in part order"""
+    
+    @abstractmethod
+    def complete_multipart(self, file_key: str, upload_id: str, parts: List[dict]) -> None:
+        """Join the given parts ([{"part_number", "etag"}], ascending) into the file"""
+    
+    @abstractmethod
+    def abort_multipart(self, file_key: str, upload_id: str) -> None:
+        """Discard an unfinished upload and its parts"""
+    
+    @abstractmethod
+    def stale_multipart_uploads(self, prefix: str, older_than: datetime) -> List[Tuple[str, str]]:
+        """(file_key, upload_id) of unfinished uploads under prefix started before older_than"""
+
+
+class S3Storage(StorageBackend):
+    """AWS S3 or an S3-compatible service, through presigned URLs"""
+    name = "s3"
+    
+    def upload_url(
+        self,
+        file_key: str,
+        content_type: str = "application/octet-stream",
+        expiration: int = 3600,
+        size: Optional[int] = None,
+        sha256: Optional[str] = None
+    ) -> Optional[str]:
+        return generate_presigned_upload_url(
+            file_key,
+            content_type=content_type,
+            expiration=expiration,
+            content_length=size,
+            checksum_sha256=sha256
+        )
+    
+    def download_url(self, file_key: str, expiration: int = 3600) -> Optional[str]:
+        return generate_presigned_download_url(file_key, expiration=expiration)
+    
+    def delete(self, file_key: str) -> bool:
+        return delete_file_from_s3(file_key)
+    
+    def delete_prefix(self, prefix: str) -> int:
+        return delete_files_with_prefix(prefix)
+    
+    def delete_many(self, file_keys: List[str]) -> int:
+        return delete_files(file_keys)
+    
+    def list_files(self, prefix: str) -> Iterator[List[dict]]:
+        paginator = get_s3_client().get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=AWS_BUCKET_NAME, Prefix=prefix, PaginationConfig={'PageSize': 1000}):
+            yield [
+                {'key': obj['Key'], 'size': obj['Size'], 'last_modified': obj['LastModified'].replace(tzinfo=None)}
+                for obj in page.get('Contents', [])
+            ]
+    
+    def exists(self, file_key: str) -> bool:
+        try:
+            get_s3_client().head_object(Bucket=AWS_BUCKET_NAME, Key=file_key)
+            return True
+        except _client_error() as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+    
+    def download_to(self, file_key: str, path: str) -> None:
+        get_s3_client().download_file(AWS_BUCKET_NAME, file_key, path)
+    
+    def upload_from(self, path: str, file_key: str, content_type: str = "application/octet-stream") -> None:
+        get_s3_client().upload_file(path, AWS_BUCKET_NAME, file_key, ExtraArgs={'ContentType': content_type})
+        invalidate_download_urls(file_key)
+    
+    def create_multipart(self, file_key: str, content_type: str = "application/octet-stream") -> str:
+        response = get_s3_client().create_multipart_upload(
+            Bucket=AWS_BUCKET_NAME,
+            Key=file_key,
+            ContentType=content_type
+        )
+        return response['UploadId']
+    
+    def part_upload_urls(self, file_key: str, upload_id: str, part_numbers: List[int], expiration: int = 3600) -> Dict[int, str]:
+        s3_client = get_s3_client()
+        urls = {}
+        for part_number in part_numbers:
+            started = time.perf_counter()
+            urls[part_number] = s3_client.generate_presigned_url(
+                'upload_part',
+                Params={
+                    'Bucket': AWS_BUCKET_NAME,
+                    'Key': file_key,
+                    'UploadId': upload_id,
+                    'PartNumber': part_number
+                },
+                ExpiresIn=expiration
+            )
+            _record_signing(started)
+        return urls
+    
+    def list_parts(self, file_key: str, upload_id: str) -> List[dict]:
+        paginator = get_s3_client().get_paginator('list_parts')
+        parts = []
+        for page in paginator.paginate(Bucket=AWS_BUCKET_NAME, Key=file_key, UploadId=upload_id):
+            for part in page.get('Parts', []):
+                parts.append({'part_number': part['PartNumber'], 'etag': part['ETag'], 'size': part['Size']})
+        return parts
+    
+    def complete_multipart(self, file_key: str, upload_id: str, parts: List[dict]) -> None:
+        get_s3_client().complete_multipart_upload(
+            Bucket=AWS_BUCKET_NAME,
+            Key=file_key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': [{'PartNumber': p['part_number'], 'ETag': p['etag']} for p in parts]}
+        )
+    
+    def abort_multipart(self, file_key: str, upload_id: str) -> None:
+        try:
+            get_s3_client().abort_multipart_upload(Bucket=AWS_BUCKET_NAME, Key=file_key, UploadId=upload_id)
+        except _client_error() as e:
+            if e.response.get('Error', {}).get('Code') != 'NoSuchUpload':
+                raise
+    
+    def stale_multipart_uploads(self, prefix: str, older_than: datetime) -> List[Tuple[str, str]]:
+        paginator = get_s3_client().get_paginator('list_multipart_uploads')
+        stale = []
+        for page in paginator.paginate(Bucket=AWS_BUCKET_NAME, Prefix=prefix):
+            for upload in page.get('Uploads', []):
+                if upload['Initiated'].replace(tzinfo=None) < older_than:
+                    stale.append((upload['Key'], upload['UploadId']))
+        return stale
+
+
+# Keys generated by the upload router, wherever they appear in a stored URL
+# (bare, presigned S3 (virtual-hosted or path-style) or local signed URLs),
+# including content-addressed keys of deduplicated uploads
+_FILE_KEY = re.compile(
+    r"(?:^|/)((?:post|resource)/(?:\d+/\d{8}/[0-9a-f-]{36}|sha256/(?:\d+/)?[0-9a-f]{64})\.[^/]*)$"
+)
+
+
+def file_key_from_url(url: Optional[str]) -> Optional[str]:
+    """The storage key an uploaded file's URL points at; None for external links"""
+    if not url:
+        return None
+    match = _FILE_KEY.search(unquote(urlsplit(url.strip()).path))
+    return match.group(1) if match else None
+
+
+# "s3", "local", or "auto": S3 when boto3 and S3 credentials/endpoint are configured, else local disk
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "auto")
+
+_storage: Optional[StorageBackend] = None
+_storage_lock = threading.Lock()
+
+
+def s3_configured() -> bool:
+    """Whether S3 can actually be used (instead of producing URLs that point nowhere)"""
+    return S3_AVAILABLE and bool(AWS_S3_ENDPOINT or AWS_ACCESS_KEY_ID)
+
+
+def get_storage() -> StorageBackend:
+    """The configured storage backend (created on first use)"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                backend = STORAGE_BACKEND
+                if backend == "auto":
+                    backend = "s3" if s3_configured() else "local"
+                if backend == "s3":
+                    _storage = S3Storage()
+                elif backend == "local":
+                    from app.utils.local_storage import LocalStorage
+                    _storage = LocalStorage()
+                else:
+                    raise ValueError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}")
+    return _storage
@@ -0,0 +1,253 @@
+"""
+Orphaned File Collection
+
+Files can outlive every reference to them: presigned uploads the client
+never attached to a post or resource, and files of posts and resources
+deleted before deduplication tracked references. collect_orphans() lists
+the upload prefixes a page at a time and deletes files that no post/resource
+URL, unfinished multipart upload or recently claimed content object refers
+to (media variants count as referenced with their original) once they are
+older than ORPHAN_GRACE_HOURS, so uploads still waiting for their post are
+kept. Keys not generated by the upload router are never touched.
+
+References are streamed from the database into a Bloom filter, so memory
+does not grow with the number of rows or files. A false positive only keeps
+an orphan until a later run; a false negative cannot happen. Before each
+delete batch the candidates are checked once more against items and content
+objects created during the run. Deletes go out in batches of up to
+DELETE_BATCH_SIZE keys (one DeleteObjects request on S3). A dry run deletes
+nothing and reports what would be deleted.
+"""
+import hashlib
+import logging
+import math
+import os
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, Optional
+from sqlalchemy import func, or_, select, text
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.db import SessionLocal
+from app.models.media import MediaAsset
+from app.models.post import Post
+from app.models.resource import Resource
+from app.models.upload import ContentObject, MultipartUpload
+from app.utils.background import update_job
+from app.utils.dedup import CLAIM_GRACE_MINUTES
+from app.utils.media import IMAGE_VARIANTS
+from app.utils.multipart import UPLOAD_PREFIXES
+from app.utils.storage import DELETE_BATCH_SIZE, file_key_from_url, get_storage
+
+logger = logging.getLogger("app.storage_gc")
+
+JOB_KIND = "storage_gc"
+BLOOM_ERROR_RATE = 0.001
+YIELD_PER = 5000
+MAX_REPORTED_KEYS = 100
+RUN_START_MARGIN_MINUTES = 5  # rows committed a while after their created_at was set
+
+_VARIANT_SUFFIXES = tuple(f"_{name}" for name, _ in IMAGE_VARIANTS)
+
+
+class BloomFilter:
+    """Set membership with false positives only, in capacity * ~1.8 bytes at 0.1%"""
+
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 64)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterator[int]:
+        # Double hashing: k positions from one 128-bit digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+def reference_stem(file_key: str) -> str:
+    """Key without extension and variant suffix, shared by an upload and its media variants"""
+    stem, extension = os.path.splitext(file_key)
+    if extension == ".webp":
+        for suffix in _VARIANT_SUFFIXES:
+            if stem.endswith(suffix):
+                return stem[:-len(suffix)]
+    return stem
+
+
+def is_managed(file_key: str) -> bool:
+    """Whether a key is an upload (or a media variant of one) generated by the upload router"""
+    return file_key_from_url(reference_stem(file_key) + ".") is not None
+
+
+def _reference_statements() -> list:
+    """Every post/resource URL, unfinished multipart upload and live or recently claimed content object"""
+    # claimed_at is set by the database: compare on its clock
+    claimed_after = func.timestampadd(text("MINUTE"), -CLAIM_GRACE_MINUTES, func.now())
+    return [
+        select(Post.media_url).where(Post.media_url.is_not(None)),
+        select(Resource.file_url),
+        select(MultipartUpload.file_key).where(MultipartUpload.status == "in_progress"),
+        select(ContentObject.file_key).where(
+            or_(ContentObject.ref_count > 0, ContentObject.claimed_at >= claimed_after)
+        ),
+    ]
+
+
+def _recent_reference_statements(since: datetime) -> list:
+    """References added since a point in time"""
+    return [
+        select(Post.media_url).where(Post.media_url.is_not(None), Post.created_at >= since),
+        select(Resource.file_url).where(Resource.created_at >= since),
+        select(ContentObject.file_key).where(ContentObject.claimed_at >= since),
+    ]
+
+
+def _referenced_keys(db: Session, statements: list) -> Iterator[str]:
+    for stmt in statements:
+        result = db.execute(stmt.execution_options(stream_results=True, yield_per=YIELD_PER))
+        for value in result.scalars():
+            file_key = file_key_from_url(value)
+            if file_key:
+                yield file_key
+
+
+def build_reference_filter(db: Session) -> BloomFilter:
+    """Bloom filter of the reference stems of every referenced upload"""
+    capacity = sum(
+        db.query(func.count(model.id)).scalar() or 0
+        for model in (Post, Resource, MultipartUpload, ContentObject)
+    )
+    references = BloomFilter(capacity)
+    for file_key in _referenced_keys(db, _reference_statements()):
+        references.add(reference_stem(file_key))
+    return references
+
+
+def _new_report(dry_run: bool, grace_hours: int) -> dict:
+    return {
+        "dry_run": dry_run,
+        "grace_hours": grace_hours,
+        "scanned": 0,
+        "scanned_bytes": 0,
+        "unmanaged": 0,
+        "referenced": 0,
+        "recent": 0,
+        "orphans": 0,
+        "orphan_bytes": 0,
+        "deleted": 0,
+        "sample": [],
+    }
+
+
+def _delete_batch(db: Session, candidates: List[dict], started_at: datetime, report: dict) -> None:
+    """Re-check candidates against items created during the run, then delete (unless dry run)"""
+    recent = {reference_stem(key) for key in _referenced_keys(db, _recent_reference_statements(started_at))}
+    orphans = [candidate for candidate in candidates if reference_stem(candidate["key"]) not in recent]
+    report["referenced"] += len(candidates) - len(orphans)
+    report["orphans"] += len(orphans)
+    report["orphan_bytes"] += sum(candidate["size"] for candidate in orphans)
+    room = MAX_REPORTED_KEYS - len(report["sample"])
+    if room > 0:
+        report["sample"].extend(candidate["key"] for candidate in orphans[:room])
+    if report["dry_run"] or not orphans:
+        return
+
+    keys = [candidate["key"] for candidate in orphans]
+    report["deleted"] += get_storage().delete_many(keys)
+    db.query(MediaAsset).filter(MediaAsset.file_key.in_(keys)).delete(synchronize_session=False)
+    db.query(ContentObject).filter(
+        ContentObject.file_key.in_(keys),
+        ContentObject.ref_count <= 0
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+def collect_orphans(
+    db: Session,
+    dry_run: bool = False,
+    grace_hours: Optional[int] = None,
+    prefixes: Iterable[str] = UPLOAD_PREFIXES,
+    progress=None,
+) -> dict:
+    """
+    Find (and unless dry_run, delete) unreferenced files under the upload prefixes
+
+    Args:
+        db: Database session
+        dry_run: Only report what would be deleted
+        grace_hours: Minimum age of a deleted file (default: ORPHAN_GRACE_HOURS)
+        prefixes: Key prefixes to scan
+        progress: Optional callback called as progress(scanned, report) after each page
+
+    Returns:
+        Report with scanned/orphaned/deleted counts and bytes, and a sample of orphaned keys
+    """
+    grace_hours = settings.ORPHAN_GRACE_HOURS if grace_hours is None else grace_hours
+    # Compared with created_at/claimed_at, set by the database: on its clock
+    started_at = db.execute(
+        select(func.timestampadd(text("MINUTE"), -RUN_START_MARGIN_MINUTES, func.now()))
+    ).scalar()
+    # Compared with storage's last-modified times, which are UTC
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    report = _new_report(dry_run, grace_hours)
+    references = build_reference_filter(db)
+    db.commit()  # end the snapshot; the re-checks must see rows added meanwhile
+    storage = get_storage()
+
+    for prefix in prefixes:
+        candidates = []
+        for page in storage.list_files(prefix):
+            for obj in page:
+                report["scanned"] += 1
+                report["scanned_bytes"] += obj["size"]
+                if not is_managed(obj["key"]):
+                    report["unmanaged"] += 1  # not created by the upload router; never touched
+                elif reference_stem(obj["key"]) in references:
+                    report["referenced"] += 1
+                elif obj["last_modified"] >= cutoff:
+                    report["recent"] += 1
+                else:
+                    candidates.append(obj)
+            while len(candidates) >= DELETE_BATCH_SIZE:
+                _delete_batch(db, candidates[:DELETE_BATCH_SIZE], started_at, report)
+                candidates = candidates[DELETE_BATCH_SIZE:]
+            if progress:
+                progress(report["scanned"], report)
+        if candidates:
+            _delete_batch(db, candidates, started_at, report)
+
+    logger.info(
+        "Orphan collection%s: %s files scanned, %s orphans (%s bytes), %s deleted",
+        " (dry run)" if dry_run else "", report["scanned"], report["orphans"],
+        report["orphan_bytes"], report["deleted"]
+    )
+    return report
+
+
+def run_gc_job(job_id: int, dry_run: bool = True, grace_hours: Optional[int] = None) -> None:
+    """Run an orphan collection recorded as a background job"""
+    db = SessionLocal()
+    try:
+        update_job(job_id, status="running")
+        report = collect_orphans(
+            db,
+            dry_run=dry_run,
+            grace_hours=grace_hours,
+            progress=lambda scanned, partial: update_job(job_id, processed=scanned, result=partial),
+        )
+        update_job(job_id, status="done", processed=report["scanned"], result=report)
+    except Exception as e:
+        db.rollback()
+        logger.exception("Orphan collection %s failed", job_id)
+        update_job(job_id, status="failed", error=str(e))
+    finally:
+        db.close()
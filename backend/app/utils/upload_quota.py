@@ -0,0 +1,59 @@
+"""
+Per-User Upload Quotas
+
+Every endpoint that hands out upload URLs (single, batch and multipart)
+first reserves the files and their declared bytes against the user's quota
+for the current period (UPLOAD_QUOTA_PERIOD_SECONDS, aligned on Unix time).
+Files the user has already stored get no upload URL and are not counted.
+Per-request caps alone do not bound what a user can store: the requests can
+simply be repeated.
+
+The reservation is one upsert on the user's upload_quotas row, which stays
+locked until the check commits, so concurrent requests of one user cannot
+both slip under the limit. Rows of earlier periods are deleted as the user
+makes new reservations.
+"""
+import time
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.config import settings
+
+_RESERVE = """
+    INSERT INTO upload_quotas (user_id, period, files, bytes) VALUES (:user_id, :period, :files, :bytes)
+    ON DUPLICATE KEY UPDATE files = files + VALUES(files), bytes = bytes + VALUES(bytes)
+"""
+
+
+class QuotaExceeded(Exception):
+    """The user has been handed upload URLs for too many files or bytes this period"""
+
+
+def current_period() -> int:
+    return int(time.time()) // settings.UPLOAD_QUOTA_PERIOD_SECONDS
+
+
+def reserve(db: Session, user_id: int, files: int, size: int) -> None:
+    """
+    Count files and their declared size against the user's quota and commit
+
+    Raises:
+        QuotaExceeded: if the period's file or byte limit would be exceeded
+            (nothing is reserved then)
+    """
+    params = {"user_id": user_id, "period": current_period(), "files": files, "bytes": size}
+    db.execute(text(_RESERVE), params)
+    used_files, used_bytes = db.execute(
+        text("SELECT files, bytes FROM upload_quotas WHERE user_id = :user_id AND period = :period"),
+        params
+    ).one()
+    if used_files > settings.UPLOAD_QUOTA_MAX_FILES or used_bytes > settings.UPLOAD_QUOTA_MAX_BYTES:
+        db.rollback()
+        raise QuotaExceeded(
+            f"Upload quota exceeded: at most {settings.UPLOAD_QUOTA_MAX_FILES} files and "
+            f"{settings.UPLOAD_QUOTA_MAX_BYTES} bytes per {settings.UPLOAD_QUOTA_PERIOD_SECONDS} seconds"
+        )
+    db.execute(
+        text("DELETE FROM upload_quotas WHERE user_id = :user_id AND period < :period"),
+        params
+    )
+    db.commit()
@@ -0,0 +1,173 @@
+"""
+List Endpoint Benchmark: ORM vs Projection
+
+Seeds a database with users, mentors, posts, resources and leaderboard
+entries, then times each read-only list endpoint at 100 and 1000 rows two
+ways, both through the FastAPI response_model validation and JSON dump:
+
+- orm: the previous implementation, querying ORM objects that Pydantic
+  reads with from_attributes=True
+- projection: the endpoint as it is now (app/utils/projection.py), called
+  directly
+
+and checks that both produce the same JSON. Run from the backend directory:
+
+    python benchmarks/projection.py [--rows 100 1000] [--repeat 20] [--json]
+                                    [--database-url URL]
+
+The default database is in-memory SQLite; pass --database-url to measure
+against MySQL (the tables are created and the seed rows added there, so use
+a scratch database).
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import Session, selectinload, sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+import app.models  # noqa: E402,F401
+from app.db import Base  # noqa: E402
+from app.models.leaderboard import Leaderboard  # noqa: E402
+from app.models.mentor import Branch, Mentor  # noqa: E402
+from app.models.post import Post  # noqa: E402
+from app.models.resource import Resource, ResourceType  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.routers import leaderboard, mentors, posts, resources  # noqa: E402
+from app.schemas import LeaderboardResponse, MentorListResponse, PostListResponse, ResourceListResponse  # noqa: E402
+
+NOW = datetime(2024, 1, 1, 12, 0, 0)
+TEXT = "Revise data structures, practise mock interviews and keep a log of the questions asked. " * 3
+
+
+def seed(db: Session, n: int) -> None:
+    branches = list(Branch)
+    for i in range(1, n + 1):
+        created_at = NOW - timedelta(minutes=i)
+        db.add(User(
+            id=i, email=f"user{i}@college.edu", password_hash="x", full_name=f"Student Number {i}",
+            role=UserRole.MENTOR, created_at=created_at,
+        ))
+        db.add(Mentor(
+            user_id=i, branch=branches[i % len(branches)], graduation_year=2015 + i % 10,
+            current_company="Example Corp", package=i % 40, verified=i % 3 == 0, bio=TEXT, created_at=created_at,
+        ))
+        db.add(Post(
+            user_id=i, title=f"My interview experience #{i}", content=TEXT,
+            media_url=f"https://bucket.s3.amazonaws.com/posts/{i}/photo.jpg",
+            media_info={"mime_type": "image/jpeg", "size": 180_000 + i, "width": 1920, "height": 1080},
+            likes=i % 17, is_approved=True, created_at=created_at,
+        ))
+        db.add(Resource(
+            user_id=i, title=f"Interview preparation guide part {i}", description=TEXT,
+            file_url=f"https://bucket.s3.amazonaws.com/resources/{i}/guide.pdf",
+            resource_type=ResourceType.PREPARATION_GUIDE, category="Placements", is_approved=True,
+            created_at=created_at,
+        ))
+        db.add(Leaderboard(
+            user_id=i, total_resources=1, total_posts=1, package=i % 40,
+            points=float(15 + i % 40 * 2), updated_at=created_at,
+        ))
+    db.commit()
+
+
+# endpoint -> (response schema, previous ORM implementation, current implementation)
+ENDPOINTS = {
+    "GET /posts": (
+        PostListResponse,
+        lambda db, n: db.query(Post).filter(Post.is_approved == True).order_by(
+            Post.created_at.desc()).offset(0).limit(n).all(),
+        lambda db, n: posts.list_posts(skip=0, limit=n, db=db),
+    ),
+    "GET /resources": (
+        ResourceListResponse,
+        lambda db, n: db.query(Resource).options(selectinload(Resource.user)).filter(
+            Resource.is_approved == True).order_by(Resource.created_at.desc()).offset(0).limit(n).all(),
+        lambda db, n: resources.list_resources(
+            category=None, resource_type=None, user_id=None, skip=0, limit=n, db=db, current_user_opt=None),
+    ),
+    "GET /mentors": (
+        MentorListResponse,
+        lambda db, n: db.query(Mentor).join(User).offset(0).limit(n).all(),
+        lambda db, n: mentors.list_mentors(
+            branch=None, graduation_year=None, verified=None, skip=0, limit=n, db=db),
+    ),
+    "GET /leaderboard": (
+        LeaderboardResponse,
+        lambda db, n: db.query(Leaderboard).order_by(
+            Leaderboard.points.desc(), Leaderboard.user_id.asc()).offset(0).limit(n).all(),
+        # The ranking index is not loaded here, so this takes the SQL path
+        lambda db, n: leaderboard.get_leaderboard(skip=0, limit=n, window=None, branch=None, db=db),
+    ),
+}
+
+
+def _timed(make_session, fetch, adapter: TypeAdapter, n: int, repeat: int):
+    """Median ms of fetch + response_model validation + JSON dump, and the last output"""
+    samples = []
+    output = None
+    for _ in range(repeat):
+        db = make_session()  # fresh identity map each run, as in a request
+        try:
+            started = time.perf_counter()
+            # What FastAPI does with the return value (ORM objects are read by attribute)
+            output = adapter.dump_python(adapter.validate_python(fetch(db, n), from_attributes=True), mode="json")
+            samples.append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+    return round(statistics.median(samples), 3), output
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000], help="Page sizes to time")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs; the median is reported")
+    parser.add_argument("--database-url", help="Database to seed and query (default: in-memory SQLite)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    make_session = sessionmaker(bind=engine, autoflush=False)
+    with make_session() as db:
+        seed(db, max(args.rows))
+
+    reports = []
+    for name, (schema, orm_fetch, projection_fetch) in ENDPOINTS.items():
+        adapter = TypeAdapter(list[schema])
+        for n in args.rows:
+            orm_ms, orm_output = _timed(make_session, orm_fetch, adapter, n, args.repeat)
+            projection_ms, projection_output = _timed(make_session, projection_fetch, adapter, n, args.repeat)
+            reports.append({
+                "endpoint": name,
+                "rows": n,
+                "orm_ms": orm_ms,
+                "projection_ms": projection_ms,
+                "speedup": round(orm_ms / projection_ms, 2) if projection_ms else 0.0,
+                "same_output": orm_output == projection_output,
+            })
+
+    if args.json:
+        print(json.dumps({"database": engine.dialect.name, "results": reports}, indent=2))
+    else:
+        print(f"database: {engine.dialect.name}, median of {args.repeat} runs "
+              f"(query + response_model validation + JSON dump)\n")
+        print(f"{'endpoint':<18}{'rows':>6}{'orm ms':>11}{'projection ms':>15}{'speedup':>9}  same output")
+        for report in reports:
+            print(f"{report['endpoint']:<18}{report['rows']:>6}{report['orm_ms']:>11.3f}"
+                  f"{report['projection_ms']:>15.3f}{report['speedup']:>8}x  {report['same_output']}")
+    return 0 if all(report["same_output"] for report in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
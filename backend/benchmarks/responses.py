@@ -0,0 +1,171 @@
+"""
+Response Serialization and Compression Benchmark
+
+Renders synthetic payloads of the heaviest list endpoints, shaped by their
+response_model schemas, and reports per endpoint:
+
+- the response_model validation and JSON-mode dump (what FastAPI does
+  before rendering; the same for both response classes)
+- rendering with the stdlib JSONResponse vs FastJSONResponse (orjson), and
+  whether both produce the same JSON
+- body size uncompressed, gzip and Brotli, and the time to compress
+
+No database is needed. Run from the backend directory:
+
+    python benchmarks/responses.py [--repeat 50] [--json]
+"""
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.schemas import LeaderboardResponse, PostResponse, ResourceListResponse  # noqa: E402
+from app.utils.compression import BROTLI_AVAILABLE  # noqa: E402
+from app.utils.responses import ORJSON_AVAILABLE, FastJSONResponse  # noqa: E402
+
+NOW = datetime(2024, 1, 1, 12, 0, 0)
+TEXT = (
+    "Notes from the placement season: aptitude rounds, two technical interviews "
+    "and an HR round. Revise data structures, practise mock interviews, and keep "
+    "a log of the questions you were asked. "
+)
+
+
+def _user(i: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=i, email=f"user{i}@college.edu", full_name=f"Student Number {i}",
+        role="MENTOR", created_at=NOW - timedelta(days=i % 400),
+    )
+
+
+def _media_info(i: int) -> dict:
+    return {
+        "mime_type": "image/jpeg", "size": 180_000 + i,
+        "width": 1920, "height": 1080,
+        "variants": {
+            name: {"key": f"post/{i}/20240101/{i:08x}-0000-0000-0000-000000000000_{name}.webp",
+                   "width": width, "height": width * 9 // 16}
+            for name, width in (("thumb", 320), ("medium", 960), ("large", 1920))
+        },
+    }
+
+
+def leaderboard_rows(n: int) -> list:
+    return [
+        SimpleNamespace(
+            id=i, user_id=i, total_resources=i % 40, total_posts=i % 90, package=i % 30,
+            points=float(i % 40 * 10 + i % 90 * 5 + i % 30 * 2), updated_at=NOW, user=_user(i),
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+def resource_rows(n: int) -> list:
+    return [
+        SimpleNamespace(
+            id=i, user_id=i % 50 + 1, title=f"Interview preparation guide part {i}", description=TEXT,
+            file_url=f"https://bucket.s3.amazonaws.com/resources/{i}/guide.pdf", resource_type="PREPARATION_GUIDE",
+            file_info={"mime_type": "application/pdf", "size": 2_400_000 + i, "page_count": 12},
+            category="Placements", is_approved=True, created_at=NOW - timedelta(hours=i), user=_user(i % 50 + 1),
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+def post_rows(n: int) -> list:
+    return [
+        SimpleNamespace(
+            id=i, user_id=i % 50 + 1, title=f"My interview experience #{i}", content=TEXT * 3,
+            media_url=f"https://bucket.s3.amazonaws.com/posts/{i}/photo.jpg", media_info=_media_info(i),
+            likes=i % 17, is_approved=i % 5 != 0, created_at=NOW - timedelta(hours=i), user=_user(i % 50 + 1),
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+ENDPOINTS = (
+    ("GET /leaderboard?limit=1000", LeaderboardResponse, leaderboard_rows, 1000),
+    ("GET /resources?limit=100", ResourceListResponse, resource_rows, 100),
+    ("GET /admin/posts?limit=100", PostResponse, post_rows, 100),
+)
+
+
+def _median_ms(func, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def bench_endpoint(name: str, schema, make_rows, n: int, repeat: int) -> dict:
+    adapter = TypeAdapter(list[schema])
+    rows = make_rows(n)
+
+    def dump():
+        return adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json")
+
+    content = dump()
+    stdlib_body = JSONResponse(content).body
+    fast_body = FastJSONResponse(content).body
+    report = {
+        "endpoint": name,
+        "rows": n,
+        "model_dump_ms": _median_ms(dump, repeat),
+        "stdlib_render_ms": _median_ms(lambda: JSONResponse(content), repeat),
+        "fast_render_ms": _median_ms(lambda: FastJSONResponse(content), repeat),
+        "same_json": json.loads(stdlib_body) == json.loads(fast_body),
+        "bytes": len(fast_body),
+    }
+    report["gzip_bytes"] = len(gzip.compress(fast_body, settings.COMPRESSION_GZIP_LEVEL))
+    report["gzip_ms"] = _median_ms(lambda: gzip.compress(fast_body, settings.COMPRESSION_GZIP_LEVEL), repeat)
+    if BROTLI_AVAILABLE:
+        import brotli
+
+        quality = settings.COMPRESSION_BROTLI_QUALITY
+        report["brotli_bytes"] = len(brotli.compress(fast_body, quality=quality))
+        report["brotli_ms"] = _median_ms(lambda: brotli.compress(fast_body, quality=quality), repeat)
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50, help="Timed repetitions; the median is reported")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    reports = [bench_endpoint(*endpoint, repeat=args.repeat) for endpoint in ENDPOINTS]
+    if args.json:
+        print(json.dumps({"orjson": ORJSON_AVAILABLE, "brotli": BROTLI_AVAILABLE, "endpoints": reports}, indent=2))
+        return 0 if all(report["same_json"] for report in reports) else 1
+
+    print(f"orjson: {'yes' if ORJSON_AVAILABLE else 'NOT INSTALLED'}, brotli: {'yes' if BROTLI_AVAILABLE else 'NOT INSTALLED'}")
+    for report in reports:
+        speedup = report["stdlib_render_ms"] / report["fast_render_ms"] if report["fast_render_ms"] else 0
+        print(f"\n{report['endpoint']} ({report['rows']} rows)")
+        print(f"  response_model dump  {report['model_dump_ms']:9.3f} ms")
+        print(f"  render stdlib json   {report['stdlib_render_ms']:9.3f} ms")
+        print(f"  render orjson        {report['fast_render_ms']:9.3f} ms  ({speedup:.1f}x, "
+              f"same JSON: {report['same_json']})")
+        print(f"  body                 {report['bytes']:9d} bytes")
+        print(f"  gzip                 {report['gzip_bytes']:9d} bytes  "
+              f"({report['gzip_bytes'] / report['bytes']:.0%}) in {report['gzip_ms']:.3f} ms")
+        if "brotli_bytes" in report:
+            print(f"  brotli               {report['brotli_bytes']:9d} bytes  "
+                  f"({report['brotli_bytes'] / report['bytes']:.0%}) in {report['brotli_ms']:.3f} ms")
+    return 0 if all(report["same_json"] for report in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
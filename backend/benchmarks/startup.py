@@ -0,0 +1,122 @@
+"""
+Startup Time Benchmark
+
+Imports the application in fresh interpreters and reports:
+
+- the median wall time of `import app.main` over --runs runs
+- the slowest modules by cumulative import time, from `python -X importtime`
+- database connections opened during import (must be 0: importing the app
+  must not touch the database; see app/bootstrap.py)
+
+Run from the backend directory:
+
+    python benchmarks/startup.py [--runs 5] [--top 20] [--json] [--max-ms N]
+
+With --max-ms the script exits non-zero when the median exceeds the budget
+or the import connected to the database, so it can gate CI; --json prints
+the report as one JSON object for tracking results over time.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Times the import and counts DB connections opened by it. SQLAlchemy is
+# imported first to install the listener, so its own import is not counted.
+_TIMED_IMPORT = """
+import json, time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+connections = []
+event.listen(Engine, "connect", lambda *args: connections.append(1))
+started = time.perf_counter()
+import {module}
+elapsed_ms = (time.perf_counter() - started) * 1000
+print(json.dumps({{"wall_ms": elapsed_ms, "connections": len(connections)}}))
+"""
+
+
+def _run(args: list) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def timed_imports(module: str, runs: int) -> dict:
+    samples = []
+    connections = 0
+    for _ in range(runs):
+        output = _run(["-c", _TIMED_IMPORT.format(module=module)]).stdout.strip().splitlines()[-1]
+        result = json.loads(output)
+        samples.append(result["wall_ms"])
+        connections = max(connections, result["connections"])
+    return {
+        "runs": runs,
+        "median_ms": round(statistics.median(samples), 1),
+        "min_ms": round(min(samples), 1),
+        "max_ms": round(max(samples), 1),
+        "db_connections": connections,
+    }
+
+
+def import_breakdown(module: str, top: int) -> dict:
+    """Parse `-X importtime` output: total and the slowest modules by cumulative time"""
+    stderr = _run(["-X", "importtime", "-c", f"import {module}"]).stderr
+    modules = []
+    total_us = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # One space, then two per nesting level
+        if len(name) - len(name.lstrip()) == 1:
+            total_us += int(cumulative_us)
+        modules.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    modules.sort(key=lambda entry: entry["cumulative_ms"], reverse=True)
+    return {"total_ms": round(total_us / 1000, 1), "modules": len(modules), "slowest": modules[:top]}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main", help="Module to import (default: app.main)")
+    parser.add_argument("--runs", type=int, default=5, help="Timed imports; the median is reported")
+    parser.add_argument("--top", type=int, default=20, help="Slowest modules to list")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--max-ms", type=float, help="Fail if the median import time exceeds this")
+    args = parser.parse_args()
+
+    report = {"module": args.module, "python": sys.version.split()[0]}
+    report.update(timed_imports(args.module, args.runs))
+    report["importtime"] = import_breakdown(args.module, args.top)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import {args.module}: median {report['median_ms']} ms "
+              f"(min {report['min_ms']}, max {report['max_ms']}, {args.runs} runs)")
+        print(f"database connections during import: {report['db_connections']}")
+        breakdown = report["importtime"]
+        print(f"\n-X importtime: {breakdown['total_ms']} ms over {breakdown['modules']} modules; slowest (cumulative):")
+        for entry in breakdown["slowest"]:
+            print(f"  {entry['cumulative_ms']:9.1f} ms  {entry['self_ms']:8.1f} ms self  {entry['module']}")
+
+    failed = report["db_connections"] > 0
+    if args.max_ms is not None and report["median_ms"] > args.max_ms:
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,121 +1,7 @@
 -- College Mentorship Platform Database Setup Script
--- Run this script to create the database and all tables
+-- Creates the database. Tables and schema changes are managed by the
+-- versioned migrations: run `python -m app.bootstrap` afterwards.
 
--- Create database
 CREATE DATABASE IF NOT EXISTS mentorship_db CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
 
-USE mentorship_db;
-
--- Drop tables if they exist (in reverse order of dependencies)
-DROP TABLE IF EXISTS chats;
-DROP TABLE IF EXISTS leaderboard;
-DROP TABLE IF EXISTS resources;
-DROP TABLE IF EXISTS posts;
-DROP TABLE IF EXISTS admin;
-DROP TABLE IF EXISTS mentors;
-DROP TABLE IF EXISTS mentees;
-DROP TABLE IF EXISTS users;
-
--- Create users table
-CREATE TABLE users (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    email VARCHAR(255) NOT NULL UNIQUE,
-    password_hash VARCHAR(255) NOT NULL,
-    full_name VARCHAR(255) NOT NULL,
-    role ENUM('mentor', 'mentee', 'admin') NOT NULL DEFAULT 'mentee',
-    created_at DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6),
-    updated_at DATETIME(6) ON UPDATE CURRENT_TIMESTAMP(6),
-    INDEX idx_email (email)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-
--- Create mentors table
-CREATE TABLE mentors (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    user_id INT NOT NULL UNIQUE,
-    branch ENUM('CSE', 'ECE', 'ME', 'CE', 'EE', 'IT') NOT NULL,
-    graduation_year INT NOT NULL,
-    current_company VARCHAR(255),
-    package INT DEFAULT 0,
-    verified BOOLEAN NOT NULL DEFAULT FALSE,
-    bio VARCHAR(1000),
-    linkedin_url VARCHAR(500),
-    github_url VARCHAR(500),
-    created_at DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6),
-    updated_at DATETIME(6) ON UPDATE CURRENT_TIMESTAMP(6),
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-    INDEX idx_mentor_branch (branch),
-    INDEX idx_mentor_graduation_year (graduation_year),
-    INDEX idx_mentor_verified (verified)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-
--- Create mentees table
-CREATE TABLE mentees (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    user_id INT NOT NULL UNIQUE,
-    branch VARCHAR(50),
-    current_year INT,
-    goals VARCHAR(1000),
-    created_at DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6),
-    updated_at DATETIME(6) ON UPDATE CURRENT_TIMESTAMP(6),
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-
--- Create posts table
-CREATE TABLE posts (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    user_id INT NOT NULL,
-    title VARCHAR(255) NOT NULL,
-    content TEXT NOT NULL,
-    likes INT NOT NULL DEFAULT 0,
-    created_at DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6),
-    updated_at DATETIME(6) ON UPDATE CURRENT_TIMESTAMP(6),
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-
--- Create resources table
-CREATE TABLE resources (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    user_id INT NOT NULL,
-    title VARCHAR(255) NOT NULL,
-    description TEXT,
-    file_url VARCHAR(500) NOT NULL,
-    category VARCHAR(100),
-    created_at DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6),
-    updated_at DATETIME(6) ON UPDATE CURRENT_TIMESTAMP(6),
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-
--- Create chats table
-CREATE TABLE chats (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    sender_id INT NOT NULL,
-    receiver_id INT NOT NULL,
-    message TEXT NOT NULL,
-    created_at DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6),
-    FOREIGN KEY (sender_id) REFERENCES users(id) ON DELETE CASCADE,
-    FOREIGN KEY (receiver_id) REFERENCES users(id) ON DELETE CASCADE
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-
--- Create leaderboard table
-CREATE TABLE leaderboard (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    user_id INT NOT NULL UNIQUE,
-    total_resources INT DEFAULT 0,
-    total_posts INT DEFAULT 0,
-    package INT DEFAULT 0,
-    points FLOAT DEFAULT 0.0,
-    updated_at DATETIME(6) ON UPDATE CURRENT_TIMESTAMP(6),
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-
--- Create admin table
-CREATE TABLE admin (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    user_id INT NOT NULL UNIQUE,
-    created_at DATETIME(6) DEFAULT CURRENT_TIMESTAMP(6),
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
-
--- Display success message
-SELECT 'Database and tables created successfully!' AS Status;
-
+SELECT 'Database created; now run: python -m app.bootstrap' AS Status;
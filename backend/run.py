@@ -2,8 +2,11 @@
 Simple script to run the FastAPI server
 """
 import uvicorn
+from app.bootstrap import migrate_schema
 
 if __name__ == "__main__":
+    # Bring the schema up to date once here; importing the app does not
+    migrate_schema()
     print("=" * 50)
     print("Starting FastAPI Backend Server")
     print("=" * 50)
@@ -3,7 +3,8 @@ Seed script to create sample data for the mentorship platform.
 Run: python seed.py
 """
 from sqlalchemy.orm import Session
-from app.db import SessionLocal, engine, Base
+from app.bootstrap import migrate_schema
+from app.db import SessionLocal
 from app.models.user import User, UserRole
 from app.models.mentor import Mentor, Branch
 from app.models.mentee import Mentee
@@ -12,9 +13,10 @@ from app.models.resource import Resource
 from app.models.leaderboard import Leaderboard
 from app.models.admin import Admin
 from app.utils.auth import get_password_hash
+from app.utils.scoring import compute_points
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Create tables and apply pending migrations
+migrate_schema()
 
 db: Session = SessionLocal()
 
@@ -101,7 +103,7 @@ def seed_data():
                 total_resources=0,
                 total_posts=0,
                 package=mentor_data["package"],
-                points=mentor_data["package"] * 2  # package*2
+                points=compute_points(0, 0, mentor_data["package"])
             )
             db.add(leaderboard)
         
@@ -174,10 +176,10 @@ def seed_data():
                 ).first()
                 if leaderboard:
                     leaderboard.total_posts += 1
-                    leaderboard.points = (
-                        leaderboard.total_resources * 10 +
-                        leaderboard.total_posts * 5 +
-                        leaderboard.package * 2
+                    leaderboard.points = compute_points(
+                        leaderboard.total_resources,
+                        leaderboard.total_posts,
+                        leaderboard.package
                     )
             
             # Create sample resources
@@ -208,10 +210,10 @@ def seed_data():
                 ).first()
                 if leaderboard:
                     leaderboard.total_resources += 1
-                    leaderboard.points = (
-                        leaderboard.total_resources * 10 +
-                        leaderboard.total_posts * 5 +
-                        leaderboard.package * 2
+                    leaderboard.points = compute_points(
+                        leaderboard.total_resources,
+                        leaderboard.total_posts,
+                        leaderboard.package
                     )
         
         db.commit()
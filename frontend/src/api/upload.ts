@@ -7,6 +7,7 @@ export interface UploadRequest {
   file_name: string
   content_type?: string
   file_type?: 'resource' | 'post'
+  size: number
 }
 
 export interface UploadResponse {